@@ -0,0 +1,112 @@
+"""
+Benchmarks of the DatatableEditor layout and callbacks, run with pytest-benchmark:
+
+    pytest benchmarks/bench_editor.py --benchmark-autosave --benchmark-compare --benchmark-compare-fail=mean:20%
+
+-> fails if the mean of a benchmark regressed by more than 20% compared to the last saved run. The hierarchy is
+configured with the environment variables BENCH_DEPTH, BENCH_FAN_OUT and BENCH_ROWS (comma separated row counts).
+The size of the response of every benchmarked request is recorded in extra_info.payload_bytes and compared with the
+last saved run by compare_payloads.py.
+"""
+import logging
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.dirname(__file__))
+from dash_client import CallbackClient  # noqa: E402
+from synthetic_data import make_tables  # noqa: E402
+
+from datatable_editor.core import DatatableEditor  # noqa: E402
+
+DEPTH = int(os.environ.get('BENCH_DEPTH', 3))
+FAN_OUT = int(os.environ.get('BENCH_FAN_OUT', 1))
+ROW_COUNTS = [int(n) for n in os.environ.get('BENCH_ROWS', '1000,100000').split(',')]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def quiet_logging():
+    # Debug logging of every callback would dominate the timings
+    level = logging.getLogger().level
+    logging.getLogger().setLevel(logging.WARNING)
+    yield
+    logging.getLogger().setLevel(level)
+
+
+@pytest.fixture(scope='module', params=ROW_COUNTS, ids=lambda n: f'{n}rows')
+def tables(request):
+    return make_tables(depth=DEPTH, fan_out=FAN_OUT, n_rows=request.param)
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['native', 'server_side'])
+def client(request, tables):
+    client = CallbackClient(DatatableEditor(tables, 8050, server_side=request.param))
+    client.get_layout()
+    return client
+
+
+def child_button(client, table_id):
+    # First child table of a table and the button column to reveal it
+    child_table_id = next(iter(client.editor.datatables[table_id].child_tables))
+    return child_table_id, f'!child_{child_table_id}'
+
+
+def test_layout(benchmark, client):
+    benchmark(client.get_layout)
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
+
+
+def test_create_layout(benchmark, client):
+    # Layout construction without JSON serialization
+    session = client.editor.get_session(client.session_id)
+    benchmark(client.editor.create_layout, session)
+
+
+def test_click_cell(benchmark, client):
+    root_table_id = next(iter(client.editor.datatables))
+    child_table_id, column_id = child_button(client, root_table_id)
+    response = benchmark(client.click_cell, root_table_id, 1, column_id)
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
+    assert response['response']
+
+
+def test_load_table(benchmark, client):
+    if client.editor.server_side:
+        pytest.skip('Rows of shown tables are loaded by the page query with server_side=True')
+    root_table_id, child_table_id = list(client.editor.datatables)[:2]
+    query_col = client.editor.datatables[child_table_id].parent_tables[root_table_id][1]
+    benchmark(client.load_table, child_table_id, f'{{!fk_{query_col}}}=1')
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
+
+
+def test_close_table(benchmark, client):
+    table_id = list(client.editor.datatables)[1]
+    benchmark(client.close_table, table_id)
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
+
+
+def test_add_row(benchmark, client):
+    table_id = list(client.editor.datatables)[1]
+    benchmark(client.add_row, table_id)
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
+
+
+def test_get_page(benchmark, client):
+    if not client.editor.server_side:
+        pytest.skip('Pages are only requested from the server with server_side=True')
+    table_id = next(iter(client.editor.datatables))
+    benchmark(client.get_page, table_id, 3, [{'column_id': 'power', 'direction': 'desc'}], '{num} > 50')
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
+
+
+def test_get_window(benchmark, tables):
+    # Window of rows of a scrolled virtualized table
+    client = CallbackClient(DatatableEditor(tables, 8050, virtualization=True))
+    client.get_layout()
+    table_id = next(iter(tables))
+    last_window = (len(tables[table_id].df.index) - 1) // client.editor.page_size
+    benchmark(client.get_page, table_id, last_window)
+    benchmark.extra_info['payload_bytes'] = client.last_response_size
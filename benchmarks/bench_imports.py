@@ -0,0 +1,33 @@
+"""
+Benchmarks of the import time of the package, run with pytest-benchmark:
+
+    pytest benchmarks/bench_imports.py --benchmark-autosave --benchmark-compare --benchmark-compare-fail=mean:20%
+
+-> every import runs in a fresh interpreter, the time includes the start of the interpreter (benchmarked as 'python'
+for reference). The number of imported modules is recorded in extra_info.modules.
+"""
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+IMPORTS = {
+    'python': 'pass',
+    'package': 'import datatable_editor',
+    'relational_df': 'from datatable_editor import RelationalDf',
+    'data_utilities': 'import datatable_editor.bulk_io, datatable_editor.bulk_edit, datatable_editor.integrity',
+    'editor': 'from datatable_editor import DatatableEditor',
+}
+
+
+def run_import(statement):
+    code = f'import sys; {statement}; print(len(sys.modules))'
+    return int(subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout)
+
+
+@pytest.mark.parametrize('name', list(IMPORTS))
+def test_import(benchmark, name):
+    modules = benchmark.pedantic(run_import, args=(IMPORTS[name],), rounds=5, warmup_rounds=1)
+    benchmark.extra_info['modules'] = modules
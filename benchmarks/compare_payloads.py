@@ -0,0 +1,67 @@
+"""
+Compare the payload sizes of the last two saved benchmark runs (see bench_editor.py and bench_imports.py)
+
+run after `pytest benchmarks/... --benchmark-autosave` with `python benchmarks/compare_payloads.py` -> fails if the
+response size of a request (extra_info.payload_bytes) or the number of imported modules (extra_info.modules) of a
+benchmark grew by more than --max-growth percent compared to the run saved before. Unlike timings, these don't
+depend on the machine, so any growth is a change of the code.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+# extra_info entries compared between the runs
+COUNTERS = ('payload_bytes', 'modules')
+
+
+def load_counters(path):
+    """
+    Read the counters of every benchmark of a saved run
+    :param path: path of the JSON file saved by pytest-benchmark
+    :return: dict {(benchmark fullname, counter): value}
+    """
+    with open(path, encoding='utf-8') as f:
+        run = json.load(f)
+    return {(benchmark['fullname'], counter): benchmark['extra_info'][counter]
+            for benchmark in run['benchmarks'] for counter in COUNTERS if counter in benchmark['extra_info']}
+
+
+def compare(previous, current, max_growth):
+    """
+    Compare the counters of two runs
+    :param previous: counters of the earlier run (see load_counters)
+    :param current: counters of the later run
+    :param max_growth: allowed growth in percent
+    :return: list of messages of the counters that grew too much
+    """
+    regressions = []
+    for key, value in current.items():
+        if key in previous and value > previous[key] * (1 + max_growth / 100):
+            regressions.append(f'{key[0]}: {key[1]} grew from {previous[key]} to {value}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--storage', default='.benchmarks', help='directory of the saved runs')
+    parser.add_argument('--max-growth', type=float, default=5, help='allowed growth in percent')
+    args = parser.parse_args()
+
+    # Runs are saved per machine as NNNN_<commit>_<date>.json -> numbered in the order they were saved
+    runs = sorted(glob.glob(os.path.join(args.storage, '*', '*.json')), key=os.path.basename)
+    if len(runs) < 2:
+        print('Nothing to compare: less than two saved runs')
+        return
+
+    regressions = compare(load_counters(runs[-2]), load_counters(runs[-1]), args.max_growth)
+    for message in regressions:
+        print(message)
+    if regressions:
+        sys.exit(1)
+    print(f'Payload sizes of {os.path.basename(runs[-1])} are within {args.max_growth}% of the run before')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Calls the callbacks of a DatatableEditor through Dash's HTTP endpoint like the browser does -> no browser needed
+"""
+import json
+import urllib.error
+import urllib.request
+
+
+def _json_dumps(value):
+    # json is shadowed by the argument of HttpClient.post (named like the one of the Flask test client)
+    return json.dumps(value)
+
+
+def _id_string(component_id):
+    # Dash identifies pattern matching ids by their JSON with sorted keys
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(',', ':'))
+    return component_id
+
+
+class HttpResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        """
+        Client sending the requests of a CallbackClient to a running server over HTTP
+        :param base_url: url of the server, e.g. 'http://127.0.0.1:8050'
+        """
+        self.base_url = base_url.rstrip('/')
+
+    def _request(self, request):
+        try:
+            with urllib.request.urlopen(request) as response:
+                return HttpResponse(response.status, response.read())
+        except urllib.error.HTTPError as error:
+            return HttpResponse(error.code, error.read())
+
+    def get(self, path):
+        return self._request(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, json=None):
+        return self._request(urllib.request.Request(self.base_url + path, data=_json_dumps(json).encode(),
+                                                    headers={'Content-Type': 'application/json'}))
+
+
+class CallbackClient:
+    def __init__(self, editor, session_id=None, client=None):
+        """
+        Client posting callback requests to the Flask server of a DatatableEditor
+
+        :param editor: DatatableEditor
+        :param session_id: id of the session the requests belong to -> value of the 'session_id' store
+        :param client: client sending the requests (interface of the Flask test client, see HttpClient) -> if None,
+            the requests are passed to the Flask app of editor directly
+        """
+        self.editor = editor
+        self.session_id = session_id
+        self.client = client if client is not None else editor.app.server.test_client()
+
+        # table_id -> position of the table in the layout (part of the tables' component ids)
+        self.table_numbers = {table_id: i for i, table_id in enumerate(editor.datatables)}
+
+        # Size in bytes of the last response
+        self.last_response_size = 0
+
+    def table_id(self, table_id, component_type='table'):
+        return {'type': component_type, 'table_id': table_id, 'table_number': self.table_numbers[table_id]}
+
+    def get_layout(self):
+        """
+        Request the layout like on page load -> sets session_id to the new session
+        :return: layout as dict
+        """
+        response = self.client.get('/_dash-layout')
+        self.last_response_size = len(response.data)
+        layout = json.loads(response.data)
+        self.session_id = layout['props']['children'][0]['props']['data']
+        return layout
+
+    def get_callback_key(self, input_type, input_property):
+        # Find the callback by its first input -> independent of how the outputs of a callback are declared
+        for key, callback in self.editor.app.callback_map.items():
+            first_input = callback['inputs'][0]
+            if f'"type":"{input_type}"' in first_input['id'] and first_input['property'] == input_property:
+                return key
+        raise KeyError(f"No callback with input '{input_type}.{input_property}'")
+
+    @staticmethod
+    def get_outputs(callback_key):
+        # Parse the outputs from the callback key -> '..id.property...id.property..' for multiple outputs
+        outputs = []
+        for output in callback_key.strip('.').split('...') if callback_key.startswith('..') else [callback_key]:
+            component_id, component_property = output.rsplit('.', 1)
+            if component_id.startswith('{'):
+                component_id = json.loads(component_id)
+            outputs.append({'id': component_id, 'property': component_property})
+        return outputs if callback_key.startswith('..') else outputs[0]
+
+    def post(self, callback_key, inputs, state, changed_input):
+        """
+        Post a callback request
+        :param callback_key: key of the callback in app.callback_map
+        :param inputs: list of inputs -> dicts with id, property and value (lists of those for ALL inputs)
+        :param state: list of states -> like inputs
+        :param changed_input: the input that triggered the callback
+        :return: response as dict
+        """
+        body = {
+            'output': callback_key,
+            'outputs': self.get_outputs(callback_key),
+            'inputs': inputs,
+            'state': state,
+            'changedPropIds': [f"{_id_string(changed_input['id'])}.{changed_input['property']}"],
+        }
+        response = self.client.post('/_dash-update-component', json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f'Callback {callback_key} failed with status {response.status_code}')
+        self.last_response_size = len(response.data)
+        return json.loads(response.data) if response.data else {}
+
+    def session_state(self):
+        return {'id': 'session_id', 'property': 'data', 'value': self.session_id}
+
+    def click_cell(self, table_id, row_id, column_id):
+        """
+        Click a cell of a table -> the child table of a child button is revealed in the browser, only the request of
+        its rows reaches the server
+        :return: response of the request of the rows or None if the cell is no child button
+        """
+        if not column_id.startswith('!child_'):
+            return None
+        child_table_id = column_id[7:]
+        query_col = self.editor.datatables[child_table_id].parent_tables[table_id][1]
+        filter_query = f'{{!fk_{query_col}}}={row_id}'
+        if self.editor.server_side:
+            return self.get_page(child_table_id, filter_query=filter_query)
+        return self.load_table(child_table_id, filter_query)
+
+    def close_table(self, table_id):
+        """
+        Click the close button of a table -> the table is hidden in the browser, its rows are unloaded by the server
+        """
+        if self.editor.server_side:
+            return self.get_page(table_id, visible=False)
+        return self.load_table(table_id, visible=False)
+
+    def add_row(self, table_id, filter_query=''):
+        """
+        Click the add row button of a table
+        """
+        changed_input = {'id': self.table_id(table_id, 'add_row_button'), 'property': 'n_clicks', 'value': 1}
+        state = [{'id': self.table_id(table_id), 'property': 'filter_query', 'value': filter_query},
+                 self.session_state()]
+        return self.post(self.get_callback_key('add_row_button', 'n_clicks'), [changed_input], state, changed_input)
+
+    def load_table(self, table_id, filter_query='', visible=True):
+        """
+        Load the rows of a table after it was shown or hidden -> only with server_side=False
+        """
+        changed_input = {'id': self.table_id(table_id, 'table_row_wrapper'), 'property': 'style',
+                         'value': {'display': 'block' if visible else 'none'}}
+        state = [{'id': self.table_id(table_id), 'property': 'filter_query', 'value': filter_query},
+                 self.session_state()]
+        return self.post(self.get_callback_key('table_row_wrapper', 'style'), [changed_input], state, changed_input)
+
+    def get_page(self, table_id, page_current=0, sort_by=None, filter_query='', visible=True):
+        """
+        Request a page of a table (or unload the rows of a hidden table) -> only with server_side=True
+        """
+        table = self.table_id(table_id)
+        inputs = [
+            {'id': table, 'property': 'page_current', 'value': page_current},
+            {'id': table, 'property': 'page_size', 'value': self.editor.page_size},
+            {'id': table, 'property': 'sort_by', 'value': sort_by or []},
+            {'id': table, 'property': 'filter_query', 'value': filter_query},
+            {'id': self.table_id(table_id, 'table_row_wrapper'), 'property': 'style',
+             'value': {'display': 'block' if visible else 'none'}},
+        ]
+        return self.post(self.get_callback_key('table', 'page_current'), inputs, [self.session_state()], inputs[0])
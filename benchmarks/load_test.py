@@ -0,0 +1,138 @@
+"""
+Load test of a DatatableEditor served with multiple worker processes (see DatatableEditor.serve)
+
+run with `python benchmarks/load_test.py --workers 1,2,4` -> starts a server per worker count, lets concurrent
+clients request pages of the root table over HTTP for a fixed duration and prints the throughput and latencies.
+The tables are held by a SQLite database shared by the workers (see SqlSource). The clients only read, so the load
+balancing of gunicorn stands in for sticky sessions.
+Requires gunicorn (workers > 1) and waitress (workers = 1).
+"""
+import argparse
+import logging
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from dash_client import CallbackClient, HttpClient  # noqa: E402
+from synthetic_data import make_tables  # noqa: E402
+
+from datatable_editor.core import DatatableEditor  # noqa: E402
+from datatable_editor.relational_df import RelationalDf  # noqa: E402
+from datatable_editor.sources import SqlSource  # noqa: E402
+
+
+def run_server(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    tables = make_sql_tables(make_tables(depth=args.depth, n_rows=args.rows),
+                             os.path.join(tempfile.mkdtemp(), 'tables.db'))
+    DatatableEditor(tables, args.port, server_side=True).serve(workers=args.workers, threads=args.threads,
+                                                               sticky_sessions=True)
+
+
+def make_sql_tables(tables, database):
+    """
+    Write tables to a SQLite database -> multiple worker processes may only serve tables held by a database
+    :param tables: dict of RelationalDfs -> {table_id: RelationalDf}, parent tables first
+    :param database: path of the database file
+    :return: dict of RelationalDfs backed by the database (see SqlSource)
+    """
+    with sqlite3.connect(database) as connection:
+        for table_id, table in tables.items():
+            table.df.to_sql(table_id, connection, index=False)
+    sql_tables = {table_id: RelationalDf(table_id, table.table_name, SqlSource(database, table_id))
+                  for table_id, table in tables.items()}
+    for table_id, table in tables.items():
+        for child_table_id, child_table in table.child_tables.items():
+            foreign_key_column = child_table.parent_tables[table_id][1]
+            sql_tables[table_id].add_child_table(sql_tables[child_table_id], foreign_key_column)
+    return sql_tables
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f'Server on port {port} did not start within {timeout}s')
+
+
+def run_clients(editor, port, n_clients, duration):
+    """
+    Request random pages of the root table from n_clients threads for duration seconds
+    :return: list of request latencies in s
+    """
+    table_id = next(iter(editor.datatables))
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client_loop(seed):
+        rng = random.Random(seed)
+        client = CallbackClient(editor, client=HttpClient(f'http://127.0.0.1:{port}'))
+        client.get_layout()
+        while time.time() < deadline:
+            start = time.perf_counter()
+            client.get_page(table_id, rng.randrange(10), [{'column_id': 'power', 'direction': 'desc'}],
+                            f'{{num}} > {rng.randrange(100)}')
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(n_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='duration per worker count in s')
+    parser.add_argument('--rows', type=int, default=100000, help='rows per table')
+    parser.add_argument('--depth', type=int, default=3, help='levels of the table hierarchy')
+    parser.add_argument('--port', type=int, default=8061)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        args.workers = int(args.workers)
+        run_server(args)
+        return
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # Only the callback ids of the editor are used by the clients -> tables of the same schema with one row
+    editor = DatatableEditor(make_tables(depth=args.depth, n_rows=1), args.port, server_side=True)
+
+    print(f'{"workers":>8} {"requests/s":>12} {"p50 ms":>8} {"p95 ms":>8}')
+    for workers in [int(n) for n in args.workers.split(',')]:
+        server = subprocess.Popen([sys.executable, __file__, '--serve', '--workers', str(workers),
+                                   '--threads', str(args.threads), '--rows', str(args.rows),
+                                   '--depth', str(args.depth), '--port', str(args.port)])
+        try:
+            wait_for_port(args.port)
+            latencies = run_clients(editor, args.port, args.clients, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies_ms = np.array(latencies) * 1000
+        print(f'{workers:>8} {len(latencies) / args.duration:>12.1f} {np.percentile(latencies_ms, 50):>8.1f} '
+              f'{np.percentile(latencies_ms, 95):>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
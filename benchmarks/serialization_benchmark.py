@@ -0,0 +1,58 @@
+"""
+Compare the serialization paths of table data
+
+run with `python benchmarks/serialization_benchmark.py` -> prints the time of every path for tables with 10k, 100k
+and 1M rows
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+from dash._utils import to_json
+
+from datatable_editor.serialization import to_records, to_json_records, iter_json_records
+
+ROW_COUNTS = [10000, 100000, 1000000]
+
+
+def make_table(n_rows, seed=0):
+    # Table shaped like the appliances table of the demo data
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': np.arange(1, n_rows + 1),
+        'user_id': rng.integers(1, max(2, n_rows // 10), n_rows),
+        'name': rng.choice(['radio', 'tv', 'fridge', 'lamp', 'phone charger'], n_rows),
+        'power': rng.random(n_rows) * 100,
+        '!child_usage_windows': 'Click me!',
+    })
+
+
+SERIALIZATION_PATHS = {
+    # Current path: one dict per row, JSON encoded by dash
+    'to_dict + dash': lambda df: to_json(df.to_dict('records')),
+    'to_records + dash': lambda df: to_json(to_records(df)),
+    'to_json_records': to_json_records,
+    'iter_json_records': lambda df: ''.join(iter_json_records(df)),
+}
+
+
+def run_benchmark(row_counts=ROW_COUNTS, repeat=3):
+    """
+    Time every serialization path
+    :param row_counts: numbers of rows of the benchmarked tables
+    :param repeat: number of repetitions -> the best time is reported
+    :return: dict {(path, n_rows): seconds}
+    """
+    results = {}
+    for n_rows in row_counts:
+        df = make_table(n_rows)
+        for name, serialize in SERIALIZATION_PATHS.items():
+            results[(name, n_rows)] = min(timeit.repeat(lambda: serialize(df), number=1, repeat=repeat))
+    return results
+
+
+if __name__ == '__main__':
+    results = run_benchmark()
+    print(f"{'path':<20}" + ''.join(f'{n:>12,}' for n in ROW_COUNTS))
+    for name in SERIALIZATION_PATHS:
+        print(f'{name:<20}' + ''.join(f'{results[(name, n)]:>11.3f}s' for n in ROW_COUNTS))
@@ -0,0 +1,50 @@
+"""
+Synthetic RelationalDf hierarchies for benchmarks, shaped like the users -> appliances -> usage_windows tree of
+datatable_editor.demo_data
+"""
+import numpy as np
+import pandas as pd
+
+from datatable_editor.relational_df import RelationalDf
+
+NAMES = ['radio', 'tv', 'fridge', 'lamp', 'phone charger', 'fan', 'iron', 'pump']
+
+
+def make_tables(depth=3, fan_out=1, n_rows=1000, seed=0):
+    """
+    Create a hierarchy of RelationalDfs
+
+    :param depth: number of levels of the hierarchy (1 -> only the root table)
+    :param fan_out: number of child tables of every table
+    :param n_rows: number of rows of every table
+    :param seed: seed of the random values
+    :return: dict of RelationalDfs -> {table_id: RelationalDf}, root table first
+    """
+    rng = np.random.default_rng(seed)
+    tables = {}
+
+    def make_table(table_id, parent_table):
+        columns = {
+            'id': np.arange(1, n_rows + 1),
+            'name': rng.choice(NAMES, n_rows),
+            'num': rng.integers(0, 100, n_rows),
+            'power': rng.random(n_rows) * 100,
+        }
+        if parent_table is not None:
+            # Every parent row gets about the same number of children
+            columns['parent_id'] = rng.integers(1, n_rows + 1, n_rows)
+        table = RelationalDf(table_id, table_id, pd.DataFrame(columns))
+        tables[table_id] = table
+        if parent_table is not None:
+            parent_table.add_child_table(table, 'parent_id')
+        return table
+
+    level = [make_table('t0', None)]
+    for level_number in range(1, depth):
+        next_level = []
+        for parent_table in level:
+            for i in range(fan_out):
+                next_level.append(make_table(f'{parent_table.table_id}_{i}', parent_table))
+        level = next_level
+
+    return tables
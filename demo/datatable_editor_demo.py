@@ -1,10 +1,15 @@
 #%% Simple demo for running Datatable editor
+import logging
+import sys
 
 from datatable_editor.core import DatatableEditor
 
 # Import example data
 from datatable_editor.demo_data import display_tables_dict
 
+# Log the callbacks of the editor
+logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
+
 # Initiated editor object
 editor = DatatableEditor(datatables=display_tables_dict, port=1000, debug=False)
 
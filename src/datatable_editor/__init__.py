@@ -0,0 +1,35 @@
+"""
+Editor of hierarchies of related tables
+
+The names below are imported when they are first used -> `from datatable_editor import RelationalDf` only imports
+pandas, the Dash UI (dash, dash_bootstrap_components, flask) is imported by the first use of DatatableEditor.
+"""
+import importlib
+
+# Public name -> module defining it
+_EXPORTS = {
+    'DatatableEditor': 'datatable_editor.core',
+    'RelationalDf': 'datatable_editor.relational_df',
+    'ArrowSource': 'datatable_editor.sources',
+    'SqlSource': 'datatable_editor.sources',
+    'TableChanges': 'datatable_editor.changes',
+    'ChangeLog': 'datatable_editor.changes',
+    'read_tables': 'datatable_editor.bulk_io',
+    'write_tables': 'datatable_editor.bulk_io',
+    'validate_tables': 'datatable_editor.integrity',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'datatable_editor' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    # Cache in the package -> later lookups don't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+AGGREGATE_FUNCTIONS = ('sum', 'count', 'min', 'max', 'mean')
+
+
+class Aggregate:
+    def __init__(self, child_table, foreign_key_column, column, function):
+        """
+        Aggregate of a column of a child table per row of the parent table (e.g. total power of the appliances of
+        every user) -> computed once with a vectorized groupby, then updated from the edits of the child rows: sums
+        and counts by the values of the changed rows, min and max by recomputing only the parents of removed rows.
+        Child tables held by a database (see SqlSource) are aggregated by the database on every read instead.
+
+        :param child_table: RelationalDf of the aggregated rows
+        :param foreign_key_column: foreign key column of child_table pointing to the parent table
+        :param column: aggregated column of child_table -> count counts its non-missing values
+        :param function: one of AGGREGATE_FUNCTIONS
+        """
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unknown aggregate function '{function}' -> one of {', '.join(AGGREGATE_FUNCTIONS)}")
+        if column not in child_table.columns:
+            raise KeyError(f"'{column}' is not a column of table '{child_table.table_id}'")
+        self.child_table = child_table
+        self.foreign_key_column = foreign_key_column
+        self.column = column
+        self.function = function
+
+        # Per parent id -> sums and counts of the values (sum, count, mean) or the extreme value (min, max)
+        self._sums = {}
+        self._counts = {}
+        self._extremes = {}
+
+    def _group(self, rows):
+        # Aggregates of rows per foreign key value -> pd.DataFrame indexed by the foreign key
+        grouped = rows.groupby(self.foreign_key_column, sort=False)[self.column]
+        if self.function in ('min', 'max'):
+            return grouped.agg(self.function).dropna().to_frame('extreme')
+        if self.function == 'count':
+            # Values of any type can be counted, but not summed
+            return grouped.count().to_frame('count').assign(sum=0)
+        return grouped.agg(['sum', 'count'])
+
+    def build(self):
+        """
+        (Re)compute the aggregates of all parents from scratch
+        """
+        self._sums, self._counts, self._extremes = {}, {}, {}
+        if self.child_table.pushdown:
+            return
+        rows = pd.DataFrame({self.foreign_key_column: self.child_table.get_column(self.foreign_key_column),
+                             self.column: self.child_table.get_column(self.column)})
+        groups = self._group(rows)
+        if self.function in ('min', 'max'):
+            self._extremes = dict(zip(groups.index.tolist(), groups['extreme'].tolist()))
+        else:
+            self._sums = dict(zip(groups.index.tolist(), groups['sum'].tolist()))
+            self._counts = dict(zip(groups.index.tolist(), groups['count'].tolist()))
+
+    def update(self, removed=None, added=None):
+        """
+        Update the aggregates after rows of the child table changed -> only the parents of the rows are touched
+        :param removed: pd.DataFrame with the old values of deleted or changed child rows
+        :param added: pd.DataFrame with the new values of added or changed child rows
+        """
+        if self.function in ('min', 'max'):
+            self._update_extremes(removed, added)
+            return
+
+        for rows, sign in ((removed, -1), (added, 1)):
+            if rows is None or len(rows.index) == 0:
+                continue
+            groups = self._group(rows)
+            for key, value_sum, count in zip(groups.index.tolist(), groups['sum'].tolist(),
+                                             groups['count'].tolist()):
+                new_count = self._counts.get(key, 0) + sign * count
+                if new_count > 0:
+                    self._sums[key] = self._sums.get(key, 0) + sign * value_sum
+                    self._counts[key] = new_count
+                else:
+                    self._sums.pop(key, None)
+                    self._counts.pop(key, None)
+
+    def _update_extremes(self, removed, added):
+        recomputed = set()
+        if removed is not None and len(removed.index) > 0:
+            # Removing a value can only be undone by looking at the remaining rows of its parents
+            keys = pd.unique(removed[self.foreign_key_column].dropna()).tolist()
+            rows = self.child_table.get_rows_where_in(self.foreign_key_column, keys)
+            for key in keys:
+                self._extremes.pop(key, None)
+            if len(rows.index) > 0:
+                groups = self._group(rows)
+                self._extremes.update(zip(groups.index.tolist(), groups['extreme'].tolist()))
+            recomputed.update(keys)
+
+        if added is not None and len(added.index) > 0:
+            groups = self._group(added)
+            pick = min if self.function == 'min' else max
+            for key, value in zip(groups.index.tolist(), groups['extreme'].tolist()):
+                if key not in recomputed:
+                    self._extremes[key] = pick(self._extremes[key], value) if key in self._extremes else value
+
+    def get_values(self, parent_ids):
+        """
+        Get the aggregates of parent rows
+        :param parent_ids: pd.Series of ids of rows of the parent table
+        :return: np.ndarray (object) of the aggregates -> 0 for sum and count, None otherwise for parents without
+            child rows
+        """
+        if self.child_table.pushdown:
+            return self._query_values(parent_ids)
+
+        if self.function in ('min', 'max'):
+            values = self._lookup(self._extremes, parent_ids)
+        elif self.function == 'mean':
+            values = self._lookup(self._sums, parent_ids) / self._lookup(self._counts, parent_ids)
+        else:
+            values = self._lookup(self._sums if self.function == 'sum' else self._counts, parent_ids)
+        return self._format(values)
+
+    @staticmethod
+    def _lookup(values_by_id, parent_ids):
+        # One dict lookup per row -> Series.map would convert the whole dict first
+        return pd.Series([values_by_id.get(key, np.nan) for key in parent_ids.tolist()], index=parent_ids.index,
+                         dtype=object)
+
+    def _query_values(self, parent_ids):
+        # Aggregate the child rows of the passed parents only
+        rows = self.child_table.get_rows_where_in(self.foreign_key_column, parent_ids.dropna().tolist())
+        groups = self._group(rows)
+        if self.function in ('min', 'max'):
+            values = parent_ids.map(groups['extreme'])
+        elif self.function == 'mean':
+            values = parent_ids.map(groups['sum'] / groups['count'])
+        else:
+            values = parent_ids.map(groups['sum' if self.function == 'sum' else 'count'])
+        return self._format(values)
+
+    def _format(self, values):
+        # Parents without child rows -> 0 for sum and count, None otherwise
+        missing = values.isna().to_numpy()
+        values = values.to_numpy(dtype=object)
+        if self.function in ('sum', 'count'):
+            values[missing] = 0
+            if self.function == 'count' or pd.api.types.is_integer_dtype(self.child_table.dtypes[self.column]):
+                values = values.astype(np.int64).astype(object)
+        else:
+            values[missing] = None
+        return values
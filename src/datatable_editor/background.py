@@ -0,0 +1,140 @@
+import logging
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+# Dash has no public API to run background callbacks in threads of the server -> ThreadManager relies on internals of
+# the Dash version pinned in requirements.txt (callback context, manager interface). tests/test_background.py runs a
+# background callback through Dash's dispatch and fails if they change.
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from dash.exceptions import PreventUpdate
+from dash.long_callback.managers import BaseLongCallbackManager
+
+
+class JobCancelled(Exception):
+    """
+    Raised by the set_progress function of a background job that was cancelled
+    """
+
+
+class ThreadManager(BaseLongCallbackManager):
+    def __init__(self, max_workers=4, cache_by=None):
+        """
+        Manager of Dash background callbacks running the callbacks in a thread pool of this process
+        -> unlike the DiskcacheManager, background callbacks work on the same tables as the other callbacks and no
+        broker or cache is needed. Threads can't be killed: a cancelled job stops at its next call of set_progress
+        (which raises JobCancelled).
+
+        :param max_workers: number of background callbacks running at the same time
+        :param cache_by: see BaseLongCallbackManager
+        """
+        super().__init__(cache_by)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='datatable_editor_background')
+
+        self._results = {}  # cache key -> result of the callback
+        self._progress = {}  # progress key -> last progress value
+        self._jobs = {}  # job id -> (future, cancel event)
+        self._lock = threading.Lock()
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        with self._lock:
+            future, cancelled = self._jobs.pop(job, (None, None))
+        if cancelled is not None:
+            cancelled.set()
+
+    def terminate_unhealthy_job(self, job):
+        # Jobs can't die without finishing their future
+        return False
+
+    def job_running(self, job):
+        with self._lock:
+            future, cancelled = self._jobs.get(job, (None, None))
+        return future is not None and not future.done()
+
+    def make_job_fn(self, fn, progress, key=None):
+        return _make_job_fn(fn, self, progress)
+
+    def clear_cache_entry(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job = uuid.uuid4().hex
+        cancelled = threading.Event()
+        with self._lock:
+            future = self._executor.submit(job_fn, key, self._make_progress_key(key), args, context, cancelled)
+            self._jobs[job] = (future, cancelled)
+        return job
+
+    def set_progress(self, progress_key, progress_value):
+        with self._lock:
+            self._progress[progress_key] = progress_value
+
+    def set_result(self, key, result):
+        with self._lock:
+            self._results[key] = result
+
+    def get_progress(self, key):
+        with self._lock:
+            return self._progress.pop(self._make_progress_key(key), None)
+
+    def result_ready(self, key):
+        with self._lock:
+            return key in self._results
+
+    def get_result(self, key, job):
+        with self._lock:
+            result = self._results.get(key, self.UNDEFINED)
+            if result is self.UNDEFINED:
+                return self.UNDEFINED
+            # Keep the result if caching
+            if self.cache_by is None:
+                del self._results[key]
+            self._progress.pop(self._make_progress_key(key), None)
+
+        if job:
+            self.terminate_job(job)
+        return result
+
+
+def _make_job_fn(fn, manager, progress):
+    def job_fn(result_key, progress_key, user_callback_args, context, cancelled):
+        def set_progress(progress_value):
+            if cancelled.is_set():
+                raise JobCancelled()
+            if not isinstance(progress_value, (list, tuple)):
+                progress_value = [progress_value]
+            manager.set_progress(progress_key, progress_value)
+
+        maybe_progress = [set_progress] if progress else []
+
+        def run():
+            callback_context = AttributeDict(**context)
+            callback_context.ignore_register_page = False
+            context_value.set(callback_context)
+            try:
+                if isinstance(user_callback_args, dict):
+                    result = fn(*maybe_progress, **user_callback_args)
+                elif isinstance(user_callback_args, (list, tuple)):
+                    result = fn(*maybe_progress, *user_callback_args)
+                else:
+                    result = fn(*maybe_progress, user_callback_args)
+            except JobCancelled:
+                # No result -> Dash doesn't update the outputs of a cancelled job
+                logging.debug(f'Background job {result_key} cancelled')
+            except PreventUpdate:
+                manager.set_result(result_key, {'_dash_no_update': '_dash_no_update'})
+            except Exception as err:
+                manager.set_result(result_key, {'long_callback_error': {'msg': str(err),
+                                                                        'tb': traceback.format_exc()}})
+            else:
+                manager.set_result(result_key, result)
+
+        copy_context().run(run)
+
+    return job_fn
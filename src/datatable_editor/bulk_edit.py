@@ -0,0 +1,156 @@
+import pandas as pd
+
+from datatable_editor.changes import TableChanges, apply_changes
+from datatable_editor.serialization import to_records
+
+
+def _query_ids(relational_df, filter_query=None, column_resolver=None):
+    # Ids of the rows matching a filter_query -> only the id column is read, the matching rows are not copied
+    if relational_df.pushdown:
+        return relational_df.query_rows(filter_query, column_resolver)['id'].tolist()
+    ids = relational_df.get_column('id').to_numpy()
+    if filter_query:
+        ids = ids[relational_df.query_row_positions(filter_query, column_resolver=column_resolver)]
+    return ids.tolist()
+
+
+def _apply(table_changes):
+    # Apply a bulk edit to the tables directly
+    for table, changes in table_changes:
+        apply_changes(table, changes)
+    return [changes for table, changes in table_changes]
+
+
+def value_changes(relational_df, values, filter_query=None, column_resolver=None):
+    """
+    Get the changes setting columns to fixed values for all rows matching a filter_query without applying them
+    -> DatatableEditor.apply_bulk_edit applies them to the tables of a session (checked, undoable and saved like the
+    edits in the tables)
+
+    :param relational_df: RelationalDf to edit
+    :param values: dict of column -> new value
+    :param filter_query: datatable filter_query selecting the rows -> all rows if None
+    :param column_resolver: optional function mapping datatable column ids to df column names
+    :return: list with one (RelationalDf, TableChanges)
+    """
+    # The rows share one dict of the new values
+    updated = dict.fromkeys(_query_ids(relational_df, filter_query, column_resolver), dict(values))
+    return [(relational_df, TableChanges(relational_df.table_id, updated=updated))]
+
+
+def set_values(relational_df, values, filter_query=None, column_resolver=None):
+    """
+    Set columns to fixed values for all rows matching a filter_query (see value_changes)
+    :return: applied TableChanges
+    """
+    return _apply(value_changes(relational_df, values, filter_query, column_resolver))[0]
+
+
+def expression_changes(relational_df, column, expression, filter_query=None, column_resolver=None):
+    """
+    Get the changes setting a column to the result of an arithmetic expression for all rows matching a filter_query
+    without applying them -> evaluated vectorized with DataFrame.eval on the selected rows, e.g. 'power * 1.1' or
+    'end - start'
+
+    :param relational_df: RelationalDf to edit
+    :param column: column to set
+    :param expression: expression of the columns of the table (see pandas.DataFrame.eval)
+    :param filter_query: datatable filter_query selecting the rows -> all rows if None
+    :param column_resolver: optional function mapping datatable column ids to df column names
+    :return: list with one (RelationalDf, TableChanges)
+    """
+    df = relational_df.query_rows(filter_query, column_resolver)
+    # Constant expressions evaluate to a scalar
+    new_values = pd.Series(df.eval(expression), index=df.index)
+    return [(relational_df, TableChanges(relational_df.table_id, updated={
+        row_id: {column: value} for row_id, value in zip(df['id'].tolist(), new_values.tolist())
+    }))]
+
+
+def apply_expression(relational_df, column, expression, filter_query=None, column_resolver=None):
+    """
+    Set a column to the result of an arithmetic expression for all rows matching a filter_query (see
+    expression_changes)
+    :return: applied TableChanges
+    """
+    return _apply(expression_changes(relational_df, column, expression, filter_query, column_resolver))[0]
+
+
+def _child_relations(relational_df):
+    # (child table, foreign key column) of every child table
+    return [(child_table, child_table.parent_tables[relational_df.table_id][1])
+            for child_table in relational_df.child_tables.values()]
+
+
+def duplication_changes(relational_df, row_ids):
+    """
+    Get the changes duplicating rows together with all their descendants in the child tables without applying them
+    -> the copies get new ids, the foreign keys of the copied child rows point to the copied parent rows
+
+    :param relational_df: RelationalDf of the rows
+    :param row_ids: ids of the rows to duplicate
+    :return: list of (RelationalDf, TableChanges) in the order they must be applied (parent tables first)
+    """
+    insertions = []
+
+    def duplicate(table, rows, foreign_key_column=None, parent_id_map=None, path=()):
+        if len(rows.index) == 0 or table.table_id in path:
+            return
+        new_ids = table.next_ids(len(rows.index))
+        new_rows = rows.copy()
+        new_rows['id'] = new_ids
+        if foreign_key_column is not None:
+            new_rows[foreign_key_column] = new_rows[foreign_key_column].map(parent_id_map)
+        insertions.append((table, TableChanges(table.table_id, inserted=to_records(new_rows))))
+
+        id_map = dict(zip(rows['id'].tolist(), new_ids.tolist()))
+        for child_table, child_foreign_key_column in _child_relations(table):
+            duplicate(child_table, child_table.get_rows_where_in(child_foreign_key_column, list(id_map)),
+                      child_foreign_key_column, id_map, path + (table.table_id,))
+
+    labels = [label for label in relational_df.get_row_labels(row_ids) if label is not None]
+    duplicate(relational_df, relational_df.get_rows(labels))
+    return insertions
+
+
+def duplicate_rows(relational_df, row_ids):
+    """
+    Duplicate rows together with all their descendants in the child tables (see duplication_changes)
+    :return: list of applied TableChanges (parent tables first)
+    """
+    return _apply(duplication_changes(relational_df, row_ids))
+
+
+def cascade_deletions(relational_df, row_ids):
+    """
+    Get the deletions of rows together with all their descendants in the child tables without applying them
+
+    :param relational_df: RelationalDf of the rows
+    :param row_ids: ids of the rows to delete
+    :return: list of (RelationalDf, TableChanges) in the order they must be applied (child tables first)
+    """
+    deletions = []
+
+    def collect(table, ids, path=()):
+        if not ids or table.table_id in path:
+            return
+        for child_table, child_foreign_key_column in _child_relations(table):
+            child_ids = child_table.get_rows_where_in(child_foreign_key_column, ids)['id'].tolist()
+            collect(child_table, child_ids, path + (table.table_id,))
+        deletions.append((table, TableChanges(table.table_id, deleted=list(ids))))
+
+    collect(relational_df, [row_id for row_id, label in zip(row_ids, relational_df.get_row_labels(row_ids))
+                            if label is not None])
+    return deletions
+
+
+def cascade_delete(relational_df, row_ids):
+    """
+    Delete rows together with all their descendants in the child tables
+
+    :param relational_df: RelationalDf of the rows
+    :param row_ids: ids of the rows to delete
+    :return: list of applied TableChanges (child tables first)
+    """
+    # Descendants are deleted before their parents -> no rows point to deleted rows at any time
+    return _apply(cascade_deletions(relational_df, row_ids))
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from datatable_editor.relational_df import RelationalDf
+from datatable_editor.sources import ArrowSource
+
+# Name of the file describing the tables and relations of a directory
+MANIFEST = 'manifest.json'
+
+FILE_EXTENSIONS = {
+    'parquet': '.parquet',
+    'csv': '.csv',
+}
+
+
+def _write_table(table, path, file_format):
+    logging.debug(f'Write table {table.table_id} to {path}')
+    if file_format == 'parquet':
+        table.df.to_parquet(path)
+    else:
+        table.df.to_csv(path, index=False)
+
+
+def write_tables(datatables, directory, file_format='parquet', max_workers=None):
+    """
+    Write a hierarchy of RelationalDfs to a directory -> one file per table and a manifest with the tables, their
+    dtypes and the relations between them (see read_tables)
+
+    :param datatables: dict of RelationalDfs -> {table_id: RelationalDf}
+    :param directory: directory to write to (created if it doesn't exist)
+    :param file_format: 'parquet' or 'csv'
+    :param max_workers: number of tables written in parallel -> if None, the ThreadPoolExecutor default
+    """
+    if file_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Unknown file format '{file_format}' -> 'parquet' or 'csv'")
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {'tables': [], 'relations': []}
+    for table_id, table in datatables.items():
+        manifest['tables'].append({
+            'table_id': table.table_id,
+            'table_name': table.table_name,
+            'file': f'{table_id}{FILE_EXTENSIONS[file_format]}',
+            'dtypes': {column: str(dtype) for column, dtype in table.dtypes.items()},
+        })
+        # Relations are recorded at the child table -> only relations between the written tables
+        for parent_table_id, (parent_table, foreign_key_column) in table.parent_tables.items():
+            if parent_table_id in datatables:
+                manifest['relations'].append(
+                    {'parent': parent_table_id, 'child': table_id, 'foreign_key': foreign_key_column})
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(_write_table, datatables[entry['table_id']],
+                                   os.path.join(directory, entry['file']), file_format)
+                   for entry in manifest['tables']]
+        for future in futures:
+            future.result()
+
+    # Manifest is written last -> a directory with a manifest is complete
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _read_table(path, dtypes, lazy):
+    logging.debug(f'Read table from {path}')
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        # Types are taken from the manifest -> not inferred from the file
+        dtypes = dtypes or {}
+        parse_dates = [column for column, dtype in dtypes.items() if dtype.startswith('datetime64')]
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column not in parse_dates}
+        return pd.read_csv(path, dtype=dtypes, parse_dates=parse_dates)
+    if lazy:
+        return ArrowSource(path)
+    return pd.read_parquet(path)
+
+
+def read_tables(directory, lazy=False, compact=False, max_workers=None):
+    """
+    Read a hierarchy of RelationalDfs written by write_tables -> the tables are read in parallel, the relations
+    between them are re-created
+
+    :param directory: directory containing the manifest and the table files
+    :param lazy: If True, Parquet files are not read but used as lazy data sources (see ArrowSource)
+    :param compact: If True, the dfs are stored with memory-compact dtypes (see compact_df)
+    :param max_workers: number of tables read in parallel -> if None, the ThreadPoolExecutor default
+    :return: dict of RelationalDfs in the order of the manifest -> {table_id: RelationalDf}
+    """
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(_read_table, os.path.join(directory, entry['file']), entry.get('dtypes'), lazy)
+                   for entry in manifest['tables']]
+        dfs = [future.result() for future in futures]
+
+    datatables = {}
+    for entry, df in zip(manifest['tables'], dfs):
+        datatables[entry['table_id']] = RelationalDf(entry['table_id'], entry.get('table_name', entry['table_id']),
+                                                     df, compact=compact)
+
+    for relation in manifest.get('relations', []):
+        datatables[relation['parent']].add_child_table(datatables[relation['child']], relation['foreign_key'])
+
+    return datatables
@@ -0,0 +1,158 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class TableChanges:
+    def __init__(self, table_id, inserted=None, updated=None, deleted=None):
+        """
+        Changes of the rows of one table, keyed by the 'id' column
+
+        :param table_id: table_id of the RelationalDf the changes belong to
+        :param inserted: list of inserted rows (dicts column -> value)
+        :param updated: dict of updated rows -> {row_id: {column: new_value}}
+        :param deleted: list of ids of deleted rows
+        """
+        self.table_id = table_id
+        self.inserted = inserted or []
+        self.updated = updated or {}
+        self.deleted = deleted or []
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def __repr__(self):
+        return (f'TableChanges({self.table_id!r}, inserted={len(self.inserted)}, updated={len(self.updated)}, '
+                f'deleted={len(self.deleted)})')
+
+    def to_dict(self):
+        return {
+            'table_id': self.table_id,
+            'inserted': self.inserted,
+            'updated': [{'id': row_id, 'values': values} for row_id, values in self.updated.items()],
+            'deleted': self.deleted,
+        }
+
+    @classmethod
+    def from_dict(cls, changes_dict):
+        return cls(changes_dict['table_id'],
+                   inserted=changes_dict['inserted'],
+                   updated={row['id']: row['values'] for row in changes_dict['updated']},
+                   deleted=changes_dict['deleted'])
+
+
+def compute_changes(relational_df, records, scope_ids=None):
+    """
+    Compare rows edited in the datatable with the df of a RelationalDf
+    -> only the compared rows are looked up in the df (id index), the rest of the df is not touched
+
+    :param relational_df: RelationalDf the rows belong to
+    :param records: list of rows (dicts df column -> value) as currently displayed
+    :param scope_ids: ids of the rows the records were loaded from -> ids in scope_ids missing in records are
+        deleted. If None, records are the complete table.
+    :return: TableChanges
+    """
+    changes = TableChanges(relational_df.table_id)
+
+    record_ids = [record['id'] for record in records]
+    labels = relational_df.get_row_labels(record_ids)
+
+    # Rows not in the df yet
+    changes.inserted = [record for record, label in zip(records, labels) if label is None]
+
+    # Rows no longer displayed
+    record_id_set = set(record_ids)
+    if scope_ids is None:
+        scope_ids = relational_df.get_column('id').tolist()
+    scope_ids = list(scope_ids)
+    changes.deleted = [row_id for row_id, label in zip(scope_ids, relational_df.get_row_labels(scope_ids))
+                       if row_id not in record_id_set and label is not None]
+
+    # Changed cells of existing rows -> vectorized comparison of the displayed and the stored values
+    existing = [(record, label) for record, label in zip(records, labels) if label is not None]
+    if existing:
+        columns = [c for c in relational_df.columns if c != 'id']
+        new_values = pd.DataFrame([record for record, label in existing], columns=columns)
+        existing_labels = [label for record, label in existing]
+        old_values = relational_df.get_rows(existing_labels).loc[existing_labels, columns]
+        missing = new_values.isna().to_numpy() & old_values.isna().to_numpy()
+        changed = (new_values.to_numpy() != old_values.to_numpy()) & ~missing
+        # Columns not contained in the records are not compared
+        changed &= np.array([c in existing[0][0] for c in columns])
+
+        for i, j in zip(*np.nonzero(changed)):
+            record = existing[i][0]
+            changes.updated.setdefault(record['id'], {})[columns[j]] = record[columns[j]]
+
+    return changes
+
+
+def apply_changes(relational_df, changes):
+    """
+    Apply changes in place to the df of a RelationalDf (indexes are updated incrementally)
+    -> tables held by a database are changed in one transaction
+    :param relational_df: RelationalDf to change
+    :param changes: TableChanges
+    """
+    with relational_df.transaction():
+        if changes.deleted:
+            relational_df.delete_rows(changes.deleted)
+        if changes.updated:
+            relational_df.update_rows(changes.updated)
+        if changes.inserted:
+            relational_df.add_rows(changes.inserted)
+
+
+def _json_default(value):
+    # numpy scalars and pandas timestamps can't be serialized by json
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class ChangeLog:
+    def __init__(self, path):
+        """
+        Append-only log of TableChanges in a JSON lines file
+        -> saving only writes the changes, not the whole tables
+
+        :param path: path of the log file
+        """
+        self.path = path
+
+    def append(self, changes_list):
+        """
+        Append changes to the log file
+        :param changes_list: list of TableChanges
+        :return: number of changes written
+        """
+        timestamp = time.time()
+        lines = [json.dumps(dict(changes.to_dict(), timestamp=timestamp), default=_json_default)
+                 for changes in changes_list if changes]
+        if lines:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        return len(lines)
+
+    def read(self):
+        """
+        Read all changes from the log file
+        :return: list of TableChanges in the order they were saved
+        """
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            return [TableChanges.from_dict(json.loads(line)) for line in f if line.strip()]
+
+    def replay(self, datatables):
+        """
+        Apply all logged changes to the tables -> restores the saved state on top of the original data
+        :param datatables: dict of RelationalDfs -> {table_id: RelationalDf}
+        """
+        for changes in self.read():
+            apply_changes(datatables[changes.table_id], changes)
@@ -1,45 +1,195 @@
+import logging
 import os
 import signal
+import threading
 import pandas as pd
 
 import dash_bootstrap_components as dbc
-from flask import Flask
+from flask import Flask, Response, abort, request, stream_with_context
 
-from dash import Dash, dash_table, html, ALL, Input, Output, State, no_update, ctx, MATCH
-from copy import deepcopy
+from dash import Dash, dash_table, dcc, html, ALL, Input, Output, State, no_update, ctx, MATCH, Patch
 
-pd.options.mode.chained_assignment = None  # default='warn'
-from copy import deepcopy
+from datatable_editor.background import ThreadManager
+from datatable_editor.bulk_edit import cascade_deletions
+from datatable_editor.changes import TableChanges, ChangeLog, compute_changes, apply_changes
+from datatable_editor.integrity import Violation, validate_changes, without_violations
+from datatable_editor.operation_log import OperationLog
+from datatable_editor.instrumentation import CallbackMetrics, annotate_callback
+from datatable_editor.serving import serve
+from datatable_editor.serialization import to_records, iter_json_records
+from datatable_editor.relational_df import ANCESTOR_COLUMN_PREFIX
+from datatable_editor.session_store import Session, SessionStore
 
-import logging, sys
 
-logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
+def get_df_column(column_id):
+    """
+    Get the dataframe column displayed in the datatable column with the passed id
+    :param column_id: id of the datatable column
+    :return: name of the dataframe column or None if the datatable column is a "button" column -> aggregate
+        ('!agg_') columns are virtual columns of the RelationalDf, they can be filtered and sorted by
+    """
+    if column_id.startswith(('!child_', '!desc_')):
+        return None
+    if column_id.startswith('!fk_'):
+        return column_id[4:]
+    return column_id
+
+
+def coerce_value(value, dtype):
+    """
+    Convert a value entered in the datatable (usually a string) to the dtype of the dataframe column
+    :param value: value to convert
+    :param dtype: dtype of the dataframe column
+    :return: converted value -> None for empty cells, values of other columns (text, categories, ...) are unchanged
+    :raises ValueError: if the value can't be converted to a numeric dtype
+    """
+    if value is None or value == "":
+        return None
+    try:
+        if pd.api.types.is_integer_dtype(dtype):
+            return int(value)
+        if pd.api.types.is_float_dtype(dtype):
+            return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{value!r} is not a {dtype} value') from None
+    return value
 
 
 class DatatableEditor:
-    def __init__(self, datatables, port, debug=False):
+    def __init__(self, datatables, port, debug=False, server_side=False, page_size=10, save_path=None,
+                 max_sessions=None, session_spill_dir=None, metrics=False, metrics_log_level=logging.DEBUG,
+                 virtualization=False, window_size=1000, table_height=600, row_height=30, background=False,
+                 background_manager=None, validate=True, on_delete='restrict', max_operations=10000):
         """
 
         :param datatables: Dict of RelationalDfs to display as datatables
         :param port: Port at which dash app will be started
+        :param server_side: If True, paging, sorting and filtering of the tables is done on the server
+            -> only the currently displayed page of each table is sent to the browser
+        :param page_size: Number of rows per page of the tables
+        :param save_path: Path of the change log file the "Save data" button appends the changes of the tables to
+            -> if None, saving is disabled
+        :param max_sessions: If set, every page load starts a session with its own working copies of the tables,
+            at most max_sessions are kept in memory -> if None, all page loads work on datatables directly
+        :param session_spill_dir: Directory sessions evicted from memory are written to (see SessionStore)
+            -> the undo history of the sessions is spilled there as well
+        :param metrics: If True, duration and payload size of every callback are recorded
+            -> exposed at /metrics in the Prometheus text format (see CallbackMetrics)
+        :param metrics_log_level: Level of the log record written per callback if metrics are enabled
+        :param virtualization: If True, the tables are scrollable and only the rows in the viewport are rendered
+            -> the rows are fed from the server in windows of window_size rows, the browser scrolls through one
+            window and switches to the next one with the pager, not by scrolling (implies server_side=True)
+        :param window_size: Number of rows per window in virtualization mode (replaces page_size)
+        :param table_height: Height of the scrollable tables in virtualization mode in px
+        :param row_height: Fixed height of the rows in virtualization mode in px
+        :param background: If True, saving runs as a Dash background callback -> the app stays responsive, the
+            progress is displayed and saving can be cancelled
+        :param background_manager: Manager of the background callbacks -> if None, a ThreadManager (background
+            callbacks run in a thread pool of the server process)
+        :param validate: If True, edits are checked for unique ids and foreign keys pointing to existing rows before
+            they are applied -> rows with violations are rejected (see integrity.validate_changes)
+        :param on_delete: What happens to the child rows of deleted rows (only if validate is True)
+            -> 'restrict': rows with child rows can't be deleted, 'cascade': they are deleted as well (opt-in, a
+            deletion may remove rows of other tables that are not displayed)
+        :param max_operations: Number of edit operations (changed cells, inserted and deleted rows) the undo history
+            of a session keeps in memory -> older ones are spilled to session_spill_dir (if set) or discarded
         """
         self.datatables = datatables
         self.port = port
         self.debug = debug
+        self.server_side = server_side or virtualization
+        self.virtualization = virtualization
+        # In virtualization mode a page is a window of rows the browser scrolls through -> windows are switched
+        # with the pager
+        self.page_size = window_size if virtualization else page_size
+        self.table_height = table_height
+        self.row_height = row_height
+
+        self.change_log = ChangeLog(save_path) if save_path is not None else None
+
+        if on_delete not in ('cascade', 'restrict'):
+            raise ValueError(f"Unknown on_delete '{on_delete}' -> 'cascade' or 'restrict'")
+        self.validate = validate
+        self.on_delete = on_delete
+
+        # Edit state of the sessions -> without session store there is a single session working on datatables
+        if max_sessions is not None:
+            self.session_store = SessionStore(datatables, max_sessions, session_spill_dir, max_operations)
+        else:
+            self.session_store = None
+            operations_spill_path = None
+            if session_spill_dir is not None:
+                os.makedirs(session_spill_dir, exist_ok=True)
+                operations_spill_path = os.path.join(session_spill_dir, 'operations')
+            self.default_session = Session(None, datatables, OperationLog(max_operations, operations_spill_path))
+
+        # Background callbacks must work on the tables of this process -> by default they run in threads
+        self.background_manager = None
+        if background:
+            self.background_manager = background_manager if background_manager is not None else ThreadManager()
+
+        # Edits of the tables -> callbacks run concurrently when served with multiple threads (see serve)
+        self.edit_lock = threading.RLock()
 
         # Create app
         self.app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        # WSGI app -> e.g. `gunicorn my_module:editor.server`
+        self.server = self.app.server
 
-        # Generate initial layout
-        self.create_layout()
+        # Instrument the callback requests
+        self.metrics = None
+        if metrics:
+            self.metrics = CallbackMetrics(metrics_log_level)
+            self.metrics.init_app(self.app)
+
+        # Generate initial layout -> generated on every page load
+        self.app.layout = self.serve_layout
 
         # Setup callbacks
         self.set_table_actions_callbacks()
 
+        # Setup routes to download table data
+        self.set_data_routes()
+
     def run_app(self):
         self.app.run_server(debug=self.debug, port=self.port)
 
-    def create_layout(self):
+    def serve(self, host='127.0.0.1', workers=1, threads=8, options=None, sticky_sessions=False):
+        """
+        Serve the app for production instead of the development server (see datatable_editor.serving.serve)
+        :param host: interface to listen on
+        :param workers: number of worker processes -> for workers > 1, all tables must be held by a database (see
+            SqlSource) and the requests of a browser must be routed to the same worker (sticky_sessions)
+        :param threads: number of threads per worker process
+        :param options: further gunicorn settings (only with workers > 1)
+        :param sticky_sessions: True if the requests of a browser are always routed to the same worker
+        """
+        serve(self, host, self.port, workers, threads, options, sticky_sessions)
+
+    def get_session(self, session_id):
+        """
+        Get the edit state of a session
+        :param session_id: id of the session (stored in the browser)
+        :return: Session -> responds with 400 if sessions are enabled and the id wasn't issued by serve_layout or
+            the session expired (see SessionStore)
+        """
+        if self.session_store is None:
+            return self.default_session
+        try:
+            return self.session_store.get_session(session_id)
+        except KeyError as e:
+            # Only live sessions started by serve_layout are accepted -> the page must be reloaded
+            abort(400, e.args[0])
+
+    def serve_layout(self):
+        """
+        Layout served on every page load -> starts a new session if sessions are enabled
+        """
+        if self.session_store is None:
+            return self.create_layout(self.default_session)
+        return self.create_layout(self.session_store.create_session())
+
+    def create_layout(self, session):
 
         # --- Generate initial view containing all tables to display ---
         # -> only first table is visible, others are hidden in the beginning
@@ -47,71 +197,53 @@ class DatatableEditor:
         tables_view = []
         table_number = 0  # counter for positions of table
         # Loop through all tables to display
-        for table_id, table_relational_df in self.datatables.items():
-
-            # Create copy of the dataframe
-            df = table_relational_df.df.copy()
+        for table_id, table_relational_df in session.datatables.items():
 
             # TODO give ability to define column display names -> to be displayed to user and not equal to actual df columns
+            columns = self.get_table_columns(table_relational_df)
+
+            # Only the first table is filled with data on load -> other tables are empty placeholders, their data is
+            # loaded when they are revealed (see set_table_actions_callbacks)
+            if self.server_side:
+                table_actions = dict(page_action='custom', sort_action='custom', filter_action='custom', page_count=1)
+                if table_number == 0:
+                    # Only send the first page of the table -> further pages are queried by update_table_page
+                    page_df, table_actions['page_count'] = table_relational_df.query_page(0, self.page_size)
+                    data = self.get_table_records(table_relational_df, page_df)
+                else:
+                    data = []
+            else:
+                table_actions = dict(page_action='native', sort_action='native', filter_action='native')
+                if table_number == 0:
+                    data = self.get_table_records(table_relational_df, table_relational_df.df)
+                else:
+                    data = []
 
-            # Get this relational_df's foreign key columns -> to not display them
-            foreign_key_columns = []
-            for parent_table in table_relational_df.parent_tables.values():
-                foreign_key_columns.append(parent_table[1])
-
-            # Get this tables original columns
-            original_columns = []
-            for c in df.columns:
-                if c == 'id':  # If column is ID column...
-                    original_columns.append(
-                        {"name": c, "id": c, "editable": False}  # ...it is NOT editable
-                    )
-                elif c in foreign_key_columns:  # If column is foreign_key column
-                    original_columns.append(
-                        {"name": c, "id": "!fk_" + c, "editable": True}  # ...it is NOT editable and has prefix in id
-                    )
-                else:  # Every regular column...
-                    original_columns.append(
-                        {"name": c, "id": c, "editable": True}  # ...is editable
-                    )
-
-            # Add !fk prefix to df foreign key columns to oad data correctly
-            df = df.rename(columns={c: '!fk_' + c for c in df.columns if c in foreign_key_columns})
-
-            # Create new "button" column for this table -> to link to child tables
-            child_table_columns = []
-
-            # Create button column for every child table of this dataframe
-            for child_table_id, child_table_relational_df in table_relational_df.child_tables.items():
-                child_table_columns.append(
-                    {'name': child_table_relational_df.table_name,  # Column name is child_table name
-                     'id': "!child_" + str(child_table_id),
-                     'editable': False  # "Button column" is not editable
-                     }
-                )  # Column ID is identifier + child_table id
-                # Add "button text" to display in the button column
-                if len(df.index) > 0:  # only if the table to display is not empty
-                    df.loc[:, "!child_" + str(child_table_id)] = 'Click me!'
-
-            # Add original and custom created child_table columns
-            columns = original_columns + child_table_columns
+            if self.virtualization:
+                # Virtualization requires fixed row heights and column widths -> rows can be positioned without
+                # rendering them
+                cell_style = {'height': f'{self.row_height}px', 'lineHeight': f'{self.row_height}px',
+                              'overflow': 'hidden', 'textOverflow': 'ellipsis', 'whiteSpace': 'nowrap',
+                              'minWidth': '120px', 'width': '120px', 'maxWidth': '120px'}
+                table_actions.update(virtualization=True, fixed_rows={'headers': True}, style_cell=cell_style,
+                                     style_table={'height': f'{self.table_height}px', 'overflowY': 'auto'})
 
             # Generate dash datatable object
             table = dash_table.DataTable(
                 id={"type": "table", "table_id": table_relational_df.table_id, "table_number": table_number},
                 columns=columns,
-                data=df.to_dict("records"),
-                page_size=10,
-                sort_action="native",
+                data=data,
+                page_size=self.page_size,
                 active_cell=None,
                 editable=True,
-                filter_action="native",
+                filter_query='',
                 sort_mode='multi',
+                sort_by=[],
                 row_selectable='multi',
                 row_deletable=True,
                 selected_rows=[],
-                page_action='native',
                 page_current=0,
+                **table_actions
             ),
 
             # Create new row to add to app HTML layout
@@ -141,8 +273,15 @@ class DatatableEditor:
                                 ], vertical=True),
                                 width=1)
                         ]),
-                    html.Hr()
-                ], id={'type': 'table_row_wrapper', 'table_id': table_relational_df.table_id},
+                    # Edits rejected by the integrity checks (see apply_edits)
+                    html.Small(id={'type': 'table_status', 'table_id': table_relational_df.table_id,
+                                   'table_number': table_number}, className='text-danger'),
+                    html.Hr(),
+                    # Edits of the table -> only the changed rows are sent to the server (see sync_table_edits)
+                    dcc.Store(id={'type': 'table_edits', 'table_id': table_relational_df.table_id,
+                                  'table_number': table_number}),
+                ], id={'type': 'table_row_wrapper', 'table_id': table_relational_df.table_id,
+                       'table_number': table_number},
                 style={'display': display}
             )
 
@@ -151,176 +290,780 @@ class DatatableEditor:
             table_number += 1
 
         # --- Initialize layout of navbar and page_content container ---
-        self.app.layout = dbc.Container(
+        return dbc.Container(
             [
-                dbc.ButtonGroup([dbc.Button("Save data")], id='task_bar'),  # Buttons to be displayed in top "taskbar"
+                dcc.Store(id='session_id', data=session.session_id),
+                # Displayed tables and their filter queries -> {table_id: filter_query}
+                dcc.Store(id='visible_tables', data={next(iter(session.datatables)): ''}),
+                # Foreign keys of the child tables -> {table_id: {child_table_id: foreign_key_column}}
+                dcc.Store(id='table_relations', data=self.get_table_relations(session.datatables)),
+                # Rows changed on the server (see get_changed_records) -> applied to the displayed tables in the browser
+                dcc.Store(id='table_operations'),
+                # Buttons to be displayed in top "taskbar" -> saving is only possible if a change log is set
+                dbc.ButtonGroup([dbc.Button("Undo", id='undo_button', color='secondary'),
+                                 dbc.Button("Redo", id='redo_button', color='secondary'),
+                                 dbc.Button("Save data", id='save_button', disabled=self.change_log is None)]
+                                + self.get_background_controls(), id='task_bar'),
+                html.Small(id='save_status'),
                 dbc.Row(tables_view, id='tables_wrapper')  # Containing all tables to display (most are hidden)
             ]
         )
 
+    def get_background_controls(self):
+        """
+        Cancel button and progress bar of saving in the background (see save_data) -> empty if saving runs in the
+        foreground
+        """
+        if self.background_manager is None:
+            return []
+        return [
+            dbc.Button("Cancel", id='cancel_save_button', disabled=True, color='secondary'),
+            dbc.Progress(id='save_progress', value=0, max=1, style={'width': '200px', 'margin': 'auto 10px'}),
+        ]
+
+    @staticmethod
+    def get_table_relations(datatables):
+        """
+        Foreign key columns of the child tables of every table -> used to reveal child tables in the browser
+        :param datatables: dict of RelationalDfs -> {table_id: RelationalDf}
+        :return: dict {table_id: {child_table_id: foreign_key_column}}
+        """
+        return {
+            table_id: {child_table_id: child_table.parent_tables[table_id][1]
+                       for child_table_id, child_table in table.child_tables.items()}
+            for table_id, table in datatables.items()
+        }
+
+    @staticmethod
+    def get_table_columns(table_relational_df):
+        """
+        Get the datatable columns to display for a RelationalDf
+        -> original columns of the df (foreign key columns prefixed with "!fk_") and a "button" column for every
+        child table (prefixed with "!child_")
+        :param table_relational_df: RelationalDf to display
+        :return: list of datatable column dicts
+        """
+        # Get this relational_df's foreign key columns -> to not display them
+        foreign_key_columns = []
+        for parent_table in table_relational_df.parent_tables.values():
+            foreign_key_columns.append(parent_table[1])
+
+        # Get this tables original columns
+        original_columns = []
+        for c in table_relational_df.columns:
+            if c == 'id':  # If column is ID column...
+                original_columns.append(
+                    {"name": c, "id": c, "editable": False}  # ...it is NOT editable
+                )
+            elif c in foreign_key_columns:  # If column is foreign_key column
+                original_columns.append(
+                    {"name": c, "id": "!fk_" + c, "editable": True}  # ...it is NOT editable and has prefix in id
+                )
+            else:  # Every regular column...
+                original_columns.append(
+                    {"name": c, "id": c, "editable": True}  # ...is editable
+                )
+
+        # Create new "button" column for this table -> to link to child tables
+        child_table_columns = []
+
+        # Create button column for every child table of this dataframe
+        for child_table_id, child_table_relational_df in table_relational_df.child_tables.items():
+            child_table_columns.append(
+                {'name': child_table_relational_df.table_name,  # Column name is child_table name
+                 'id': "!child_" + str(child_table_id),
+                 'editable': False  # "Button column" is not editable
+                 }
+            )  # Column ID is identifier + child_table id
+
+        # Read-only aggregate columns over the child tables (prefixed with "!agg_")
+        aggregate_columns = [{'name': name, 'id': '!agg_' + name, 'editable': False}
+                             for name in table_relational_df.aggregates]
+
+        # Add original and custom created child_table columns
+        return original_columns + child_table_columns + aggregate_columns + \
+            DatatableEditor.get_descendant_columns(table_relational_df)
+
+    @staticmethod
+    def get_descendant_columns(table_relational_df):
+        """
+        Get the "button" columns showing all rows of a table further down the hierarchy (below the child tables)
+        belonging to a row -> prefixed with "!desc_", the revealed table is filtered by the '!anc_' column of the
+        clicked table (see RelationalDf.get_ancestor_index). Not offered for tables held by a database.
+        :param table_relational_df: RelationalDf to display
+        :return: list of datatable column dicts
+        """
+        return [
+            {'name': f'all {path[-1].table_name}', 'id': '!desc_' + str(descendant_table_id), 'editable': False}
+            for descendant_table_id, path in table_relational_df.get_descendant_paths().items()
+            if len(path) > 2 and not any(table.pushdown for table in path[1:])
+        ]
+
+    @staticmethod
+    def get_df_record(table_relational_df, row, violations=None):
+        """
+        Convert a datatable record to a row of the df of a RelationalDf
+        -> strips the "!fk_" prefix, drops the "button" columns and converts the values to the column dtypes
+        :param table_relational_df: RelationalDf the row belongs to
+        :param row: datatable record
+        :param violations: list the Violations of values that can't be converted are appended to -> their cells are
+            left out of the record. If None, a ValueError is raised (see coerce_value)
+        :return: dict df column -> value
+        """
+        dtypes = table_relational_df.dtypes
+        record = {}
+        for column_id, value in row.items():
+            column = get_df_column(column_id)
+            if column not in dtypes:
+                continue
+            if column == 'id':
+                record[column] = value
+                continue
+            try:
+                record[column] = coerce_value(value, dtypes[column])
+            except ValueError as e:
+                if violations is None:
+                    raise
+                violations.append(Violation(table_relational_df.table_id, row.get('id'), column,
+                                            f"{column} of row {row.get('id')} of '{table_relational_df.table_id}': "
+                                            f"{e}"))
+        return record
+
+    @classmethod
+    def get_new_row(cls, table_relational_df, filter_query):
+        """
+        Construct the datatable record of a row added to a table
+        -> the id is the next id of the table's id sequence, the foreign keys are taken from the filter_query the
+        table was opened with (see set_table_actions_callbacks)
+        :param table_relational_df: RelationalDf the row is added to
+        :param filter_query: filter_query of the displayed table
+        :return: datatable record
+        """
+        if filter_query and ANCESTOR_COLUMN_PREFIX in filter_query:
+            # The rows below an ancestor row belong to different parent rows -> the foreign key of a new row is unknown
+            raise ValueError(f"Rows can't be added to all {table_relational_df.table_name} of a row further up -> "
+                             f"open the table from its parent row")
+
+        new_row = {}
+        for col in cls.get_table_columns(table_relational_df):
+            if col['id'].startswith(('!child_', '!desc_')):  # if column is button column
+                new_row[col['id']] = 'Click me! (added)'
+            elif col['id'].startswith('!agg_'):  # if column is aggregate column -> new row has no child rows
+                aggregate = table_relational_df.aggregates[col['id'][5:]]
+                new_row[col['id']] = aggregate.get_values(pd.Series([new_row['id']]))[0]
+            elif col['id'] == 'id':  # if column is ID column
+                # Generate ID of new element to add -> must be unique! -> next id of the table's id sequence
+                new_row[col['id']] = table_relational_df.next_id()
+            elif col['id'].startswith('!fk_'):  # if column is query column
+                if not filter_query:  # if filter_query is empty
+                    new_row[col['id']] = ""  # no value is set in this column
+                    logging.debug(f'Row added to {table_relational_df.table_id} without a foreign key in the '
+                                  f'filter query')
+                else:  # Some filter query is set
+                    # Extract part of table query of this foreign key column -> exists only once -> get first list item
+                    query = ([k for k in filter_query.split("&&") if col['id'] in k] + [''])[0]
+                    # Find the index of the equal sign
+                    index = query.find('=')
+
+                    if index == -1:  # if no equal sign is found
+                        # no value is set in this column -> foreign key columns are editable, the user sets it
+                        new_row[col['id']] = ""
+                    else:
+                        new_row[col['id']] = int(query[index + 1:])  # value is set to be the fk_id of the current query
+            else:
+                new_row[col['id']] = ""
+        return new_row
+
+    @classmethod
+    def get_table_records(cls, table_relational_df, df):
+        """
+        Convert (a slice of) the df of a RelationalDf to datatable records
+        :param table_relational_df: RelationalDf the df belongs to
+        :param df: df (or slice of the df) to convert
+        :return: list of datatable records
+        """
+        return to_records(cls.get_table_df(table_relational_df, df))
+
+    @staticmethod
+    def get_table_df(table_relational_df, df):
+        """
+        Get (a slice of) the df of a RelationalDf as displayed in the datatable
+        -> renames foreign key columns and adds the "button text" of the child table columns
+        :param table_relational_df: RelationalDf the df belongs to
+        :param df: df (or slice of the df) to convert
+        :return: pd.DataFrame with the datatable column ids as columns
+        """
+        foreign_key_columns = [parent_table[1] for parent_table in table_relational_df.parent_tables.values()]
+
+        # Add !fk prefix to df foreign key columns to load data correctly
+        # -> without copying the data of the df, the button columns are only added to the renamed df
+        df = df.rename(columns={c: '!fk_' + c for c in df.columns if c in foreign_key_columns}, copy=False)
+
+        # Add "button text" to display in the button column
+        for child_table_id in table_relational_df.child_tables:
+            df["!child_" + str(child_table_id)] = 'Click me!'
+        for column in DatatableEditor.get_descendant_columns(table_relational_df):
+            df[column['id']] = 'Click me!'
+
+        # Values of the aggregate columns -> maintained by the RelationalDf, only looked up for the rows of df
+        for name, values in table_relational_df.get_aggregates(df).items():
+            df['!agg_' + name] = values
+
+        # Ids of the ancestor rows -> tables revealed by a "!desc_" button are filtered by them in the browser
+        for ancestor_table_id, index in table_relational_df.ancestor_indexes.items():
+            df[ANCESTOR_COLUMN_PREFIX + ancestor_table_id] = index.ancestor_ids.reindex(df.index).to_numpy()
+
+        return df
+
+    def apply_edits(self, session, table_relational_df, changes):
+        """
+        Apply changes of a table of a session after checking them (see validate) -> rows with violations are left
+        out, deletions cascade to the child tables (see on_delete)
+        :param session: Session the table belongs to
+        :param table_relational_df: RelationalDf to change
+        :param changes: TableChanges
+        :return: tuple (list of applied TableChanges -> with the cascaded deletions of the child tables, list of
+            Violations of the rejected rows)
+        """
+        violations = []
+        if self.validate:
+            violations = validate_changes(table_relational_df, changes, references=self.on_delete == 'restrict')
+            changes = without_violations(changes, violations)
+
+        table_changes = []
+        if self.validate and self.on_delete == 'cascade' and changes.deleted:
+            table_changes += cascade_deletions(table_relational_df, changes.deleted)
+            changes.deleted = []
+        if changes:
+            table_changes.append((table_relational_df, changes))
+
+        # Recorded before they are applied -> the old values are read from the tables
+        session.operation_log.record(table_changes)
+        for table, applied in table_changes:
+            apply_changes(table, applied)
+            session.pending_changes.append(applied)
+        return [applied for table, applied in table_changes], violations
+
+    def apply_bulk_edit(self, session, table_changes):
+        """
+        Apply a bulk edit of the tables of a session (see bulk_edit, e.g. bulk_edit.value_changes) like the edits in
+        the tables -> the changes of each table are checked (see validate) right before they are applied, so copied
+        child rows can point to the copied parent rows. Rows with violations are left out. The edit is undone at once
+        and saved with the other edits of the session.
+        :param session: Session the tables belong to
+        :param table_changes: list of (RelationalDf of the session, TableChanges) in the order they must be applied
+        :return: tuple (list of applied TableChanges, list of Violations of the rejected rows)
+        """
+        applied, violations = [], []
+        with self.edit_lock:
+            for table, changes in table_changes:
+                if self.validate:
+                    table_violations = validate_changes(table, changes, references=self.on_delete == 'restrict')
+                    changes = without_violations(changes, table_violations)
+                    violations += table_violations
+                if not changes:
+                    continue
+                session.operation_log.record([(table, changes)], extend=bool(applied))
+                apply_changes(table, changes)
+                session.pending_changes.append(changes)
+                applied.append(changes)
+        return applied, violations
+
+    @staticmethod
+    def get_rejected_changes(table_relational_df, changes, violations):
+        """
+        Changes restoring the rows of rejected edits in the browser, where they are already edited
+        -> rows with a rejected update or deletion are sent again ('inserted', only their ids are set), rejected new
+        rows and the new ids of rejected id changes are removed ('deleted') unless they are ids of other rows
+        :param table_relational_df: RelationalDf the edits were rejected from
+        :param changes: TableChanges of the edits (see apply_edits)
+        :param violations: list of Violations of the rejected rows
+        :return: TableChanges to pass to get_changed_records
+        """
+        invalid = {violation.row_id for violation in violations if violation.table_id == changes.table_id}
+        rejected = TableChanges(changes.table_id)
+        rejected.deleted += [row['id'] for row in changes.inserted if row['id'] in invalid]
+        for row_id, values in changes.updated.items():
+            new_id = values.get('id', row_id)
+            if row_id in invalid or new_id in invalid:
+                rejected.inserted.append({'id': row_id})
+                if new_id != row_id and table_relational_df.get_row_labels([new_id])[0] is not None:
+                    # Duplicate of the id of another row -> both displayed rows are replaced by the other row
+                    rejected.inserted.append({'id': new_id})
+                elif new_id != row_id:
+                    rejected.deleted.append(new_id)
+        rejected.inserted += [{'id': row_id} for row_id in changes.deleted if row_id in invalid]
+        return rejected
+
+    @classmethod
+    def get_changed_records(cls, datatables, changes_list):
+        """
+        Get the rows changed on the server as displayed in the datatables (undo, redo, cascaded deletions and
+        rejected edits) -> patched into the displayed tables in the browser (see the 'table_operations' store)
+        :param datatables: dict of RelationalDfs the changes were applied to -> {table_id: RelationalDf}
+        :param changes_list: list of applied TableChanges
+        :return: dict {table_id: {'deleted': ids of deleted rows, 'updated': records of updated rows, 'inserted':
+            records of inserted rows}}
+        """
+        changed = {}
+        for changes in changes_list:
+            table_changes = changed.setdefault(changes.table_id, {'deleted': [], 'updated': [], 'inserted': []})
+            table_changes['deleted'] += changes.deleted
+            table_changes['updated'] += list(changes.updated)
+            table_changes['inserted'] += [row['id'] for row in changes.inserted]
+
+        records = {}
+        for table_id, table_changes in changed.items():
+            table_relational_df = datatables[table_id]
+            # Rows deleted and inserted again are replaced
+            inserted = set(table_changes['inserted'])
+            table_changes['deleted'] = [row_id for row_id in table_changes['deleted'] if row_id not in inserted]
+            table_changes['updated'] = [row_id for row_id in table_changes['updated'] if row_id not in inserted]
+
+            records[table_id] = {'deleted': list(dict.fromkeys(table_changes['deleted']))}
+            for key in ('updated', 'inserted'):
+                row_ids = list(dict.fromkeys(table_changes[key]))
+                labels = [label for label in table_relational_df.get_row_labels(row_ids) if label is not None]
+                records[table_id][key] = cls.get_table_records(table_relational_df,
+                                                               table_relational_df.get_rows(labels))
+        return records
+
+    @staticmethod
+    def format_violations(violations, max_messages=3):
+        """
+        Text of the status of a table displaying the violations of rejected edits
+        """
+        if not violations:
+            return ''
+        messages = [str(violation) for violation in violations[:max_messages]]
+        if len(violations) > max_messages:
+            messages.append(f'... ({len(violations) - max_messages} more)')
+        return 'Rejected: ' + '; '.join(messages)
+
     def set_table_actions_callbacks(self):
-        # Dynamically create dict of callback outputs for all tables
-        # Necessary because Dash pattern matching callback with "ALL"
-        # (updating all tables on every callback) breaks active cell
-
-        callback_output_dict = {}
-        # Loop through each table to display
-        i = 0
-        for table_id, table in self.datatables.items():
-            # Output to manipulate this tables table_row_wrapper's style (to change display property)
-            callback_output_dict[f'style_table_row_{table_id}'] = Output(
-                {'type': 'table_row_wrapper', 'table_id': table_id},
-                'style')
-
-            # Output to manipulate this tables filter_query -> to allow callbacks to set filter_query on table cell click
-            callback_output_dict[f'filter_query_table_{table_id}'] = Output({'type': 'table', 'table_id': table_id,
-                                                                             'table_number': i}, 'filter_query')
-            i += 1
-
-        # Prepare output dict with identical keys and all values set to no_update to be used in callback
-        function_output_dict = {key: no_update for key in callback_output_dict.keys()}
+        # The displayed tables are kept in the 'visible_tables' store -> {table_id: filter_query}
+        # Showing and hiding tables is a pure UI change: the store is updated in the browser from the foreign keys in
+        # the 'table_relations' store (see get_table_relations) -> clicks only reach the server through the requests
+        # of the rows of the revealed tables (load_table_data, update_table_page in server side mode)
 
-        @self.app.callback(
-            # List of tables in view
-            output=callback_output_dict,
-            inputs=[
-                # Active cell of the tables in view
-                Input({'type': 'table', 'table_id': ALL, 'table_number': ALL}, "active_cell"),
-                # Clicked "close_table" button
-                Input({'type': 'close_table_button', 'table_id': ALL, 'table_number': ALL}, 'n_clicks'),
-            ],
+        self.app.clientside_callback(
+            """
+            function(activeCells, closeClicks, visibleTables, tableRelations) {
+                const noUpdate = window.dash_clientside.no_update;
+                const triggered = window.dash_clientside.callback_context.triggered_id;
+                if (!triggered) {
+                    return noUpdate;
+                }
+                if (triggered.type === 'table') {
+                    // Show the child table of a clicked child button with the rows of the clicked row
+                    const activeCell = activeCells[triggered.table_number];
+                    if (activeCell && activeCell.column_id.startsWith('!desc_')) {
+                        // Show all rows of a table further down below the clicked row
+                        const descendantTableId = activeCell.column_id.slice(6);
+                        const ancestorQuery = `{!anc_${triggered.table_id}}=${activeCell.row_id}`;
+                        return Object.assign({}, visibleTables, {[descendantTableId]: ancestorQuery});
+                    }
+                    if (!activeCell || !activeCell.column_id.startsWith('!child_')) {
+                        return noUpdate;
+                    }
+                    const childTableId = activeCell.column_id.slice(7);
+                    const queryCol = tableRelations[triggered.table_id][childTableId];
+                    return Object.assign({}, visibleTables,
+                                         {[childTableId]: `{!fk_${queryCol}}=${activeCell.row_id}`});
+                }
+                // Close button clicked
+                const newVisibleTables = Object.assign({}, visibleTables);
+                delete newVisibleTables[triggered.table_id];
+                return newVisibleTables;
+            }
+            """,
+            Output('visible_tables', 'data'),
+            # Active cell of the tables in view
+            Input({'type': 'table', 'table_id': ALL, 'table_number': ALL}, "active_cell"),
+            # Clicked "close_table" button
+            Input({'type': 'close_table_button', 'table_id': ALL, 'table_number': ALL}, 'n_clicks'),
+            State('visible_tables', 'data'),
+            State('table_relations', 'data'),
             prevent_initial_call=True
         )
-        def update_tables(active_cell, close_table_button_clicks):
+
+        # Apply the visible_tables store to the tables -> only the style and filter_query of tables that were shown,
+        # hidden or re-queried are updated
+        self.app.clientside_callback(
             """
-            Callback function to display new table with new query or closing table
+            function(visibleTables, styles, filterQueries) {
+                const noUpdate = window.dash_clientside.no_update;
+                const outputs = window.dash_clientside.callback_context.outputs_list;
+                const tableIds = outputs[0].map(output => output.id.table_id);
+                const newStyles = [];
+                const newFilterQueries = [];
+                tableIds.forEach((tableId, i) => {
+                    const wasVisible = !styles[i] || styles[i].display !== 'none';
+                    const isVisible = tableId in visibleTables;
+                    if (isVisible && (!wasVisible || visibleTables[tableId] !== filterQueries[i])) {
+                        newStyles.push({display: 'block'});
+                        newFilterQueries.push(visibleTables[tableId]);
+                    } else if (!isVisible && wasVisible) {
+                        newStyles.push({display: 'none'});
+                        newFilterQueries.push(noUpdate);
+                    } else {
+                        newStyles.push(noUpdate);
+                        newFilterQueries.push(noUpdate);
+                    }
+                });
+                return [newStyles, newFilterQueries];
+            }
+            """,
+            Output({'type': 'table_row_wrapper', 'table_id': ALL, 'table_number': ALL}, 'style'),
+            Output({'type': 'table', 'table_id': ALL, 'table_number': ALL}, 'filter_query'),
+            Input('visible_tables', 'data'),
+            State({'type': 'table_row_wrapper', 'table_id': ALL, 'table_number': ALL}, 'style'),
+            State({'type': 'table', 'table_id': ALL, 'table_number': ALL}, 'filter_query'),
+            prevent_initial_call=True
+        )
+
+        if not self.server_side:
+            @self.app.callback(
+                Output({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data', allow_duplicate=True),
+                Input({'type': 'table_row_wrapper', 'table_id': MATCH, 'table_number': MATCH}, 'style'),
+                State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'filter_query'),
+                State('session_id', 'data'),
+                prevent_initial_call=True
+            )
+            def load_table_data(style, filter_query, session_id):
+                """
+                Load the rows of a table selected by its filter_query when it is shown and unload them when it is hidden
+                -> the style is set whenever a table is shown or re-queried (see set_table_actions_callbacks)
+                """
+                table_relational_df = self.get_session(session_id).datatables[ctx.triggered_id['table_id']]
+
+                if style is not None and style.get('display') == 'none':
+                    # Edits are already synced to the RelationalDf (see sync_table_edits)
+                    annotate_callback(table_relational_df.table_id)
+                    return []
+
+                df = table_relational_df.query_rows(filter_query, get_df_column)
+                annotate_callback(table_relational_df.table_id, len(df.index))
+
+                return self.get_table_records(table_relational_df, df)
 
-            :param active_cell:
-            :param close_table_button_clicks:
-            :return: dict of callback outputs for styles and filter queries of all tables
+        @self.app.callback(
+            Output({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data'),
+            Output({'type': 'table_status', 'table_id': MATCH, 'table_number': MATCH}, 'children'),
+            Input({'type': 'add_row_button', 'table_id': MATCH, 'table_number': MATCH}, 'n_clicks'),
+            State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'filter_query'),
+            State('session_id', 'data'),
+            prevent_initial_call=True
+        )
+        def add_table_row(clicks, table_filter_query, session_id):
+            """
+            Add a new row to the table
+            -> only the new row is sent to the browser and appended to the table data (partial update)
             """
+            logging.debug('Add table row button clicked:')
+
+            session = self.get_session(session_id)
+            table_relational_df = session.datatables[ctx.triggered_id['table_id']]
 
-            # Get id of table that was clicked: ID is dict with the following entries:
-            # "type": "table", -> fix identifier for every table
-            # "table_id": relational_df.table_id,  -> specific ID of this table
-            # "table_number": table_number  -> number of the table in the list of displayed tables
+            try:
+                new_row = self.get_new_row(table_relational_df, table_filter_query)
+            except ValueError as e:
+                annotate_callback(table_relational_df.table_id)
+                return no_update, str(e)
 
-            # Get ID of element that was clicked -> decide which action to perform
-            element_clicked = ctx.triggered_id
+            # Add new row to the RelationalDf -> tables are unloaded when closed, so it must hold every row
+            changes = TableChanges(table_relational_df.table_id,
+                                   inserted=[self.get_df_record(table_relational_df, new_row)])
+            with self.edit_lock:
+                applied, violations = self.apply_edits(session, table_relational_df, changes)
+            annotate_callback(table_relational_df.table_id, 1)
+            if violations:
+                # e.g. the parent row of the foreign key in the filter_query doesn't exist
+                return no_update, self.format_violations(violations)
+
+            # Append new row to the table data in the browser
+            table_data = Patch()
+            table_data.append(new_row)
+
+            return table_data, ''
+
+        # Compute the edits of a table in the browser -> only the changed rows are sent to the server
+        self.app.clientside_callback(
+            """
+            function(dataTimestamp, data, dataPrevious) {
+                if (!dataPrevious) {
+                    return window.dash_clientside.no_update;
+                }
+                const previousRows = new Map(dataPrevious.map(row => [row.id, row]));
+                const currentIds = new Set(data.map(row => row.id));
+                const updated = data.filter(row => {
+                    const previousRow = previousRows.get(row.id);
+                    return previousRow === undefined || Object.keys(row).some(key => row[key] !== previousRow[key]);
+                });
+                const deleted = dataPrevious.filter(row => !currentIds.has(row.id)).map(row => row.id);
+                return {updated: updated, deleted: deleted, timestamp: dataTimestamp};
+            }
+            """,
+            Output({'type': 'table_edits', 'table_id': MATCH, 'table_number': MATCH}, 'data'),
+            Input({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data_timestamp'),
+            State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data'),
+            State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data_previous'),
+            prevent_initial_call=True
+        )
 
-            if element_clicked['type'] == 'table':  # If table was clicked
-                # Run table cell clicked actions
-                logging.debug('Table cell clicked')
-                # Abort if there is no active cell or no table clicked
-                if active_cell[0] is None:
-                    return no_update
+        @self.app.callback(
+            Output('table_operations', 'data', allow_duplicate=True),
+            Output({'type': 'table_status', 'table_id': MATCH, 'table_number': MATCH}, 'children',
+                   allow_duplicate=True),
+            Input({'type': 'table_edits', 'table_id': MATCH, 'table_number': MATCH}, 'data'),
+            State('session_id', 'data'),
+            prevent_initial_call=True
+        )
+        def sync_table_edits(table_edits, session_id):
+            """
+            Write cell edits and row deletions of the displayed rows back to the RelationalDf
+            -> otherwise they would be lost when the next page is queried or the table is closed. Rows of rejected
+            edits and child rows removed by cascaded deletions are patched in the browser (see get_changed_records)
+            :param table_edits: dict with the edited rows ('updated') and the ids of the deleted rows ('deleted')
+            :param session_id: id of the session the table belongs to
+            """
+            session = self.get_session(session_id)
+            table_relational_df = session.datatables[ctx.triggered_id['table_id']]
 
-                return table_cell_clicked(active_cell)
+            # Rows with values that can't be converted to the dtypes of their columns are rejected as a whole
+            invalid_violations = []
+            updated_rows = [self.get_df_record(table_relational_df, row, invalid_violations)
+                            for row in table_edits['updated']]
+            invalid = {violation.row_id for violation in invalid_violations}
+            updated_rows = [row for row in updated_rows if row['id'] not in invalid]
 
-            elif element_clicked['type'] == 'close_table_button':
-                # Run close table button clicked actions
-                logging.debug('Close table button clicked')
-                return close_table()
+            # Compare the edited rows with the RelationalDf
+            with self.edit_lock:
+                changes = compute_changes(
+                    table_relational_df,
+                    updated_rows,
+                    scope_ids=[row['id'] for row in updated_rows] + table_edits['deleted']
+                )
+                applied, violations = self.apply_edits(session, table_relational_df, changes) if changes else ([], [])
+                violations = invalid_violations + violations
+                # The edits of the table itself are already displayed -> only rows changed otherwise are sent
+                changes_list = [applied_changes for applied_changes in applied
+                                if applied_changes.table_id != table_relational_df.table_id]
+                if violations:
+                    # The rows with invalid values are restored like rows of rejected updates
+                    edits = TableChanges(changes.table_id, inserted=changes.inserted, deleted=changes.deleted,
+                                         updated={**changes.updated, **{row_id: {} for row_id in invalid}})
+                    changes_list.append(self.get_rejected_changes(table_relational_df, edits, violations))
+                records = self.get_changed_records(session.datatables, changes_list)
+            logging.debug(f'Edited table {table_relational_df.table_id}: {changes}')
+            annotate_callback(table_relational_df.table_id, len(updated_rows) + len(table_edits['deleted']))
 
-            elif element_clicked['type'] == 'add_row_button':
-                logging.debug('Add row button clicked')
-                # return add_table_row(add_row_button_clicks, displayed_tables_data, displayed_tables_columns,
-                #                     displayed_tables_list, current_tables_view)
+            return records if records else no_update, self.format_violations(violations)
 
-        def table_cell_clicked(active_cell):
+        @self.app.callback(
+            Output('table_operations', 'data', allow_duplicate=True),
+            Input('undo_button', 'n_clicks'),
+            Input('redo_button', 'n_clicks'),
+            State('session_id', 'data'),
+            prevent_initial_call=True
+        )
+        def undo_redo(undo_clicks, redo_clicks, session_id):
             """
-            Function to run when table cell is clicked
-            - checks if clicked cell links to child table
-            - changes display property of the corresponding child table
-            - changes filter_query property of the corresponding child table
-            :param active_cell:
-            :return: dict of callback outputs for styles and filter queries of all tables
+            Undo or redo the edits of the session (see OperationLog)
+            -> only the changed rows are sent to the browser, they are patched into the displayed tables there
             """
-            table_clicked = ctx.triggered_id
-            print(f'table clicked: {table_clicked["table_number"]}')
+            session = self.get_session(session_id)
+            with self.edit_lock:
+                if ctx.triggered_id == 'undo_button':
+                    changes_list = session.operation_log.undo(session.datatables)
+                else:
+                    changes_list = session.operation_log.redo(session.datatables)
+                session.pending_changes.extend(changes_list)
+                records = self.get_changed_records(session.datatables, changes_list)
+            logging.debug(f'{ctx.triggered_id}: {changes_list}')
+            annotate_callback(rows=sum(len(changes.inserted) + len(changes.updated) + len(changes.deleted)
+                                       for changes in changes_list))
 
-            # Check if the clicked column is child column and contains sub-data
-            if active_cell[table_clicked['table_number']]['column_id'].startswith('!child_'):
+            return records if records else no_update
 
-                # Make deepcopy of prepared function_output_dict
-                output_dict = deepcopy(function_output_dict)
+        # Patch the rows changed on the server (undo, redo, cascaded deletions, rejected edits) into the displayed
+        # tables -> hidden tables are loaded from the RelationalDf when they are shown
+        self.app.clientside_callback(
+            """
+            function(tableOperations, data, visibleTables) {
+                const noUpdate = window.dash_clientside.no_update;
+                const outputs = window.dash_clientside.callback_context.outputs_list;
+                return outputs.map((output, i) => {
+                    const tableId = output.id.table_id;
+                    if (!tableOperations || !(tableId in tableOperations) || !(tableId in visibleTables)) {
+                        return noUpdate;
+                    }
+                    const changed = tableOperations[tableId];
+                    const deleted = new Set(changed.deleted);
+                    const updated = new Map(changed.updated.concat(changed.inserted).map(row => [row.id, row]));
+                    // Ids are unique on the server -> rows displayed twice (rejected id changes) are kept once
+                    const replaced = new Set();
+                    const newData = data[i].filter(row => !deleted.has(row.id)).flatMap(row => {
+                        const newRow = updated.get(row.id);
+                        if (newRow === undefined) {
+                            return [row];
+                        }
+                        if (replaced.has(row.id)) {
+                            return [];
+                        }
+                        replaced.add(row.id);
+                        return [newRow];
+                    });
+                    // Inserted rows are appended like added rows -> with native filtering, they are hidden if they
+                    // don't match the filter_query of the table
+                    const displayed = new Set(newData.map(row => row.id));
+                    return newData.concat(changed.inserted.filter(row => !displayed.has(row.id)));
+                });
+            }
+            """,
+            Output({'type': 'table', 'table_id': ALL, 'table_number': ALL}, 'data', allow_duplicate=True),
+            Input('table_operations', 'data'),
+            State({'type': 'table', 'table_id': ALL, 'table_number': ALL}, 'data'),
+            State('visible_tables', 'data'),
+            prevent_initial_call=True
+        )
 
-                # Get child_table_id from the clicked column
-                child_table_id = active_cell[table_clicked['table_number']]['column_id'][7:]
+        def save_changes(session_id, set_progress=None):
+            """
+            Write the changes since the last save to the change log -> the tables are not re-serialized
+            -> with set_progress, the changes are saved one by one and the progress is reported after each of them
+            (a cancelled background job stops there, the changes not saved yet stay pending)
+            """
+            session = self.get_session(session_id)
 
-                # Update display property of child table in output_dict -> make visible
-                output_dict[f'style_table_row_{child_table_id}'] = {'display': 'block'}
+            with self.edit_lock:
+                pending_changes = list(session.pending_changes)
+            annotate_callback(rows=sum(len(changes.inserted) + len(changes.updated) + len(changes.deleted)
+                                       for changes in pending_changes))
 
-                # Get the corresponding query_col of the child table
-                query_col = self.datatables[table_clicked['table_id']].child_tables[child_table_id].parent_tables[
-                    table_clicked['table_id']][1]
-                # Get corresponding query_i
-                query_id = active_cell[table_clicked['table_number']]['row_id']
+            batches = [[changes] for changes in pending_changes] if set_progress is not None else [pending_changes]
+            saved = 0
+            for i, batch in enumerate(batches):
+                with self.edit_lock:
+                    # Changes of a session's working copies are also applied to the original tables
+                    # -> sessions started afterwards contain them (tables held by a database are shared by all
+                    # sessions and already contain them)
+                    if session.datatables is not self.datatables:
+                        for changes in batch:
+                            if not self.datatables[changes.table_id].pushdown:
+                                apply_changes(self.datatables[changes.table_id], changes)
 
-                # Update query property of child table in output_dict -> query for corresponding item
-                output_dict[f'filter_query_table_{child_table_id}'] = f'{{!fk_{query_col}}}={query_id}'
+                    saved += self.change_log.append(batch)
+                    del session.pending_changes[:len(batch)]
+                if set_progress is not None:
+                    set_progress((i + 1, len(batches)))
+            return f'Saved {saved} change(s)'
 
-                # print(f' Callback returns: {output_dict}')
-                # Return dict of displayed tables and updated view (HTML) if currently displayed tables and None for active cell
-                return output_dict
-            else:
-                return no_update
+        if self.background_manager is None:
+            @self.app.callback(
+                Output('save_status', 'children'),
+                Input('save_button', 'n_clicks'),
+                State('session_id', 'data'),
+                prevent_initial_call=True
+            )
+            def save_data(clicks, session_id):
+                logging.debug('Save data button clicked')
+                return save_changes(session_id)
+        else:
+            @self.app.callback(
+                Output('save_status', 'children'),
+                Input('save_button', 'n_clicks'),
+                State('session_id', 'data'),
+                background=True,
+                manager=self.background_manager,
+                running=[(Output('save_button', 'disabled'), True, False),
+                         (Output('cancel_save_button', 'disabled'), False, True)],
+                cancel=[Input('cancel_save_button', 'n_clicks')],
+                progress=[Output('save_progress', 'value'), Output('save_progress', 'max')],
+                prevent_initial_call=True
+            )
+            def save_data(set_progress, clicks, session_id):
+                logging.debug('Save data button clicked -> saving in the background')
+                return save_changes(session_id, set_progress)
+
+        if self.server_side:
+            self.set_server_side_callbacks()
 
-        def close_table():
+    def set_data_routes(self):
+        """
+        Routes of the underlying flask server to download the data of a table as JSON records
+        -> streamed in chunks, so large tables are never serialized at once
+        """
+
+        @self.app.server.route('/datatable_editor/tables/<table_id>.json')
+        def table_data(table_id):
             """
-            Closes table by updating the display property in the dict of callback outputs
-            :return: dict of callback outputs for styles and filter queries of all tables
+            Stream the records of a table -> query parameters:
+            - session_id: id of the session whose working copy is returned (if sessions are enabled)
+            - filter_query: datatable filter_query to select rows
             """
-            close_button_clicked = ctx.triggered_id
-            print(f'table clicked: {close_button_clicked["table_number"]}')
+            session_id = request.args.get('session_id')
+            if self.session_store is not None and not session_id:
+                # Would start a session of its own
+                abort(400, 'session_id is required')
+            session = self.get_session(session_id)
+            if table_id not in session.datatables:
+                abort(404)
+            table_relational_df = session.datatables[table_id]
 
-            output_dict = deepcopy(function_output_dict)
-            # Update visibility this table in output_dict
-            output_dict[f'style_table_row_{close_button_clicked["table_id"]}'] = {'display': 'none'}
+            filter_query = request.args.get('filter_query')
+            if filter_query:
+                df = table_relational_df.query_rows(filter_query, get_df_column)
+            else:
+                df = table_relational_df.df
 
-            return output_dict
+            return Response(stream_with_context(iter_json_records(self.get_table_df(table_relational_df, df))),
+                            mimetype='application/json')
+
+    def set_server_side_callbacks(self):
+        """
+        Callbacks to page, sort and filter the tables on the server
+        """
 
         @self.app.callback(
-            Output({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data'),
-            Input({'type': 'add_row_button', 'table_id': MATCH, 'table_number': MATCH}, 'n_clicks'),
-            State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data'),
-            State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'columns'),
-            State({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'filter_query'),
+            Output({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'data', allow_duplicate=True),
+            Output({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'page_count'),
+            Output({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'page_current'),
+            Input({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'page_current'),
+            Input({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'page_size'),
+            Input({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'sort_by'),
+            Input({'type': 'table', 'table_id': MATCH, 'table_number': MATCH}, 'filter_query'),
+            Input({'type': 'table_row_wrapper', 'table_id': MATCH, 'table_number': MATCH}, 'style'),
+            State('session_id', 'data'),
             prevent_initial_call=True
         )
-        def add_table_row(clicks, table_data, table_columns, table_filter_query):
-            logging.debug('Add table row button clicked:')
+        def update_table_page(page_current, page_size, sort_by, filter_query, style, session_id):
+            """
+            Query the currently displayed page of a table -> filter and sort the df and slice out the page
+            -> the data of hidden tables is unloaded. A new filter starts at the first page, pages beyond the last
+            page are moved to the last page.
+            :return: records of the page, number of pages and index of the page
+            """
+            table_relational_df = self.get_session(session_id).datatables[ctx.triggered_id['table_id']]
+            if style is not None and style.get('display') == 'none':
+                annotate_callback(table_relational_df.table_id)
+                return [], no_update, no_update
 
-            # Turn table data into dataframe
-            table_df = pd.DataFrame(table_data)
-
-            # Construct new row entry
-            new_row = {}
-            for col in table_columns:
-                if col['id'].startswith('!child_'):  # if column is button column
-                    new_row[col['id']] = 'Click me! (added)'
-                elif col['id'] == 'id':  # if column is ID column
-                    # Generate ID of new element to add -> must be unique! -> current max id +1
-                    new_row[col['id']] = table_df['id'].max() + 1
-                elif col['id'].startswith('!fk_'):  # if column is query column
-                    if table_filter_query == "":  # if filter_query is empty
-                        new_row[col['id']] = ""  # no value is set in this column
-                        print('Row added without fk filter query specified')
-                    else:  # Some filter query is set
-                        # Extract part of table query of this foreign key column -> exists only once -> get first list item
-                        query = [k for k in table_filter_query.split("&&") if col['id'] in k][0]
-                        # Find the index of the equal sign
-                        index = query.find('=')
-
-                        if index == -1:  # if no equal sign is found
-                            new_row[col['id']] = ""  # no value is set in this column
-                            # TODO: fk_column is currently not editable -> user would not be able to provide fk_id
-                            # -> for now this is ok?
-                        else:
-                            new_row[col['id']] = int(query[index + 1:])  # value is set to be the fk_id of the current query
-                else:
-                    new_row[col['id']] = ""
+            new_page_current = page_current or 0
+            if any(prop_id.endswith('.filter_query') for prop_id in ctx.triggered_prop_ids):
+                new_page_current = 0
+            logging.debug(f'Query page {new_page_current} of table {table_relational_df.table_id}: '
+                          f'filter_query={filter_query}, sort_by={sort_by}')
 
-            table_data.append(new_row)
+            page_df, page_count = table_relational_df.query_page(new_page_current, page_size, filter_query, sort_by,
+                                                                 get_df_column)
+            if new_page_current >= page_count:
+                # The page was removed by an edit or the filter -> show the last page
+                new_page_current = page_count - 1
+                page_df, page_count = table_relational_df.query_page(new_page_current, page_size, filter_query,
+                                                                     sort_by, get_df_column)
+            annotate_callback(table_relational_df.table_id, len(page_df.index))
+
+            return (self.get_table_records(table_relational_df, page_df), page_count,
+                    new_page_current if new_page_current != page_current else no_update)
 
-            return table_data
@@ -52,5 +52,9 @@ usage_windows = RelationalDf('usage_windows', 'usage_windows',  pd.DataFrame(usa
 users.add_child_table(appliances, 'user_id')
 appliances.add_child_table(usage_windows, 'appliance_id')
 
+# Aggregate columns over the child tables
+users.add_aggregate('total power', 'appliances', 'sum', 'power')
+appliances.add_aggregate('usage windows', 'usage_windows', 'count')
+
 first_table = users
 display_tables_dict = {users.table_id: users, appliances.table_id: appliances, usage_windows.table_id: usage_windows}
\ No newline at end of file
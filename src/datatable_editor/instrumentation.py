@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+# Upper bounds of the buckets of the callback duration histogram in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger('datatable_editor.metrics')
+
+
+def annotate_callback(table_id=None, rows=None):
+    """
+    Record which table the running callback touched and how many rows were involved
+    -> picked up by CallbackMetrics when the callback request is finished, no-op outside of a request
+
+    :param table_id: table_id of the RelationalDf the callback touched
+    :param rows: number of rows the callback loaded, sent or changed
+    """
+    if not has_request_context():
+        return
+    if table_id is not None:
+        g.callback_table_id = table_id
+    if rows is not None:
+        g.callback_rows = getattr(g, 'callback_rows', 0) + rows
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _CallbackStats:
+    def __init__(self, n_buckets):
+        self.count = 0
+        self.errors = 0
+        self.duration_sum = 0.0
+        self.bucket_counts = [0] * n_buckets
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rows = 0
+
+
+class CallbackMetrics:
+    def __init__(self, log_level=logging.DEBUG, buckets=DEFAULT_BUCKETS):
+        """
+        Timing and payload size of every callback request of a Dash app
+        -> exposed in the Prometheus text format at /metrics and logged as structured log records
+
+        :param log_level: level of the log record written per callback -> None to disable logging
+        :param buckets: upper bounds of the buckets of the duration histogram in seconds
+        """
+        self.log_level = log_level
+        self.buckets = tuple(sorted(buckets))
+
+        # (callback name, table_id) -> _CallbackStats
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Instrument the callback requests of a Dash app and add the /metrics route to its flask server
+        :param app: Dash app
+        """
+        server = app.server
+
+        @server.before_request
+        def start_timer():
+            if request.path.endswith('/_dash-update-component'):
+                g.callback_start = time.perf_counter()
+
+        @server.after_request
+        def record_callback(response):
+            start = g.pop('callback_start', None)
+            if start is not None:
+                self.record(
+                    callback=self.get_callback_name(app, request.get_json(silent=True)),
+                    duration=time.perf_counter() - start,
+                    request_bytes=request.content_length or 0,
+                    response_bytes=response.calculate_content_length() or 0,
+                    table_id=g.get('callback_table_id'),
+                    rows=g.get('callback_rows', 0),
+                    error=response.status_code >= 400,
+                )
+            return response
+
+        @server.route('/metrics')
+        def metrics():
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    @staticmethod
+    def get_callback_name(app, body):
+        # Name of the python function of the callback -> the output key identifies the callback in the request
+        output = (body or {}).get('output', '')
+        callback = app.callback_map.get(output, {}).get('callback')
+        return getattr(callback, '__name__', output)
+
+    def record(self, callback, duration, request_bytes=0, response_bytes=0, table_id=None, rows=0, error=False):
+        """
+        Record one callback request
+        :param callback: name of the callback
+        :param duration: duration in seconds
+        :param request_bytes: size of the serialized inputs
+        :param response_bytes: size of the serialized outputs
+        :param table_id: table_id of the RelationalDf the callback touched
+        :param rows: number of rows involved
+        :param error: True if the callback failed
+        """
+        with self._lock:
+            stats = self.stats.get((callback, table_id))
+            if stats is None:
+                stats = self.stats[(callback, table_id)] = _CallbackStats(len(self.buckets))
+            stats.count += 1
+            stats.errors += int(error)
+            stats.duration_sum += duration
+            for i, upper_bound in enumerate(self.buckets):
+                if duration <= upper_bound:
+                    stats.bucket_counts[i] += 1
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            stats.rows += rows
+
+        if self.log_level is not None and logger.isEnabledFor(self.log_level):
+            logger.log(self.log_level,
+                       f'Callback {callback} took {duration * 1000:.1f} ms (table={table_id}, rows={rows}, '
+                       f'request={request_bytes} B, response={response_bytes} B)',
+                       extra={'callback': callback, 'duration': duration, 'table_id': table_id, 'rows': rows,
+                              'request_bytes': request_bytes, 'response_bytes': response_bytes, 'error': error})
+
+    def render(self):
+        """
+        Render the metrics in the Prometheus text exposition format
+        :return: str
+        """
+        prefix = 'datatable_editor_callback'
+        with self._lock:
+            stats = sorted(self.stats.items(), key=lambda item: (item[0][0], str(item[0][1])))
+
+            lines = [f'# HELP {prefix}_duration_seconds Duration of the callback requests',
+                     f'# TYPE {prefix}_duration_seconds histogram']
+            for (callback, table_id), callback_stats in stats:
+                labels = f'callback="{_escape_label(callback)}",table="{_escape_label(table_id or "")}"'
+                for upper_bound, count in zip(self.buckets, callback_stats.bucket_counts):
+                    lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="{upper_bound}"}} {count}')
+                lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="+Inf"}} {callback_stats.count}')
+                lines.append(f'{prefix}_duration_seconds_sum{{{labels}}} {callback_stats.duration_sum}')
+                lines.append(f'{prefix}_duration_seconds_count{{{labels}}} {callback_stats.count}')
+
+            counters = [
+                ('errors_total', 'Failed callback requests', 'errors'),
+                ('request_bytes_total', 'Size of the serialized callback inputs', 'request_bytes'),
+                ('response_bytes_total', 'Size of the serialized callback outputs', 'response_bytes'),
+                ('rows_total', 'Rows loaded, sent or changed by the callbacks', 'rows'),
+            ]
+            for name, description, attribute in counters:
+                lines += [f'# HELP {prefix}_{name} {description}', f'# TYPE {prefix}_{name} counter']
+                for (callback, table_id), callback_stats in stats:
+                    labels = f'callback="{_escape_label(callback)}",table="{_escape_label(table_id or "")}"'
+                    lines.append(f'{prefix}_{name}{{{labels}}} {getattr(callback_stats, attribute)}')
+
+        return '\n'.join(lines) + '\n'
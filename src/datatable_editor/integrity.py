@@ -0,0 +1,167 @@
+import pandas as pd
+
+from datatable_editor.changes import TableChanges
+
+
+class Violation:
+    def __init__(self, table_id, row_id, column, message):
+        """
+        Violation of the referential integrity of a row
+
+        :param table_id: table_id of the RelationalDf of the row
+        :param row_id: id of the row
+        :param column: column of the violation ('id' or a foreign key column)
+        :param message: description of the violation
+        """
+        self.table_id = table_id
+        self.row_id = row_id
+        self.column = column
+        self.message = message
+
+    def __repr__(self):
+        return f'Violation({self.table_id!r}, {self.row_id!r}, {self.column!r}, {self.message!r})'
+
+    def __str__(self):
+        return self.message
+
+    def to_dict(self):
+        return {'table_id': self.table_id, 'row_id': self.row_id, 'column': self.column, 'message': self.message}
+
+
+def _missing_keys(parent_table, keys):
+    # Foreign key values without a row in the parent table -> one hash lookup per distinct value
+    keys = pd.unique(keys.dropna())
+    return {key for key, label in zip(keys.tolist(), parent_table.get_row_labels(keys.tolist())) if label is None}
+
+
+def check_foreign_keys(relational_df, df):
+    """
+    Check that the foreign keys of rows point to existing rows of the parent tables (missing values are allowed)
+    :param relational_df: RelationalDf the rows belong to
+    :param df: rows to check -> pd.DataFrame with the columns of the table (at least 'id')
+    :return: list of Violations
+    """
+    violations = []
+    for parent_table_id, (parent_table, foreign_key_column) in relational_df.parent_tables.items():
+        if foreign_key_column not in df.columns:
+            continue
+        keys = df[foreign_key_column]
+        missing = _missing_keys(parent_table, keys)
+        if not missing:
+            continue
+        invalid = df[keys.isin(missing)]
+        violations += [
+            Violation(relational_df.table_id, row_id, foreign_key_column,
+                      f"{foreign_key_column}={key} of row {row_id} of '{relational_df.table_id}' has no row in "
+                      f"'{parent_table_id}'")
+            for row_id, key in zip(invalid['id'].tolist(), invalid[foreign_key_column].tolist())
+        ]
+    return violations
+
+
+def check_references(relational_df, row_ids):
+    """
+    Check that no rows of the child tables point to rows (e.g. before the rows are deleted)
+    :param relational_df: RelationalDf of the rows
+    :param row_ids: ids of the rows
+    :return: list of Violations
+    """
+    violations = []
+    for child_table_id, child_table in relational_df.child_tables.items():
+        foreign_key_column = child_table.parent_tables[relational_df.table_id][1]
+        referenced = set(child_table.get_rows_where_in(foreign_key_column, row_ids)[foreign_key_column].tolist())
+        for row_id in [row_id for row_id in row_ids if row_id in referenced]:
+            violations.append(Violation(relational_df.table_id, row_id, 'id',
+                                        f"Row {row_id} of '{relational_df.table_id}' is referenced by rows of "
+                                        f"'{child_table_id}'"))
+    return violations
+
+
+def _duplicate_id_violations(relational_df, row_ids):
+    return [Violation(relational_df.table_id, row_id, 'id',
+                      f"Id {row_id} is not unique in '{relational_df.table_id}'") for row_id in row_ids]
+
+
+def validate_table(relational_df):
+    """
+    Validate all rows of a table -> unique, non missing ids and foreign keys pointing to existing rows
+    (linear in the number of rows: vectorized duplicate detection and hash lookups of the distinct foreign keys)
+    :param relational_df: RelationalDf to validate
+    :return: list of Violations
+    """
+    df = relational_df.df
+    ids = df['id']
+    violations = [Violation(relational_df.table_id, None, 'id', f"Row without id in '{relational_df.table_id}'")
+                  for _ in range(int(ids.isna().sum()))]
+    violations += _duplicate_id_violations(relational_df, pd.unique(ids[ids.duplicated()].dropna()).tolist())
+    return violations + check_foreign_keys(relational_df, df)
+
+
+def validate_tables(datatables):
+    """
+    Validate all rows of all tables (see validate_table)
+    :param datatables: dict of RelationalDfs -> {table_id: RelationalDf}
+    :return: list of Violations
+    """
+    violations = []
+    for table in datatables.values():
+        violations += validate_table(table)
+    return violations
+
+
+def validate_changes(relational_df, changes, references=True):
+    """
+    Validate changes before they are applied -> only the changed rows are checked (see validate_table for a full
+    validation)
+    :param relational_df: RelationalDf the changes belong to
+    :param changes: TableChanges
+    :param references: If True, deleted rows must not be referenced by rows of the child tables
+        -> pass False if the deletions cascade to the child tables (see bulk_edit.cascade_delete). The ids of
+        referenced rows can't be changed either way, the rows of the child tables would be orphaned.
+    :return: list of Violations
+    """
+    violations = []
+    deleted = set(changes.deleted)
+
+    # Ids of inserted rows and new ids of updated rows must be unique
+    new_ids = [row['id'] for row in changes.inserted] + \
+        [values['id'] for row_id, values in changes.updated.items() if 'id' in values and values['id'] != row_id]
+    new_id_series = pd.Series(new_ids, dtype=object)
+    duplicates = set(new_id_series[new_id_series.duplicated()].tolist())
+    duplicates.update(row_id for row_id, label in zip(new_ids, relational_df.get_row_labels(new_ids))
+                      if label is not None and row_id not in deleted)
+    violations += _duplicate_id_violations(relational_df, sorted(duplicates, key=str))
+
+    # Foreign keys of inserted rows and of updated foreign key cells
+    if changes.inserted:
+        violations += check_foreign_keys(relational_df, pd.DataFrame(changes.inserted))
+    foreign_key_columns = [foreign_key_column for parent_table, foreign_key_column
+                           in relational_df.parent_tables.values()]
+    updated_keys = [dict(values, id=row_id) for row_id, values in changes.updated.items()
+                    if any(column in values for column in foreign_key_columns)]
+    if updated_keys:
+        violations += check_foreign_keys(relational_df, pd.DataFrame(updated_keys))
+
+    if references and changes.deleted:
+        violations += check_references(relational_df, changes.deleted)
+    renamed = [row_id for row_id, values in changes.updated.items() if values.get('id', row_id) != row_id]
+    if renamed:
+        violations += check_references(relational_df, renamed)
+    return violations
+
+
+def without_violations(changes, violations):
+    """
+    Drop the rows with violations from changes
+    :param changes: TableChanges
+    :param violations: list of Violations (see validate_changes)
+    :return: TableChanges of the valid rows
+    """
+    invalid = {violation.row_id for violation in violations if violation.table_id == changes.table_id}
+    return TableChanges(
+        changes.table_id,
+        inserted=[row for row in changes.inserted if row['id'] not in invalid],
+        updated={row_id: values for row_id, values in changes.updated.items()
+                 if row_id not in invalid and values.get('id', row_id) not in invalid},
+        deleted=[row_id for row_id in changes.deleted if row_id not in invalid],
+    )
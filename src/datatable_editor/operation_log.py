@@ -0,0 +1,192 @@
+import os
+import pickle
+from collections import deque
+
+from datatable_editor.changes import TableChanges, apply_changes
+
+# Operations recorded per changed cell (update) or per inserted or deleted row -> operation undoing them
+INVERSE_OPERATIONS = {'insert': 'delete', 'update': 'update', 'delete': 'insert'}
+
+
+class OperationLog:
+    FIELDS = ('operation', 'table_id', 'row_id', 'column', 'old_value', 'new_value')
+
+    def __init__(self, max_operations=10000, spill_path=None):
+        """
+        Undo/redo history of the edits of a session
+        -> every edit is one step of columnar records (one list per field of FIELDS): one operation per changed
+        cell and one per inserted or deleted row (with the whole row as new or old value). Undo applies the inverse
+        operations of the last step, redo applies its operations again. Updates changing the id of a row are undone
+        on the row with the new id.
+        At most max_operations are kept in memory -> older steps are appended to spill_path (if set) and read back
+        when they are undone, otherwise they are discarded.
+
+        :param max_operations: number of operations kept in memory (the last step is always kept)
+        :param spill_path: path of the file steps are spilled to -> if None, undo is limited to the steps in memory
+        """
+        self.max_operations = max_operations
+        self.spill_path = spill_path
+
+        # Steps in memory, oldest first -> the last _undone steps were undone and can be redone
+        self._steps = deque()
+        self._undone = 0
+        self._size = 0
+
+        # Offsets of the spilled steps in the spill file, oldest first
+        self._spilled = []
+
+    def __len__(self):
+        # Operations in memory
+        return self._size
+
+    @property
+    def can_undo(self):
+        return len(self._steps) > self._undone or bool(self._spilled)
+
+    @property
+    def can_redo(self):
+        return self._undone > 0
+
+    def record(self, table_changes, extend=False):
+        """
+        Record one edit as a step -> must be called before the changes are applied, the old values are read from
+        the tables. Steps undone before are discarded.
+        :param table_changes: list of (RelationalDf, TableChanges) in the order they are applied
+        :param extend: If True, the operations are added to the last step -> an edit applied in several parts (see
+            DatatableEditor.apply_bulk_edit) is undone at once
+        """
+        step = {field: [] for field in self.FIELDS}
+        for relational_df, changes in table_changes:
+            self._add_operations(step, relational_df, changes)
+        if not step['operation']:
+            return
+
+        if extend and self._steps and not self._undone:
+            for field in self.FIELDS:
+                self._steps[-1][field] += step[field]
+        else:
+            for _ in range(self._undone):
+                self._size -= len(self._steps.pop()['operation'])
+            self._undone = 0
+            self._steps.append(step)
+        self._size += len(step['operation'])
+        while self._size > self.max_operations and len(self._steps) > 1:
+            oldest = self._steps.popleft()
+            self._size -= len(oldest['operation'])
+            if self.spill_path is not None:
+                self._spill_step(oldest)
+
+    @staticmethod
+    def _add_operations(step, relational_df, changes):
+        # Same order as apply_changes -> deletions, updates, insertions
+        def add(operation, row_id, column=None, old_value=None, new_value=None):
+            for field, value in zip(OperationLog.FIELDS,
+                                    (operation, relational_df.table_id, row_id, column, old_value, new_value)):
+                step[field].append(value)
+
+        if changes.deleted:
+            labels = [label for label in relational_df.get_row_labels(changes.deleted) if label is not None]
+            for row in relational_df.get_rows(labels).to_dict('records'):
+                add('delete', row['id'], old_value=row)
+
+        if changes.updated:
+            existing = [(row_id, label) for row_id, label in
+                        zip(changes.updated, relational_df.get_row_labels(list(changes.updated)))
+                        if label is not None]
+            columns = list(dict.fromkeys(column for values in changes.updated.values() for column in values))
+            old_rows = relational_df.get_rows([label for row_id, label in existing])[columns].to_dict('records')
+            for (row_id, label), old_row in zip(existing, old_rows):
+                for column, new_value in changes.updated[row_id].items():
+                    add('update', row_id, column, old_row[column], new_value)
+
+        for row in changes.inserted:
+            add('insert', row['id'], new_value=dict(row))
+
+    def undo(self, datatables):
+        """
+        Undo the last step that was not undone yet -> the step only counts as undone once its changes are applied
+        :param datatables: dict of RelationalDfs the step was applied to -> {table_id: RelationalDf}
+        :return: list of applied TableChanges reverting the step -> empty if there is nothing to undo
+        """
+        if len(self._steps) == self._undone:
+            if not self._spilled:
+                return []
+            step = self._load_step()
+            self._steps.appendleft(step)
+            self._size += len(step['operation'])
+
+        changes_list = self._apply(datatables, self._get_changes(self._steps[-self._undone - 1], inverse=True))
+        self._undone += 1
+        return changes_list
+
+    def redo(self, datatables):
+        """
+        Redo the last undone step -> the step only counts as redone once its changes are applied
+        :param datatables: dict of RelationalDfs the step was applied to -> {table_id: RelationalDf}
+        :return: list of applied TableChanges repeating the step -> empty if there is nothing to redo
+        """
+        if not self._undone:
+            return []
+        changes_list = self._apply(datatables, self._get_changes(self._steps[-self._undone]))
+        self._undone -= 1
+        return changes_list
+
+    @staticmethod
+    def _apply(datatables, changes_list):
+        # Restores rows as they were before -> no integrity checks
+        for changes in changes_list:
+            apply_changes(datatables[changes.table_id], changes)
+        return changes_list
+
+    @staticmethod
+    def _get_changes(step, inverse=False):
+        # Consecutive operations of the same kind on the same table are applied together -> undo runs backwards
+        changes_list = []
+        keys = []
+        positions = range(len(step['operation']))
+
+        # Rows with a changed id have the new id after the step -> their inverse updates are keyed by it
+        new_ids = {}
+        if inverse:
+            new_ids = {(step['table_id'][i], step['row_id'][i]): step['new_value'][i] for i in positions
+                       if step['operation'][i] == 'update' and step['column'][i] == 'id'}
+        for i in reversed(positions) if inverse else positions:
+            operation = INVERSE_OPERATIONS[step['operation'][i]] if inverse else step['operation'][i]
+            value = step['old_value'][i] if inverse else step['new_value'][i]
+            table_id = step['table_id'][i]
+
+            if not keys or keys[-1] != (table_id, operation):
+                keys.append((table_id, operation))
+                changes_list.append(TableChanges(table_id))
+            changes = changes_list[-1]
+
+            if operation == 'insert':
+                changes.inserted.append(value)
+            elif operation == 'delete':
+                changes.deleted.append(step['row_id'][i])
+            else:
+                row_id = new_ids.get((table_id, step['row_id'][i]), step['row_id'][i])
+                changes.updated.setdefault(row_id, {})[step['column'][i]] = value
+
+        if inverse:
+            # Rows are restored in their recorded order
+            for changes in changes_list:
+                changes.inserted.reverse()
+                changes.deleted.reverse()
+        return changes_list
+
+    def _spill_step(self, step):
+        # The file is started over by the first spilled step -> it may be left over from an earlier log
+        with open(self.spill_path, 'ab' if self._spilled else 'wb') as f:
+            f.seek(0, os.SEEK_END)
+            self._spilled.append(f.tell())
+            pickle.dump(step, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load_step(self):
+        # The newest spilled step is at the end of the file -> cut off after reading it
+        offset = self._spilled.pop()
+        with open(self.spill_path, 'r+b') as f:
+            f.seek(offset)
+            step = pickle.load(f)
+            f.truncate(offset)
+        return step
@@ -0,0 +1,259 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Operators of the dash datatable filter_query syntax ("i" / "s" prefixes select case (in)sensitivity)
+_RELATIONAL_OPERATORS = {
+    '=': 'eq', 'eq': 'eq',
+    '!=': 'ne', 'ne': 'ne',
+    '<': 'lt', 'lt': 'lt',
+    '<=': 'le', 'le': 'le',
+    '>': 'gt', 'gt': 'gt',
+    '>=': 'ge', 'ge': 'ge',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+_FILTER_PART = re.compile(
+    r'^\{(?P<column>[^}]+)\}\s*'
+    r'(?:(?P<unary>is\s+(?:not\s+)?blank)'
+    r'|(?P<case>[is]?)(?P<operator>>=|<=|!=|=|<|>|eq|ne|lt|le|gt|ge|contains|datestartswith)\s*(?P<value>.*))$'
+)
+
+
+def parse_filter_query(filter_query):
+    """
+    Parse a dash datatable filter_query string into a list of conditions
+
+    Only the "&&" conjunction is supported (this is what the datatable filter row produces). Parts that can't be
+    parsed are skipped.
+
+    :param filter_query: filter_query string, e.g. '{name} contains "tv" && {power} > 5'
+    :return: list of (column_id, operator, value, case_sensitive) tuples -> operator is one of the normalized
+        operator names ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'contains', 'datestartswith', 'blank', 'not_blank')
+    """
+    conditions = []
+    if not filter_query:
+        return conditions
+
+    for part in filter_query.split('&&'):
+        match = _FILTER_PART.match(part.strip())
+        if match is None:
+            continue
+
+        if match.group('unary') is not None:
+            operator = 'not_blank' if 'not' in match.group('unary') else 'blank'
+            conditions.append((match.group('column'), operator, None, True))
+        else:
+            value = _parse_value(match.group('value'))
+            conditions.append((match.group('column'), _RELATIONAL_OPERATORS[match.group('operator')], value,
+                               match.group('case') != 'i'))
+
+    return conditions
+
+
+def _parse_value(value):
+    """
+    Parse the value of a filter_query condition -> strip quotes, convert unquoted numbers
+    """
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1].replace('\\' + value[0], value[0])
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def _condition_mask(series, operator, value, case_sensitive):
+    """
+    Vectorized evaluation of one filter condition on a column -> boolean numpy array
+    """
+    if operator in ('blank', 'not_blank'):
+        mask = series.isna().to_numpy() | (series.astype('string') == '').fillna(False).to_numpy(dtype=bool)
+        return ~mask if operator == 'not_blank' else mask
+
+    if operator in ('contains', 'datestartswith'):
+        text = series.astype('string')
+        value = str(value)
+        if not case_sensitive:
+            text, value = text.str.lower(), value.lower()
+        if operator == 'contains':
+            result = text.str.contains(value, regex=False)
+        else:
+            result = text.str.startswith(value)
+        return result.fillna(False).to_numpy(dtype=bool)
+
+    # Relational operators -> compare numerically on numeric columns, as text otherwise
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        if isinstance(value, str):
+            # Text can't match a number
+            return np.full(len(series), operator == 'ne')
+        column = series
+    else:
+        column = series.astype('string')
+        value = str(value)
+        if not case_sensitive:
+            column, value = column.str.lower(), value.lower()
+
+    result = getattr(column, operator)(value)
+    if operator == 'ne':
+        return result.fillna(True).to_numpy(dtype=bool)
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+def filter_mask(df, filter_query, column_resolver=None):
+    """
+    Translate a dash datatable filter_query into a vectorized boolean mask over the rows of df
+
+    :param df: pd.DataFrame to filter
+    :param filter_query: filter_query string of the datatable
+    :param column_resolver: optional function mapping datatable column ids to df column names (None -> ignore column)
+    :return: boolean numpy array with one entry per row of df
+    """
+    mask = np.ones(len(df.index), dtype=bool)
+    for column_id, operator, value, case_sensitive in parse_filter_query(filter_query):
+        column = column_resolver(column_id) if column_resolver is not None else column_id
+        if column is None or column not in df.columns:
+            continue
+        mask &= _condition_mask(df[column], operator, value, case_sensitive)
+    return mask
+
+
+def sort_positions(df, positions, sort_by, column_resolver=None):
+    """
+    Order row positions of df according to a dash datatable sort_by list
+
+    :param df: pd.DataFrame the positions refer to
+    :param positions: numpy array of row positions to sort
+    :param sort_by: list of {'column_id': ..., 'direction': 'asc'|'desc'} dicts
+    :param column_resolver: optional function mapping datatable column ids to df column names (None -> ignore column)
+    :return: numpy array of sorted row positions
+    """
+    columns, ascending = [], []
+    for sort_entry in sort_by or []:
+        column = column_resolver(sort_entry['column_id']) if column_resolver is not None else sort_entry['column_id']
+        if column is None or column not in df.columns or column in columns:
+            continue
+        columns.append(column)
+        ascending.append(sort_entry['direction'] == 'asc')
+
+    if not columns or len(positions) == 0:
+        return positions
+
+    # Only the sort columns of the selected rows are taken -> no copy of the whole table
+    sort_df = df[columns].take(positions).reset_index(drop=True)
+    order = sort_df.sort_values(by=columns, ascending=ascending, kind='mergesort', na_position='last').index
+    return positions[order.to_numpy()]
+
+
+def query_positions(df, filter_query=None, sort_by=None, column_resolver=None):
+    """
+    Get the row positions of df matching filter_query, ordered by sort_by
+
+    :param df: pd.DataFrame to query
+    :param filter_query: filter_query string of the datatable
+    :param sort_by: sort_by list of the datatable
+    :param column_resolver: optional function mapping datatable column ids to df column names (None -> ignore column)
+    :return: numpy array of row positions
+    """
+    positions = np.flatnonzero(filter_mask(df, filter_query, column_resolver))
+    return sort_positions(df, positions, sort_by, column_resolver)
+
+
+def get_page(df, positions, page_current, page_size):
+    """
+    Slice one page out of the queried row positions
+
+    :param df: pd.DataFrame the positions refer to
+    :param positions: numpy array of row positions (see query_positions)
+    :param page_current: index of the page to return (starting at 0)
+    :param page_size: number of rows per page
+    :return: (page_df, page_count) tuple
+    """
+    page_count = max(1, -(-len(positions) // page_size))
+    start = page_current * page_size
+    return df.take(positions[start:start + page_size]), page_count
+
+
+def quote_identifier(name):
+    """
+    Quote a table or column name for use in SQL
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _condition_sql(column, operator, value, case_sensitive, numeric):
+    """
+    Translate one filter condition to SQL -> same semantics as _condition_mask
+    :return: (sql, params) tuple
+    """
+    text = f'CAST({column} AS TEXT)'
+    if operator in ('blank', 'not_blank'):
+        sql = f'({column} IS NULL OR {text} = \'\')'
+        return (f'NOT {sql}' if operator == 'not_blank' else sql), []
+
+    if operator in ('contains', 'datestartswith'):
+        value = str(value)
+        if not case_sensitive:
+            text, value = f'lower({text})', value.lower()
+        if operator == 'contains':
+            return f'instr({text}, ?) > 0', [value]
+        return f'substr({text}, 1, {len(value)}) = ?', [value]
+
+    sql_operator = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}[operator]
+    if numeric:
+        if isinstance(value, str):
+            # Text can't match a number
+            return ('1 = 1' if operator == 'ne' else '1 = 0'), []
+    else:
+        column, value = text, str(value)
+        if not case_sensitive:
+            column, value = f'lower({column})', value.lower()
+
+    if operator == 'ne':
+        return f'({column} != ? OR {column} IS NULL)', [value]
+    return f'{column} {sql_operator} ?', [value]
+
+
+def filter_sql(filter_query, dtypes, column_resolver=None):
+    """
+    Translate a dash datatable filter_query into a SQL WHERE clause -> same semantics as filter_mask
+
+    :param filter_query: filter_query string of the datatable
+    :param dtypes: pd.Series of the dtypes of the table's columns -> numeric columns are compared numerically
+    :param column_resolver: optional function mapping datatable column ids to column names (None -> ignore column)
+    :return: (where, params) tuple -> where is '1 = 1' if no condition applies
+    """
+    clauses, params = [], []
+    for column_id, operator, value, case_sensitive in parse_filter_query(filter_query):
+        column = column_resolver(column_id) if column_resolver is not None else column_id
+        if column is None or column not in dtypes.index:
+            continue
+        numeric = pd.api.types.is_numeric_dtype(dtypes[column]) and not pd.api.types.is_bool_dtype(dtypes[column])
+        clause, clause_params = _condition_sql(quote_identifier(column), operator, value, case_sensitive, numeric)
+        clauses.append(clause)
+        params.extend(clause_params)
+    return ' AND '.join(clauses) or '1 = 1', params
+
+
+def order_sql(sort_by, columns, column_resolver=None):
+    """
+    Translate a dash datatable sort_by list into the terms of a SQL ORDER BY clause -> same semantics as
+    sort_positions (missing values last)
+
+    :param sort_by: list of {'column_id': ..., 'direction': 'asc'|'desc'} dicts
+    :param columns: columns of the table
+    :param column_resolver: optional function mapping datatable column ids to column names (None -> ignore column)
+    :return: list of ORDER BY terms
+    """
+    terms, sorted_columns = [], []
+    for sort_entry in sort_by or []:
+        column = column_resolver(sort_entry['column_id']) if column_resolver is not None else sort_entry['column_id']
+        if column is None or column not in columns or column in sorted_columns:
+            continue
+        sorted_columns.append(column)
+        direction = 'ASC' if sort_entry['direction'] == 'asc' else 'DESC'
+        terms.append(f'{quote_identifier(column)} {direction} NULLS LAST')
+    return terms
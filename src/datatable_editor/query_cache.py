@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+
+# Memory budget of the cached query results of one table in bytes
+DEFAULT_QUERY_CACHE_SIZE = 32 * 2 ** 20
+
+
+class QueryCache:
+    def __init__(self, max_bytes=DEFAULT_QUERY_CACHE_SIZE):
+        """
+        LRU cache of the results of the filter and sort queries of a table (see RelationalDf.query_row_positions)
+        -> results are stored as arrays of row positions together with the versions of the table they were computed
+        from (rows, filtered and sorted columns, ancestor indexes). A result is only returned while these versions
+        are unchanged, so edits of other columns don't invalidate it. The least recently used results are evicted
+        when they take more than max_bytes.
+
+        :param max_bytes: memory budget of the cached position arrays in bytes -> 0 disables the cache
+        """
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # {key: (dependencies, positions)}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Locks can't be pickled -> the cached results are rebuilt on demand
+        return {'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_bytes'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        # Bytes taken by the cached position arrays
+        return self._bytes
+
+    def get(self, key, dependencies):
+        """
+        Get a cached result
+        :param key: hashable key of the query (filter_query, sort_by, ...)
+        :param dependencies: versions the result depends on -> results computed from other versions are dropped
+        :return: numpy array of row positions or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == dependencies:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # The table changed since -> the result can't be valid again
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, dependencies, positions):
+        """
+        Cache a result -> evicts the least recently used results if the budget is exceeded
+        :param key: hashable key of the query
+        :param dependencies: versions the result was computed from (taken before the query was run)
+        :param positions: numpy array of row positions
+        """
+        if positions.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (dependencies, positions)
+            self._bytes += positions.nbytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        dependencies, positions = self._entries.pop(key)
+        self._bytes -= positions.nbytes
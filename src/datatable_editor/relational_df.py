@@ -1,13 +1,314 @@
+import contextlib
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datatable_editor.aggregates import Aggregate
+from datatable_editor.query import parse_filter_query, query_positions, get_page
+from datatable_editor.query_cache import QueryCache, DEFAULT_QUERY_CACHE_SIZE
+
+
+# Labels of no rows -> returned for foreign key values without rows
+_NO_LABELS = pd.Index([], dtype=np.int64)
+
+# Prefix of the virtual columns with the ids of the rows' ancestors, e.g. '!anc_users' (see get_ancestor_index)
+ANCESTOR_COLUMN_PREFIX = '!anc_'
+
+# Prefix of the virtual columns with the values of the aggregates of the rows, e.g. '!agg_total power' (see
+# add_aggregate)
+AGGREGATE_COLUMN_PREFIX = '!agg_'
+
+
+class IdSequence:
+    def __init__(self):
+        """
+        Thread safe sequence of row ids -> shared by a RelationalDf and its working copies, so ids are unique
+        across all copies
+        """
+        self._next_id = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks can't be pickled
+        return {'_next_id': self._next_id}
+
+    def __setstate__(self, state):
+        self._next_id = state['_next_id']
+        self._lock = threading.Lock()
+
+    def next(self, get_max_id, n=1):
+        """
+        Get the next id
+        :param get_max_id: function returning the max id of the table (None if it is empty) -> the sequence starts
+            after it on first use
+        :param n: number of ids to reserve -> the returned id and the n - 1 following ones
+        :return: int id
+        """
+        with self._lock:
+            if self._next_id is None:
+                max_id = get_max_id()
+                self._next_id = int(max_id) + 1 if max_id is not None else 1
+            row_id = self._next_id
+            self._next_id += n
+        return row_id
+
+    def advance(self, row_id):
+        """
+        Make sure the sequence continues after row_id (e.g. for rows added with ids of their own)
+        :param row_id: id that must not be handed out
+        """
+        with self._lock:
+            if self._next_id is not None:
+                self._next_id = max(self._next_id, int(row_id) + 1)
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compact_df(df, category_threshold=0.5, key_columns=('id',)):
+    """
+    Convert the columns of a df to memory-compact dtypes
+    - integer columns are downcast to the smallest integer type holding their values (key columns to at least
+      int32 -> room for new ids)
+    - float columns are downcast to float32 if no precision is lost
+    - string columns with few distinct values become categoricals, other string columns are stored as arrow
+      strings (if pyarrow is installed)
+
+    :param df: pd.DataFrame to convert
+    :param category_threshold: max ratio of distinct values to rows of a string column to store it as categorical
+    :param key_columns: id and foreign key columns
+    :return: pd.DataFrame with compact dtypes
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            pass
+        elif pd.api.types.is_integer_dtype(series):
+            if column in key_columns:
+                if len(series.index) == 0 or (series.min() >= np.iinfo(np.int32).min
+                                              and series.max() <= np.iinfo(np.int32).max):
+                    series = series.astype(np.int32)
+            else:
+                series = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            downcast = series.astype(np.float32)
+            if ((downcast == series) | series.isna()).all():
+                series = downcast
+        elif pd.api.types.is_object_dtype(series) and pd.api.types.infer_dtype(series, skipna=True) == 'string':
+            if series.nunique() <= category_threshold * len(series.index):
+                series = series.astype('category')
+            elif _pyarrow_available():
+                series = series.astype('string[pyarrow]')
+        columns[column] = series
+
+    return pd.DataFrame(columns, index=df.index)
+
+
+class AncestorIndex:
+    def __init__(self, table, ancestor_table, parent_table):
+        """
+        Precomputed id of the ancestor row of every row of a table in a table further up the hierarchy
+        -> the rows below a row of the ancestor table are found at any depth with one hash lookup. The index is kept
+        up to date when rows are added, deleted or re-parented (see RelationalDf.refresh_ancestor_index).
+
+        :param table: RelationalDf whose rows are indexed
+        :param ancestor_table: RelationalDf of the ancestor rows
+        :param parent_table: parent table of table on the path to ancestor_table (ancestor_table for a child table)
+        """
+        self.table = table
+        self.ancestor_table = ancestor_table
+        self.parent_table = parent_table
+        self.foreign_key_column = table.parent_tables[parent_table.table_id][1]
+
+        self.ancestor_ids = pd.Series(dtype=object)  # row label of table -> id of the ancestor row (None if none)
+        self.labels = {}  # {ancestor id: row labels of table}
+        # Incremented on every change of the index -> cached query results depending on it are invalid
+        self.version = 0
+
+    def lookup(self, keys):
+        """
+        Get the ancestor ids of rows from their foreign keys -> one hash lookup per distinct foreign key
+        :param keys: pd.Series of foreign key values (of the column pointing to parent_table)
+        :return: pd.Series of ancestor ids with the index of keys -> None if the chain of parents is broken
+        """
+        if self.parent_table is self.ancestor_table:
+            return keys.astype(object).where(keys.notna(), None)
+        parent_index = self.parent_table.get_ancestor_index(self.ancestor_table.table_id)
+        unique = pd.unique(keys.dropna()).tolist()
+        found = [(key, label) for key, label in zip(unique, self.parent_table.get_row_labels(unique))
+                 if label is not None]
+        # Position of every key in the found keys -> -1 (the appended None) for keys without a parent row
+        positions = pd.Index([key for key, label in found], dtype=object).get_indexer(keys)
+        ancestor_ids = parent_index.ancestor_ids.loc[[label for key, label in found]].to_numpy(dtype=object)
+        return pd.Series(np.append(ancestor_ids, None)[positions], index=keys.index, dtype=object)
+
+    def build(self):
+        """
+        (Re)build the index from scratch -> vectorized over all rows of table
+        """
+        self.ancestor_ids = self.lookup(self.table.get_column(self.foreign_key_column))
+        ancestor_ids = self.ancestor_ids
+        self.labels = {key: ancestor_ids.index[positions]
+                       for key, positions in ancestor_ids.groupby(ancestor_ids, sort=False).indices.items()}
+        self.version += 1
+
+    def get_labels(self, ancestor_id):
+        """
+        Get the row labels of table below a row of the ancestor table
+        :param ancestor_id: id of the row of the ancestor table
+        :return: pd.Index of row labels
+        """
+        return self.labels.get(ancestor_id, _NO_LABELS)
+
+    def update(self, labels):
+        """
+        Recompute the ancestors of rows of table (e.g. after they were added or re-parented)
+        :param labels: row labels of table
+        :return: pd.Index of the labels whose ancestor changed
+        """
+        labels = pd.Index(labels)
+        if len(labels) == 0:
+            return _NO_LABELS
+        new_ids = self.lookup(self.table.get_rows(labels)[self.foreign_key_column])
+        old_ids = self.ancestor_ids.reindex(labels)
+        unchanged = ((old_ids == new_ids) | (old_ids.isna() & new_ids.isna())).to_numpy(dtype=bool)
+        changed = labels[~unchanged]
+        if len(changed) == 0:
+            return changed
+
+        self._remove_labels(old_ids[~unchanged])
+        new_ids = new_ids[~unchanged]
+        for key, positions in new_ids.groupby(new_ids, sort=False).indices.items():
+            key_labels = new_ids.index[positions]
+            self.labels[key] = self.labels[key].append(key_labels).sort_values() if key in self.labels \
+                else key_labels
+        # Set the ancestors of indexed rows in place, append the ones of new rows
+        positions = self.ancestor_ids.index.get_indexer(changed)
+        known = positions >= 0
+        if known.any():
+            self.ancestor_ids.iloc[positions[known]] = new_ids.to_numpy()[known]
+        if not known.all():
+            self.ancestor_ids = pd.concat([self.ancestor_ids, new_ids[~known]])
+        self.version += 1
+        return changed
+
+    def remove(self, labels):
+        """
+        Remove deleted rows of table
+        :param labels: row labels of table
+        """
+        self._remove_labels(self.ancestor_ids.reindex(pd.Index(labels)))
+        self.ancestor_ids = self.ancestor_ids.drop(labels, errors='ignore')
+        self.version += 1
+
+    def _remove_labels(self, ancestor_ids):
+        for key, positions in ancestor_ids.groupby(ancestor_ids, sort=False).indices.items():
+            remaining = self.labels[key][~np.isin(self.labels[key], ancestor_ids.index[positions])]
+            if len(remaining) > 0:
+                self.labels[key] = remaining
+            else:
+                del self.labels[key]
+
+
+def _find_paths(table, get_neighbours):
+    # Shortest paths from table to every table reachable in the relation graph -> {table_id: [table, ..., other]}
+    paths = {table.table_id: [table]}
+    queue = [table]
+    while queue:
+        current = queue.pop(0)
+        for neighbour in get_neighbours(current):
+            if neighbour.table_id not in paths:
+                paths[neighbour.table_id] = paths[current.table_id] + [neighbour]
+                queue.append(neighbour)
+    del paths[table.table_id]
+    return paths
+
+
 class RelationalDf:
-    def __init__(self, table_id, table_name, df):
+    def __init__(self, table_id, table_name, df, compact=False, query_cache_size=DEFAULT_QUERY_CACHE_SIZE):
+        """
+        Table of the editor with its relations to other tables
+
+        :param table_id: id of the table
+        :param table_name: name of the table to display
+        :param df: pd.DataFrame of the table or a lazy data source (e.g. ArrowSource)
+            -> rows of a lazy table are read on demand, the whole df is only loaded once it is edited. If the
+            source supports pushdown (e.g. SqlSource), queries and edits are run by the source and no rows are held.
+        :param compact: If True, df is stored with memory-compact dtypes (see compact_df)
+        :param query_cache_size: Memory budget in bytes of the cached results of filter and sort queries
+            (see QueryCache) -> 0 disables the cache
+        """
 
-        self.df = df
         self.table_id = table_id
         self.table_name = table_name
 
         self.child_tables = {}  # dict of child_tables -> {child_table_name: child_table_df}
         self.parent_tables = {}  # dict of parent_tables -> {parent_table_name: (parent_table, foreign_key_column)
 
+        # Hash index of every foreign key column -> {foreign_key_column: {foreign_key_value: row labels of df}}
+        self.foreign_key_indexes = {}
+        self._id_index = None
+        # Ancestor rows of the rows of this table -> {ancestor_table_id: AncestorIndex}, built on first use
+        self.ancestor_indexes = {}
+        # Aggregate columns over the child tables -> {name: Aggregate} (see add_aggregate)
+        self.aggregates = {}
+
+        # Ids to assign to new rows
+        self.id_sequence = IdSequence()
+
+        # Store df with memory-compact dtypes
+        self.compact = compact
+
+        # Incremented on every edit -> rows added or deleted at _rows_version, cells of a column changed at
+        # _column_versions[column] (versions the cached query results depend on, see query_row_positions)
+        self.version = 0
+        self._rows_version = 0
+        self._column_versions = {}
+        self.query_cache = QueryCache(query_cache_size)
+
+        if isinstance(df, pd.DataFrame):
+            self.source = None
+            self.df = df
+        else:
+            # Lazy data source -> only the key columns are read to build the indexes
+            self.source = df
+            self._df = None
+
+    @property
+    def df(self):
+        if self.pushdown:
+            # Rows stay in the data source -> read on every access
+            return self.source.read()
+        if self._df is None:
+            # Load all rows of a lazy table -> labels are the row positions, so the indexes stay valid
+            logging.debug(f'Load all rows of table {self.table_id}')
+            df = self.source.read()
+            self._df = compact_df(df, key_columns=self.key_columns) if self.compact else df
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        if self.pushdown:
+            self.source.replace(df)
+            return
+        # Replacing the whole df invalidates all indexes
+        self._df = compact_df(df, key_columns=self.key_columns) if self.compact else df
+        self._id_index = None
+        for foreign_key_column in self.foreign_key_indexes:
+            self.build_foreign_key_index(foreign_key_column)
+        self.rebuild_ancestor_indexes()
+        for aggregate in self._dependent_aggregates():
+            aggregate.build()
+        self._rows_changed()
+
     def add_child_table(self, child_table, foreign_key_column):
         # Check if passed child_table is of class RelationalDF
         if not isinstance(child_table, RelationalDf):
@@ -23,6 +324,9 @@ class RelationalDf:
         # Add to child_table's list of parent_tables
         child_table.parent_tables[self.table_id] = (self, foreign_key_column)
 
+        # Index child_table's foreign key column -> for lookup of the child rows of a row of this table
+        child_table.build_foreign_key_index(foreign_key_column)
+
     def add_parent_table(self, parent_table, foreign_key_column):
         # Check if passed parent_table is of class RelationalDF
         if not isinstance(parent_table, RelationalDf):
@@ -37,3 +341,781 @@ class RelationalDf:
 
         # Add to parent_table's list of child_tables
         parent_table.child_tables[self.table_id] = self
+
+        # Index this table's foreign key column -> for lookup of the child rows of a row of parent_table
+        self.build_foreign_key_index(foreign_key_column)
+
+    def add_aggregate(self, name, child_table_id, function, column='id'):
+        """
+        Declare an aggregate column over a child table, e.g. the total power of the appliances of every user
+        -> computed once and updated by the edits of the child table (see Aggregate)
+        :param name: name of the aggregate column
+        :param child_table_id: table_id of the child table
+        :param function: 'sum', 'count', 'min', 'max' or 'mean'
+        :param column: aggregated column of the child table -> by default the id column (counts the child rows)
+        :return: Aggregate
+        """
+        if name in self.aggregates:
+            raise KeyError(f"'{name}' already exists as aggregate of '{self.table_id}'")
+        child_table = self.child_tables[child_table_id]
+        aggregate = Aggregate(child_table, child_table.parent_tables[self.table_id][1], column, function)
+        aggregate.build()
+        self.aggregates[name] = aggregate
+        return aggregate
+
+    def get_aggregates(self, df):
+        """
+        Get the aggregate columns of rows of this table
+        :param df: rows of this table (at least the id column)
+        :return: pd.DataFrame with one column per aggregate, indexed like df
+        """
+        return pd.DataFrame({name: aggregate.get_values(df['id']) for name, aggregate in self.aggregates.items()},
+                            index=df.index)
+
+    def _dependent_aggregates(self, columns=None):
+        # Aggregates of the parent tables over this table -> only those reading one of columns if passed
+        return [aggregate for parent_table, foreign_key_column in self.parent_tables.values()
+                for aggregate in parent_table.aggregates.values()
+                if aggregate.child_table is self and (columns is None or aggregate.column in columns
+                                                       or aggregate.foreign_key_column in columns)]
+
+    @property
+    def pushdown(self):
+        """
+        True if queries and edits are run by the data source (e.g. SqlSource) -> the table holds no rows
+        """
+        return self.source is not None and self.source.pushdown
+
+    def transaction(self):
+        """
+        Context manager running the edits of the block in one transaction of the data source (if it supports
+        pushdown) -> edits of in-memory tables are applied immediately
+        """
+        return self.source.transaction() if self.pushdown else contextlib.nullcontext()
+
+    @property
+    def is_loaded(self):
+        """
+        False while the rows of a lazy table are only read on demand
+        """
+        return self._df is not None
+
+    @property
+    def columns(self):
+        return self._df.columns if self.is_loaded else pd.Index(self.source.columns)
+
+    @property
+    def dtypes(self):
+        return self._df.dtypes if self.is_loaded else self.source.dtypes
+
+    @property
+    def row_count(self):
+        return len(self._df.index) if self.is_loaded else len(self.source)
+
+    def get_column(self, column):
+        """
+        Get one column -> read from the data source without loading the other columns if the table is lazy
+        :param column: column of df
+        :return: pd.Series indexed by the row labels
+        """
+        return self._df[column] if self.is_loaded else self.source.read([column])[column]
+
+    def take_rows(self, positions):
+        """
+        Get rows by position -> read from the data source without loading the other rows if the table is lazy
+        :param positions: row positions in df
+        :return: pd.DataFrame
+        """
+        # The labels of a lazy table are the row positions
+        return self._df.take(positions) if self.is_loaded else self.source.take(positions)
+
+    def get_rows(self, labels):
+        """
+        Get rows by label -> read from the data source without loading the other rows if the table is lazy
+        :param labels: row labels of df
+        :return: pd.DataFrame
+        """
+        return self._df.loc[labels] if self.is_loaded else self.source.take(labels)
+
+    @property
+    def key_columns(self):
+        """
+        id column and foreign key columns of the table
+        """
+        return ['id'] + [foreign_key_column for parent_table, foreign_key_column in self.parent_tables.values()]
+
+    @property
+    def id_index(self):
+        """
+        Hash index of the id column -> {row_id: row label of df}, built on first use
+        """
+        if self._id_index is None:
+            ids = self.get_column('id')
+            self._id_index = dict(zip(ids.tolist(), ids.index))
+        return self._id_index
+
+    def next_id(self):
+        """
+        Get a new unique id for a row of this table (ids are never handed out twice)
+        -> ids of tables held by a database are reserved in the database (see SqlSource.next_ids)
+        :return: int id
+        """
+        if self.pushdown:
+            return self.source.next_ids(1)
+        return self.id_sequence.next(self._max_id)
+
+    def next_ids(self, n):
+        """
+        Get n new unique ids at once (e.g. for rows added in bulk)
+        :param n: number of ids
+        :return: np.ndarray of int ids
+        """
+        start = self.source.next_ids(n) if self.pushdown else self.id_sequence.next(self._max_id, n)
+        return np.arange(start, start + n)
+
+    def _max_id(self):
+        ids = self.get_column('id')
+        return ids.max() if len(ids.index) > 0 else None
+
+    def build_foreign_key_index(self, foreign_key_column):
+        """
+        (Re)build the hash index of a foreign key column from scratch
+        :param foreign_key_column: foreign key column of df
+        """
+        if foreign_key_column not in self.columns:
+            raise KeyError(f"'{foreign_key_column}' is not a column of table '{self.table_id}'")
+
+        if self.pushdown:
+            # Indexed in the database
+            self.source.create_index(foreign_key_column)
+            return
+        if self.compact and self._df is not None:
+            # Compacted like any other column before the table was related -> keys need room for new ids
+            self._df[foreign_key_column] = compact_df(self._df[[foreign_key_column]],
+                                                      key_columns=[foreign_key_column])[foreign_key_column]
+
+        column = self.get_column(foreign_key_column)
+        labels = column.index
+        self.foreign_key_indexes[foreign_key_column] = {
+            key: labels[positions] for key, positions in column.groupby(column, sort=False).indices.items()
+        }
+
+    def get_foreign_key_labels(self, foreign_key_column, foreign_key_value):
+        """
+        Get the row labels of df with the passed value in a foreign key column -> hash lookup, no scan of df
+        :param foreign_key_column: foreign key column of df
+        :param foreign_key_value: value to look up, e.g. the id of a row of the parent table
+        :return: pd.Index of row labels
+        """
+        return self.foreign_key_indexes[foreign_key_column].get(foreign_key_value, _NO_LABELS)
+
+    def get_child_rows(self, child_table_id, row_id):
+        """
+        Get the rows of a child table belonging to one row of this table
+        :param child_table_id: table_id of the child table
+        :param row_id: id of the row of this table
+        :return: pd.DataFrame with the rows of the child table
+        """
+        child_table = self.child_tables[child_table_id]
+        foreign_key_column = child_table.parent_tables[self.table_id][1]
+        if child_table.pushdown:
+            return child_table.source.select_where(foreign_key_column, row_id)
+        return child_table.get_rows(child_table.get_foreign_key_labels(foreign_key_column, row_id))
+
+    def get_descendant_paths(self):
+        """
+        Get the tables below this table at any depth (following child_tables)
+        :return: dict {table_id: [self, child_table, ..., descendant_table]} -> shortest path to every descendant
+        """
+        return _find_paths(self, lambda table: table.child_tables.values())
+
+    def get_ancestor_paths(self):
+        """
+        Get the tables above this table at any depth (following parent_tables)
+        :return: dict {table_id: [self, parent_table, ..., ancestor_table]} -> shortest path to every ancestor
+        """
+        return _find_paths(self, lambda table: [parent_table for parent_table, foreign_key_column
+                                                in table.parent_tables.values()])
+
+    def get_ancestor_index(self, ancestor_table_id):
+        """
+        Get the index of the rows of this table by the id of their ancestor row in a table further up the hierarchy
+        -> built on first use (together with the indexes of the tables in between) and kept up to date by the edits
+        :param ancestor_table_id: table_id of the ancestor table
+        :return: AncestorIndex
+        """
+        if ancestor_table_id not in self.ancestor_indexes:
+            path = self.get_ancestor_paths().get(ancestor_table_id)
+            if path is None:
+                raise KeyError(f"'{ancestor_table_id}' is no ancestor table of '{self.table_id}'")
+            if any(table.pushdown for table in path[:-1]):
+                # Edits of the database are not seen by the index
+                raise ValueError(f"Rows of '{self.table_id}' can't be indexed by their ancestors in "
+                                 f"'{ancestor_table_id}': a table in between is held by a database")
+            index = AncestorIndex(self, path[-1], path[1])
+            index.build()
+            self.ancestor_indexes[ancestor_table_id] = index
+        return self.ancestor_indexes[ancestor_table_id]
+
+    def get_descendant_rows(self, descendant_table_id, row_id):
+        """
+        Get the rows of a table at any depth below this table belonging to one row of this table
+        -> one lookup in the ancestor index of the descendant table. If a table on the path is held by a database
+        (see SqlSource), the levels are queried one after the other.
+        :param descendant_table_id: table_id of the descendant table
+        :param row_id: id of the row of this table
+        :return: pd.DataFrame with the rows of the descendant table
+        """
+        path = self.get_descendant_paths().get(descendant_table_id)
+        if path is None:
+            raise KeyError(f"'{descendant_table_id}' is no descendant table of '{self.table_id}'")
+        if len(path) == 2:
+            return self.get_child_rows(descendant_table_id, row_id)
+
+        descendant_table = path[-1]
+        if any(table.pushdown for table in path[1:]):
+            row_ids = [row_id]
+            for parent_table, child_table in zip(path[:-1], path[1:]):
+                rows = child_table.get_rows_where_in(child_table.parent_tables[parent_table.table_id][1], row_ids)
+                row_ids = rows['id'].tolist()
+            return rows
+        return descendant_table.get_rows(descendant_table.get_ancestor_index(self.table_id).get_labels(row_id))
+
+    def refresh_ancestor_index(self, ancestor_table_id, labels, row_ids=()):
+        """
+        Recompute the ancestors of rows of this table and of the rows below them (e.g. after rows were re-parented)
+        :param ancestor_table_id: table_id of the ancestor table
+        :param labels: row labels of this table to recompute
+        :param row_ids: further ids of this table whose child rows must be recomputed (e.g. ids of deleted rows)
+        """
+        changed = self.ancestor_indexes[ancestor_table_id].update(labels)
+        row_ids = set(row_ids)
+        if len(changed) > 0:
+            row_ids.update(self.get_rows(changed)['id'].tolist())
+        if not row_ids:
+            return
+
+        # Rows below the changed rows -> their ancestor is looked up through the changed rows
+        for child_table in self.child_tables.values():
+            child_index = child_table.ancestor_indexes.get(ancestor_table_id)
+            if child_index is not None and child_index.parent_table is self:
+                child_labels = child_table.get_rows_where_in(child_index.foreign_key_column, list(row_ids)).index
+                child_table.refresh_ancestor_index(ancestor_table_id, child_labels)
+
+    def rebuild_ancestor_indexes(self, ancestor_table_ids=None):
+        """
+        (Re)build the ancestor indexes of this table and the indexes of the tables below depending on them
+        :param ancestor_table_ids: table_ids of the ancestor tables -> all ancestor indexes if None
+        """
+        rebuilt = set(self.ancestor_indexes) if ancestor_table_ids is None \
+            else set(self.ancestor_indexes) & set(ancestor_table_ids)
+        for ancestor_table_id in rebuilt:
+            self.ancestor_indexes[ancestor_table_id].build()
+        for child_table in self.child_tables.values():
+            dependent = [ancestor_table_id for ancestor_table_id, index in child_table.ancestor_indexes.items()
+                         if index.parent_table is self and ancestor_table_id in rebuilt]
+            if dependent:
+                child_table.rebuild_ancestor_indexes(dependent)
+
+    def _update_ancestor_indexes(self, labels, row_ids=()):
+        # Changed foreign keys or ids of rows of this table -> recompute the rows and the rows below them
+        for ancestor_table_id in self.ancestor_indexes:
+            self.refresh_ancestor_index(ancestor_table_id, labels, row_ids)
+
+    def query_df(self, filter_query, column_resolver=None, sort_by=None):
+        """
+        Get the rows a filter_query has to be evaluated on
+        -> if the rows of one parent are queried (drill down from the parent table), only the matching rows looked
+        up in the foreign key index, the rows below one ancestor ('!anc_<table_id>' column) in the ancestor index,
+        otherwise all rows (of a lazy table that is not loaded, only the filtered and sorted columns are read).
+        The values of the filtered and sorted aggregate columns ('!agg_<name>' column) are added to the rows.
+        :param filter_query: datatable filter_query
+        :param column_resolver: optional function mapping datatable column ids to df column names
+        :param sort_by: datatable sort_by list -> its columns are read as well
+        :return: pd.DataFrame
+        """
+        aggregate_columns = self._aggregate_columns(filter_query, sort_by, column_resolver)
+        return self._add_aggregate_columns(self._query_rows_df(filter_query, column_resolver, sort_by,
+                                                               bool(aggregate_columns)), aggregate_columns)
+
+    def _query_rows_df(self, filter_query, column_resolver, sort_by, read_ids):
+        # Rows of query_df without the aggregate columns -> read_ids: read the id column of a lazy table as well
+        column_ids = []
+        for column_id, operator, value, case_sensitive in parse_filter_query(filter_query):
+            column = column_resolver(column_id) if column_resolver is not None else column_id
+            if operator == 'eq' and column in self.foreign_key_indexes:
+                return self.get_rows(self.get_foreign_key_labels(column, value))
+            if operator == 'eq' and column is not None and column.startswith(ANCESTOR_COLUMN_PREFIX):
+                # Rows below one row of a table further up (drill down over several levels)
+                index = self.get_ancestor_index(column[len(ANCESTOR_COLUMN_PREFIX):])
+                return self.get_rows(index.get_labels(value))
+            column_ids.append(column_id)
+        if self.is_loaded:
+            return self.df
+
+        column_ids += [entry['column_id'] for entry in sort_by or []]
+        columns = [column_resolver(column_id) if column_resolver is not None else column_id for column_id in column_ids]
+        if read_ids:
+            columns.append('id')
+        columns = [column for column in dict.fromkeys(columns) if column in self.columns]
+        if not columns:
+            return pd.DataFrame(index=pd.RangeIndex(self.row_count))
+        # The labels of a lazy table are the row positions
+        return self.source.read(columns)
+
+    def _aggregate_columns(self, filter_query, sort_by, column_resolver):
+        # Aggregate columns ('!agg_<name>') a query filters or sorts by
+        column_ids = [column_id for column_id, operator, value, case_sensitive in parse_filter_query(filter_query)]
+        column_ids += [entry['column_id'] for entry in sort_by or []]
+        columns = [column_resolver(column_id) if column_resolver is not None else column_id for column_id in column_ids]
+        return [column for column in dict.fromkeys(columns) if column is not None
+                and column.startswith(AGGREGATE_COLUMN_PREFIX)
+                and column[len(AGGREGATE_COLUMN_PREFIX):] in self.aggregates]
+
+    def _add_aggregate_columns(self, df, aggregate_columns):
+        if not aggregate_columns:
+            return df
+        # Shallow copy -> the columns of df are not copied, the aggregate columns are only added to the copy
+        df = df.copy(deep=False)
+        for column in aggregate_columns:
+            # The aggregates are object arrays (JSON values) -> numeric dtype to filter and sort them as numbers
+            values = self.aggregates[column[len(AGGREGATE_COLUMN_PREFIX):]].get_values(df['id'])
+            df[column] = pd.Series(values, index=df.index).infer_objects()
+        return df
+
+    def query_rows(self, filter_query, column_resolver=None):
+        """
+        Get the rows matching a filter_query
+        :param filter_query: datatable filter_query
+        :param column_resolver: optional function mapping datatable column ids to df column names
+        :return: pd.DataFrame
+        """
+        if self.pushdown:
+            return self.source.query(None, None, filter_query, column_resolver=column_resolver)[0]
+        if not filter_query:
+            return self.df.copy()
+        return self.take_rows(self.query_row_positions(filter_query, column_resolver=column_resolver))
+
+    def query_page(self, page_current, page_size, filter_query=None, sort_by=None, column_resolver=None):
+        """
+        Get one page of the rows matching a filter_query, ordered by sort_by
+        :param page_current: index of the page (starting at 0)
+        :param page_size: number of rows per page
+        :param filter_query: datatable filter_query
+        :param sort_by: datatable sort_by list
+        :param column_resolver: optional function mapping datatable column ids to df column names
+        :return: (page_df, page_count) tuple
+        """
+        if self.pushdown:
+            return self.source.query(page_current, page_size, filter_query, sort_by, column_resolver)
+
+        if not self.is_loaded and not filter_query and not sort_by:
+            # Pages of an unfiltered lazy table are read from the data source directly
+            page_count = max(1, -(-self.row_count // page_size))
+            start = page_current * page_size
+            return self.get_rows(np.arange(start, min(start + page_size, self.row_count))), page_count
+
+        if not filter_query and not sort_by:
+            df = self.df
+            return get_page(df, np.arange(len(df.index)), page_current, page_size)
+
+        # Paging through the result of a query only takes the rows of each page
+        positions = self.query_row_positions(filter_query, sort_by, column_resolver)
+        page_count = max(1, -(-len(positions) // page_size))
+        start = page_current * page_size
+        return self.take_rows(positions[start:start + page_size]), page_count
+
+    def query_row_positions(self, filter_query=None, sort_by=None, column_resolver=None):
+        """
+        Get the positions in df of the rows matching a filter_query, ordered by sort_by
+        -> cached until rows are added or deleted or the filtered or sorted columns (or the ancestor indexes of
+        '!anc_' conditions) change (see QueryCache), e.g. going back to the child rows of a parent row only takes a
+        cache lookup
+        :param filter_query: datatable filter_query
+        :param sort_by: datatable sort_by list
+        :param column_resolver: optional function mapping datatable column ids to df column names
+        :return: numpy array of row positions (see take_rows)
+        """
+        key = (filter_query or '', tuple((entry['column_id'], entry['direction']) for entry in sort_by or []),
+               column_resolver)
+        # Aggregate values change with the child tables -> results of queries of aggregate columns are not cached
+        cached = not self._aggregate_columns(filter_query, sort_by, column_resolver)
+        dependencies = self._query_dependencies(filter_query, sort_by, column_resolver)
+        positions = self.query_cache.get(key, dependencies) if cached else None
+        if positions is None:
+            df = self.query_df(filter_query, column_resolver, sort_by)
+            positions = query_positions(df, filter_query, sort_by, column_resolver)
+            if df is not self._df:
+                # Rows looked up in an index -> their positions in df (the labels of a lazy table that is not loaded
+                # are the row positions)
+                labels = df.index[positions]
+                positions = self._df.index.get_indexer(labels) if self.is_loaded else labels.to_numpy()
+            if cached:
+                self.query_cache.put(key, dependencies, positions)
+        return positions
+
+    def _query_dependencies(self, filter_query, sort_by, column_resolver):
+        # Versions the result of a query depends on -> taken before the query is run
+        columns = [(column_id, operator) for column_id, operator, value, case_sensitive
+                   in parse_filter_query(filter_query)]
+        columns += [(entry['column_id'], None) for entry in sort_by or []]
+
+        dependencies = [self._rows_version]
+        for column_id, operator in columns:
+            column = column_resolver(column_id) if column_resolver is not None else column_id
+            if operator == 'eq' and column is not None and column.startswith(ANCESTOR_COLUMN_PREFIX):
+                # Rows below an ancestor row change with the foreign keys of the tables in between
+                dependencies.append(self.get_ancestor_index(column[len(ANCESTOR_COLUMN_PREFIX):]).version)
+            else:
+                dependencies.append(self._column_versions.get(column, 0))
+        return tuple(dependencies)
+
+    def add_rows(self, rows):
+        """
+        Append rows to df and update the indexes
+        :param rows: list of dicts (column -> value) to append
+        :return: pd.Index of the row labels of the new rows
+        """
+        if self.pushdown:
+            ids = [row['id'] for row in rows]
+            with self.transaction():
+                self.source.insert(rows)
+                labels = self.get_row_labels(ids)
+            if ids:
+                self.id_sequence.advance(max(ids))
+            return pd.Index(labels)
+
+        # New rows get labels following the current ones -> labels of existing rows stay valid
+        start = self.df.index.max() + 1 if len(self.df.index) > 0 else 0
+        new_df = pd.DataFrame(rows, columns=self.df.columns, index=pd.RangeIndex(start, start + len(rows)))
+        new_df = self._cast_like_df(new_df)
+        self._df = pd.concat([self.df, new_df]) if len(self.df.index) > 0 else new_df
+
+        for foreign_key_column in self.foreign_key_indexes:
+            for key, positions in new_df.groupby(foreign_key_column, sort=False).indices.items():
+                self._add_to_foreign_key_index(foreign_key_column, key, new_df.index[positions])
+        if self._id_index is not None:
+            self._id_index.update(zip(new_df['id'].tolist(), new_df.index))
+
+        # Rows added with ids of their own (e.g. from a change log) -> id sequence continues after them
+        if len(new_df.index) > 0:
+            self.id_sequence.advance(new_df['id'].max())
+
+        self._update_ancestor_indexes(new_df.index)
+        for aggregate in self._dependent_aggregates():
+            aggregate.update(added=new_df)
+        self._rows_changed()
+
+        return new_df.index
+
+    def update_row(self, row_id, values):
+        """
+        Update cells of one row of df and the indexes
+        :param row_id: id of the row to update
+        :param values: dict of column -> new value
+        """
+        self._update_row(row_id, values)
+
+    def _update_row(self, row_id, values, maintain_aggregates=True):
+        # maintain_aggregates=False -> the aggregates are updated by the caller (see update_rows)
+        label = self.get_row_label(row_id)
+        if self.pushdown:
+            self.source.update(label, values)
+            if 'id' in values:
+                self.id_sequence.advance(values['id'])
+            return
+
+        aggregates = self._dependent_aggregates(values) if maintain_aggregates else []
+        old_row = self.df.loc[[label]] if aggregates else None
+
+        for column, value in values.items():
+            if column in self.foreign_key_indexes:
+                old_value = self.df.at[label, column]
+                if not pd.isna(old_value):
+                    self._remove_from_foreign_key_index(column, old_value, [label])
+                if not pd.isna(value):
+                    self._add_to_foreign_key_index(column, value, pd.Index([label]))
+            if column == 'id':
+                self.id_index[value] = self.id_index.pop(row_id)
+                # Ids changed by hand -> id sequence continues after them (see add_rows)
+                self.id_sequence.advance(value)
+            if isinstance(self.df[column].dtype, pd.CategoricalDtype):
+                if not pd.isna(value) and value not in self.df[column].cat.categories:
+                    self._df[column] = self.df[column].cat.add_categories([value])
+            else:
+                self._widen_column(column, [value])
+            self.df.at[label, column] = value
+
+        if self.ancestor_indexes and ('id' in values or any(column in self.foreign_key_indexes for column in values)):
+            self._update_ancestor_indexes([label], [row_id, values.get('id', row_id)])
+        for aggregate in aggregates:
+            aggregate.update(old_row, self.df.loc[[label]])
+        self._columns_changed(values)
+
+    def update_rows(self, updated):
+        """
+        Update cells of many rows of df and the indexes -> rows with the same updated columns (e.g. all rows of a
+        bulk edit) are updated at once
+        :param updated: dict of updated rows -> {row_id: {column: new_value}}
+        """
+        if self.pushdown:
+            with self.transaction():
+                for row_id, values in updated.items():
+                    self.update_row(row_id, values)
+            return
+
+        groups = {}
+        for row_id, values in updated.items():
+            groups.setdefault(tuple(values), []).append(row_id)
+        self._update_groups([(row_ids, {column: [updated[row_id][column] for row_id in row_ids] for column in columns})
+                             for columns, row_ids in groups.items()])
+
+    def _update_groups(self, groups):
+        # groups: list of (row_ids, {column: new values}) -> the values are array-like in the order of row_ids or a
+        # single value for all rows
+        def row_values(values, i):
+            return {column: value[i] if pd.api.types.is_list_like(value) else value for column, value in values.items()}
+
+        updated_ids = [row_id for row_ids, values in groups for row_id in row_ids]
+        columns = {column for row_ids, values in groups for column in values}
+
+        # Rows whose ancestors may change -> re-parented rows and rows with new ids
+        reparented_ids = []
+        if self.ancestor_indexes:
+            for row_ids, values in groups:
+                if 'id' in values or any(column in self.foreign_key_indexes for column in values):
+                    reparented_ids += list(row_ids)
+                    if 'id' in values:
+                        reparented_ids += [row_values(values, i)['id'] for i in range(len(row_ids))]
+
+        # Aggregates of the parent tables reading updated columns -> get the old and new values of the rows
+        aggregates = self._dependent_aggregates(columns)
+        if aggregates:
+            aggregated_labels = pd.Index([label for label in self.get_row_labels(updated_ids) if label is not None])
+            old_rows = self.df.loc[aggregated_labels]
+
+        for row_ids, values in groups:
+            if len(row_ids) == 1:
+                # The aggregates of all updated rows are updated at once below
+                self._update_row(row_ids[0], row_values(values, 0), maintain_aggregates=False)
+                continue
+
+            labels = self.get_row_labels(row_ids)
+            if None in labels:
+                raise KeyError(f"No row with id '{row_ids[labels.index(None)]}' in table '{self.table_id}'")
+            labels = pd.Index(labels)
+
+            for column, value in values.items():
+                new_values = pd.Series(value, index=labels)
+                if column in self.foreign_key_indexes:
+                    old_values = self.df.loc[labels, column]
+                    for key, positions in old_values.groupby(old_values, sort=False).indices.items():
+                        self._remove_from_foreign_key_index(column, key, labels[positions])
+                    for key, positions in new_values.groupby(new_values, sort=False).indices.items():
+                        self._add_to_foreign_key_index(column, key, labels[positions])
+                if column == 'id':
+                    id_index = self.id_index
+                    for old_id in self.df.loc[labels, 'id'].tolist():
+                        del id_index[old_id]
+                    id_index.update(zip(new_values.tolist(), labels))
+                    self.id_sequence.advance(new_values.max())
+                if isinstance(self.df[column].dtype, pd.CategoricalDtype):
+                    new_categories = [c for c in new_values.dropna().unique()
+                                      if c not in self.df[column].cat.categories]
+                    if new_categories:
+                        self._df[column] = self.df[column].cat.add_categories(new_categories)
+                else:
+                    self._widen_column(column, new_values.to_numpy())
+                self._df.loc[labels, column] = new_values.to_numpy()
+            self._columns_changed(values)
+
+        if reparented_ids:
+            labels = [label for label in self.get_row_labels(reparented_ids) if label is not None]
+            self._update_ancestor_indexes(labels, reparented_ids)
+        if aggregates:
+            new_rows = self.df.loc[aggregated_labels]
+            for aggregate in aggregates:
+                aggregate.update(old_rows, new_rows)
+
+    def _widen_column(self, column, values):
+        # Widen the dtype of a numeric column that can't hold new values (e.g. float results of an expression on an
+        # integer column, values beyond a downcast integer or float32 column, see compact_df)
+        dtype = self.df[column].dtype
+        if not isinstance(dtype, np.dtype) or dtype.kind not in 'iuf':
+            return
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = pd.Series(values).infer_objects()
+            if values.dtype == object and values.isna().all():
+                # Only missing values (None) -> NaN
+                values = values.astype(float)
+            values = values.to_numpy()
+        if values.dtype.kind in 'iu' and dtype.kind in 'iu':
+            info = np.iinfo(dtype)
+            fits = values.size == 0 or (values.min() >= info.min and values.max() <= info.max)
+            new_dtype = np.int64
+        elif values.dtype.kind == 'f':
+            # Missing values turn integer columns into float columns (see _cast_like_df)
+            with np.errstate(invalid='ignore', over='ignore'):
+                fits = ((values.astype(dtype) == values) | (np.isnan(values) & (dtype.kind == 'f'))).all()
+            new_dtype = np.float64
+        elif values.dtype.kind in 'iu':
+            fits = True
+            new_dtype = dtype
+        else:
+            fits = False
+            new_dtype = object
+        if not fits:
+            self._df[column] = self.df[column].astype(new_dtype)
+
+    def delete_rows(self, row_ids):
+        """
+        Delete rows from df and update the indexes
+        :param row_ids: ids of the rows to delete
+        """
+        if self.pushdown:
+            self.source.delete([label for label in self.get_row_labels(row_ids) if label is not None])
+            return
+
+        deleted_df = self.df.loc[[self.id_index[row_id] for row_id in row_ids if row_id in self.id_index]]
+
+        for foreign_key_column in self.foreign_key_indexes:
+            for key, positions in deleted_df.groupby(foreign_key_column, sort=False).indices.items():
+                self._remove_from_foreign_key_index(foreign_key_column, key, deleted_df.index[positions])
+
+        for row_id in deleted_df['id'].tolist():
+            del self._id_index[row_id]
+
+        # Labels of the remaining rows are kept -> foreign key indexes stay valid
+        self._df = self.df.drop(index=deleted_df.index)
+
+        # Rows below the deleted rows lose their ancestor
+        for index in self.ancestor_indexes.values():
+            index.remove(deleted_df.index)
+        self._update_ancestor_indexes(_NO_LABELS, deleted_df['id'].tolist())
+        for aggregate in self._dependent_aggregates():
+            aggregate.update(removed=deleted_df)
+        self._rows_changed()
+
+    def _rows_changed(self):
+        # Called after the edits -> a query running meanwhile caches its result under the old version
+        self.version += 1
+        self._rows_version = self.version
+
+    def _columns_changed(self, columns):
+        self.version += 1
+        for column in columns:
+            self._column_versions[column] = self.version
+
+    def get_rows_where_in(self, column, values):
+        """
+        Get the rows with one of the passed values in a column (e.g. the child rows of many parent rows)
+        -> looked up in the foreign key index if the column is indexed
+        :param column: column of df
+        :param values: values to look up
+        :return: pd.DataFrame
+        """
+        if self.pushdown:
+            return self.source.select_in(column, values)
+        if column in self.foreign_key_indexes:
+            index = self.foreign_key_indexes[column]
+            labels = [index[value] for value in values if value in index]
+            return self.get_rows(pd.Index(np.sort(np.concatenate(labels))) if labels else _NO_LABELS)
+        df = self.df
+        return df[df[column].isin(list(values))]
+
+    def get_row_label(self, row_id):
+        """
+        Get the label of the row of df with the passed id
+        :param row_id: id of the row
+        :return: row label
+        """
+        label = self.get_row_labels([row_id])[0]
+        if label is None:
+            raise KeyError(f"No row with id '{row_id}' in table '{self.table_id}'")
+        return label
+
+    def get_row_labels(self, row_ids):
+        """
+        Get the labels of the rows of df with the passed ids
+        :param row_ids: ids of the rows
+        :return: list of row labels -> None for ids not in the table
+        """
+        if self.pushdown:
+            labels = self.source.lookup(row_ids)
+        else:
+            labels = self.id_index
+        return [labels.get(row_id) for row_id in row_ids]
+
+    def _cast_like_df(self, new_df):
+        # Cast new rows to the dtypes of df -> numeric columns that can't hold the new values (missing values,
+        # fractions in integer columns, values beyond a downcast column) are widened first, like on updates
+        for column, dtype in self.df.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                # New values become categories of the column
+                new_categories = new_df[column].dropna().unique()
+                new_categories = [c for c in new_categories if c not in dtype.categories]
+                if new_categories:
+                    self._df[column] = self.df[column].cat.add_categories(new_categories)
+            else:
+                self._widen_column(column, new_df[column].to_numpy())
+            dtype = self.df[column].dtype
+            try:
+                new_df[column] = new_df[column].astype(dtype)
+            except (TypeError, ValueError):
+                if pd.api.types.is_numeric_dtype(dtype):
+                    try:
+                        new_df[column] = new_df[column].astype(float)
+                    except (TypeError, ValueError):
+                        pass
+        return new_df
+
+    def _add_to_foreign_key_index(self, foreign_key_column, key, labels):
+        index = self.foreign_key_indexes[foreign_key_column]
+        # Keep labels sorted -> child rows are returned in the order of df
+        index[key] = index[key].append(labels).sort_values() if key in index else labels
+
+    def _remove_from_foreign_key_index(self, foreign_key_column, key, labels):
+        index = self.foreign_key_indexes[foreign_key_column]
+        if len(labels) == len(index[key]):
+            # All rows of the key are removed (labels are always a subset of the key's labels)
+            del index[key]
+            return
+        remaining = index[key][~np.isin(index[key], labels)]
+        if len(remaining) > 0:
+            index[key] = remaining
+        else:
+            del index[key]
+
+
+def copy_tables(datatables):
+    """
+    Create independent working copies of RelationalDfs
+    -> dfs are copied, relations between the passed tables are re-created between the copies and the copies share
+    the id sequences of the originals. Tables held by a data source supporting pushdown (e.g. SqlSource) are not
+    copied -> the copies read and write the same database table.
+
+    :param datatables: dict of RelationalDfs -> {table_id: RelationalDf}
+    :return: dict of copied RelationalDfs -> {table_id: RelationalDf}
+    """
+    copies = {}
+    for table_id, table in datatables.items():
+        # Lazy tables that were not loaded yet share their data source
+        df = table.df.copy() if table.is_loaded else table.source
+        copies[table_id] = RelationalDf(table.table_id, table.table_name, df)
+        copies[table_id].id_sequence = table.id_sequence
+        copies[table_id].compact = table.compact
+        copies[table_id].query_cache.max_bytes = table.query_cache.max_bytes
+
+    for table_id, table in datatables.items():
+        for child_table_id, child_table in table.child_tables.items():
+            if child_table_id in copies:
+                copies[table_id].add_child_table(copies[child_table_id], child_table.parent_tables[table_id][1])
+
+    for table_id, table in datatables.items():
+        for name, aggregate in table.aggregates.items():
+            if aggregate.child_table.table_id in copies:
+                copies[table_id].add_aggregate(name, aggregate.child_table.table_id, aggregate.function,
+                                               aggregate.column)
+
+    return copies
@@ -0,0 +1,87 @@
+def check_multiprocess_serving(datatables, sticky_sessions=False):
+    """
+    Check if the tables can be served by multiple worker processes
+    -> edits of tables held in memory are only seen by the worker process that handled them, only tables held by a
+    SQLite database (see SqlSource) are shared between the workers. DuckDB database files can only be opened by one
+    process at a time. The edit state of the browsers (sessions, changes to
+    save, undo history) is kept per worker -> the requests of a browser must always reach the same worker (sticky
+    sessions of the load balancer).
+
+    :param datatables: dict of RelationalDfs -> {table_id: RelationalDf}
+    :param sticky_sessions: True if the requests of a browser are always routed to the same worker
+    :raises ValueError: if a table is held in memory or by DuckDB or the sessions are not sticky
+    """
+    problems = []
+    for table_id, table in datatables.items():
+        if not table.pushdown:
+            problems.append(f"table '{table_id}' is held in memory -> its edits would only be seen by one worker "
+                            f"process")
+        elif getattr(table.source, 'backend', None) == 'duckdb':
+            problems.append(f"table '{table_id}' is held by DuckDB -> its database file can't be opened by several "
+                            f"worker processes")
+    if not sticky_sessions:
+        problems.append('the edit state of a browser is kept by one worker process -> route the requests of a browser '
+                        'to the same worker and pass sticky_sessions=True')
+    if problems:
+        raise ValueError('Tables can\'t be served by multiple worker processes: ' + '; '.join(problems))
+
+
+def serve_waitress(wsgi_app, host, port, threads):
+    """
+    Serve a WSGI app in this process with a pool of threads (works on every platform)
+    """
+    try:
+        import waitress
+    except ImportError:
+        raise ImportError('waitress is required to serve the editor with threads=... -> pip install waitress')
+    waitress.serve(wsgi_app, host=host, port=port, threads=threads)
+
+
+def serve_gunicorn(wsgi_app, host, port, workers, threads, options=None):
+    """
+    Serve a WSGI app with gunicorn worker processes (POSIX only)
+    -> the app is loaded before the workers are forked (preload), so the workers share the memory of the tables
+    loaded at startup (copy-on-write). Database connections are not shared, every worker opens its own (see
+    SqlSource.connection).
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise ImportError('gunicorn is required to serve the editor with workers > 1 -> pip install gunicorn')
+
+    class Application(BaseApplication):
+        def load_config(self):
+            config = {'bind': f'{host}:{port}', 'workers': workers, 'threads': threads, 'preload_app': True}
+            config.update(options or {})
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return wsgi_app
+
+    Application().run()
+
+
+def serve(editor, host='127.0.0.1', port=None, workers=1, threads=8, options=None, sticky_sessions=False):
+    """
+    Serve a DatatableEditor for production -> multiple threads per process and (with workers > 1) multiple processes,
+    so a slow callback doesn't block the other users
+
+    :param editor: DatatableEditor
+    :param host: interface to listen on
+    :param port: port to listen on -> if None, the port of the editor
+    :param workers: number of worker processes (gunicorn), 1 serves in this process (waitress)
+    :param threads: number of threads per worker process
+    :param options: further gunicorn settings (only with workers > 1)
+    :param sticky_sessions: True if the requests of a browser are always routed to the same worker (required for
+        workers > 1, see check_multiprocess_serving)
+    """
+    port = editor.port if port is None else port
+    if workers > 1:
+        check_multiprocess_serving(editor.datatables, sticky_sessions)
+        # The connections opened while loading the tables can't be used by the forked workers
+        for table in editor.datatables.values():
+            table.source.close()
+        serve_gunicorn(editor.server, host, port, workers, threads, options)
+    else:
+        serve_waitress(editor.server, host, port, threads)
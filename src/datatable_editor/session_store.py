@@ -0,0 +1,138 @@
+import logging
+import os
+import pickle
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+from datatable_editor.operation_log import OperationLog
+from datatable_editor.relational_df import copy_tables
+
+
+class Session:
+    def __init__(self, session_id, datatables, operation_log=None):
+        """
+        Edit state of one editor session (browser tab)
+
+        :param session_id: id of the session
+        :param datatables: dict of RelationalDfs the session works on -> {table_id: RelationalDf}
+        :param operation_log: OperationLog of the edits to undo -> if None, an OperationLog without disk spill
+        """
+        self.session_id = session_id
+        self.datatables = datatables
+
+        # Changes applied to the RelationalDfs since the last save
+        self.pending_changes = []
+
+        # Undo/redo history of the edits
+        self.operation_log = operation_log if operation_log is not None else OperationLog()
+
+
+class SessionStore:
+    def __init__(self, datatables, max_sessions=10, spill_dir=None, max_operations=10000):
+        """
+        In-process LRU store of the working copies of the tables of every session
+        -> least recently used sessions are evicted when more than max_sessions are open; they are pickled to
+        spill_dir (if set) and restored from there when they are used again. Sessions evicted without spill_dir
+        expire -> their edits are lost, requests with their ids are rejected.
+
+        :param datatables: dict of RelationalDfs the working copies are created from -> {table_id: RelationalDf}
+        :param max_sessions: number of sessions kept in memory
+        :param spill_dir: directory evicted sessions are written to -> if None, evicted sessions are discarded
+            (the older steps of the operation logs of the sessions are spilled there as well)
+        :param max_operations: number of operations the operation log of a session keeps in memory (see OperationLog)
+        """
+        self.datatables = datatables
+        self.max_sessions = max_sessions
+        self.spill_dir = spill_dir
+        self.max_operations = max_operations
+
+        # Sessions in memory -> with the sessions spilled to spill_dir, the only sessions requests are accepted for
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create_session(self):
+        """
+        Start a session with a new id (e.g. on page load)
+        :return: Session
+        """
+        session_id = uuid.uuid4().hex
+        logging.debug(f'Create session {session_id}')
+        operations_spill_path = None
+        if self.spill_dir is not None:
+            operations_spill_path = self._spill_path(session_id, '.operations')
+        session = Session(session_id, copy_tables(self.datatables),
+                          OperationLog(self.max_operations, operations_spill_path))
+        with self._lock:
+            self._add_session(session)
+        return session
+
+    def get_session(self, session_id):
+        """
+        Get a session -> restored from spill_dir if it is not in memory
+        :param session_id: id of a session started by create_session
+        :return: Session
+        :raises KeyError: if the session wasn't started by create_session or expired (evicted without spill_dir)
+            -> the edits shown by the browser are lost, the page must be reloaded
+        """
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+                return self._sessions[session_id]
+
+            session = self._load_session(session_id)
+            if session is None:
+                raise KeyError(f"Session '{session_id}' is unknown or expired -> reload the page")
+            self._add_session(session)
+            return session
+
+    def _add_session(self, session):
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._spill_session(*self._sessions.popitem(last=False))
+
+    def get_table(self, session_id, table_id):
+        """
+        Get the working copy of a table of a session
+        :param session_id: id of the session
+        :param table_id: table_id of the RelationalDf
+        :return: RelationalDf
+        """
+        return self.get_session(session_id).datatables[table_id]
+
+    def _spill_path(self, session_id, suffix='.pkl'):
+        # Session ids come from the browser -> must not be usable to reach other paths
+        if not re.fullmatch(r'[\w-]+', str(session_id)):
+            raise ValueError(f"Invalid session id '{session_id}'")
+        return os.path.join(self.spill_dir, f'{session_id}{suffix}')
+
+    def _spill_session(self, session_id, session):
+        if self.spill_dir is None:
+            logging.warning(f'Session {session_id} expired -> its unsaved edits are discarded')
+            return
+        logging.debug(f'Spill session {session_id} to disk')
+        with open(self._spill_path(session_id), 'wb') as f:
+            pickle.dump(session, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load_session(self, session_id):
+        if self.spill_dir is None or not os.path.exists(self._spill_path(session_id)):
+            return None
+        logging.debug(f'Load session {session_id} from disk')
+        with open(self._spill_path(session_id), 'rb') as f:
+            session = pickle.load(f)
+        os.remove(self._spill_path(session_id))
+
+        # Share the id sequences with the original tables again -> ids stay unique across sessions
+        for table_id, table in session.datatables.items():
+            table.id_sequence = self.datatables[table_id].id_sequence
+        return session
@@ -0,0 +1,478 @@
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datatable_editor.query import filter_sql, order_sql, quote_identifier
+
+# File extensions -> pyarrow dataset format
+FILE_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'ipc',
+    '.feather': 'ipc',
+    '.ipc': 'ipc',
+}
+
+
+class ArrowSource:
+    # Rows are read into pandas -> queries and edits are evaluated by the RelationalDf
+    pushdown = False
+
+    def __init__(self, path, file_format=None):
+        """
+        Lazy data source of a RelationalDf stored in a Parquet or Arrow IPC/Feather file
+        -> only the requested columns and rows are read, Arrow IPC files are memory-mapped
+
+        :param path: path of the file (or directory of files of the same schema)
+        :param file_format: 'parquet' or 'ipc' -> if None, it is inferred from the file extension
+        """
+        try:
+            import pyarrow.dataset as ds
+            from pyarrow.fs import LocalFileSystem
+        except ImportError:
+            raise ImportError('pyarrow is required to read tables from Parquet or Arrow files')
+
+        if file_format is None:
+            extension = os.path.splitext(str(path))[1].lower()
+            if extension not in FILE_FORMATS:
+                raise ValueError(f"Can't infer the file format of '{path}' -> pass file_format")
+            file_format = FILE_FORMATS[extension]
+
+        self.path = os.path.abspath(path)
+        self.file_format = file_format
+        self._dataset = ds.dataset(self.path, format=file_format, filesystem=LocalFileSystem(use_mmap=True))
+        self._num_rows = None
+        self._dtypes = None
+
+    def __len__(self):
+        if self._num_rows is None:
+            # Parquet row counts come from the file metadata -> no data is read
+            self._num_rows = self._dataset.count_rows()
+        return self._num_rows
+
+    def __getstate__(self):
+        # Datasets can't be pickled -> re-opened from the path (e.g. when a session is spilled to disk)
+        return {'path': self.path, 'file_format': self.file_format}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['file_format'])
+
+    @property
+    def columns(self):
+        return list(self._dataset.schema.names)
+
+    @property
+    def dtypes(self):
+        """
+        dtypes of the columns once read into a df -> derived from the Arrow schema by the conversion of read, except
+        that integer and boolean columns with missing values become float64 and object columns there (pandas has no
+        missing values of these dtypes), which is looked up in the Parquet statistics or the column itself
+        """
+        if self._dtypes is None:
+            import pyarrow as pa
+
+            dtypes = self._to_pandas(self._dataset.schema.empty_table()).dtypes
+            for field in self._dataset.schema:
+                if not (field.nullable and isinstance(dtypes[field.name], np.dtype)):
+                    continue
+                if pa.types.is_integer(field.type) and self._has_nulls(field.name):
+                    dtypes[field.name] = np.dtype(np.float64)
+                elif pa.types.is_boolean(field.type) and self._has_nulls(field.name):
+                    dtypes[field.name] = np.dtype(object)
+            self._dtypes = dtypes
+        return self._dtypes
+
+    def _has_nulls(self, column):
+        # Null counts of Parquet files are taken from the statistics of the row groups -> no data is read
+        if self.file_format == 'parquet':
+            null_count = 0
+            for fragment in self._dataset.get_fragments():
+                metadata = fragment.metadata
+                index = metadata.schema.names.index(column)
+                for i in range(metadata.num_row_groups):
+                    statistics = metadata.row_group(i).column(index).statistics
+                    if statistics is None or not statistics.has_null_count:
+                        return self._dataset.to_table(columns=[column]).column(column).null_count > 0
+                    null_count += statistics.null_count
+            return null_count > 0
+        return self._dataset.to_table(columns=[column]).column(column).null_count > 0
+
+    @staticmethod
+    def _to_pandas(table):
+        # Conversion of every read -> the dtypes of the columns are derived from it (see dtypes)
+        return table.to_pandas()
+
+    def read(self, columns=None):
+        """
+        Read whole columns
+        :param columns: list of columns to read -> if None, all columns are read
+        :return: pd.DataFrame with a RangeIndex (labels are the row positions in the file)
+        """
+        logging.debug(f'Read {columns if columns is not None else "all columns"} from {self.path}')
+        return self._to_pandas(self._dataset.to_table(columns=columns))
+
+    def take(self, positions, columns=None):
+        """
+        Read rows by position
+        :param positions: row positions in the file
+        :param columns: list of columns to read -> if None, all columns are read
+        :return: pd.DataFrame indexed by the positions
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        df = self._to_pandas(self._dataset.take(positions, columns=columns))
+        df.index = pd.Index(positions)
+        return df
+
+
+def _sql_value(value):
+    # numpy scalars can't be bound as SQL parameters, missing values are stored as NULL
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value
+
+
+def _chunks(values, size=500):
+    # SQLite limits the number of parameters of a statement
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _declared_dtype(declared_type, backend):
+    # dtype of the values of a column of a declared SQL type once read into a df -> SQLite type affinity rules
+    declared_type = declared_type.upper()
+    if declared_type.startswith('INTERVAL'):
+        return np.dtype(object)
+    if 'INT' in declared_type:
+        return np.dtype(np.int64)
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return np.dtype(np.float64)
+    if backend == 'duckdb':
+        if declared_type.startswith('BOOL'):
+            return np.dtype(bool)
+        if declared_type.startswith('TIMESTAMP'):
+            return np.dtype('datetime64[ns]')
+    elif declared_type.startswith('BOOL'):
+        # Stored as 0 and 1 by SQLite
+        return np.dtype(np.int64)
+    elif declared_type.startswith(('NUMERIC', 'DECIMAL')):
+        return np.dtype(np.float64)
+    # Text, blobs, decimals, dates and columns without a declared type
+    return np.dtype(object)
+
+
+class SqlSource:
+    # Queries and edits are run by the database -> the RelationalDf holds no rows
+    pushdown = True
+
+    # Table of the next ids of the tables of a database -> ids are reserved in the database, so they are unique
+    # across all processes using it (e.g. the gunicorn workers of DatatableEditor.serve)
+    ID_SEQUENCES_TABLE = '_datatable_editor_ids'
+
+    def __init__(self, database, table, backend='sqlite'):
+        """
+        Data source of a RelationalDf stored in a table of a SQLite or DuckDB database file
+        -> paging, sorting, filter queries and foreign key lookups run as indexed SQL queries, edits are written
+        to the table in transactions. Rows are identified by the rowid of the database table.
+
+        :param database: path of the database file
+        :param table: name of the table in the database
+        :param backend: 'sqlite' or 'duckdb'
+        """
+        if backend == 'duckdb':
+            try:
+                import duckdb  # noqa: F401
+            except ImportError:
+                raise ImportError('duckdb is required to read tables from DuckDB databases')
+        elif backend != 'sqlite':
+            raise ValueError(f"Unknown backend '{backend}' -> 'sqlite' or 'duckdb'")
+
+        self.database = os.path.abspath(database)
+        self.table = table
+        self.backend = backend
+
+        # Connections can't be shared between threads -> one connection per thread (callbacks run in threads)
+        self._local = threading.local()
+        self._dtypes = None
+
+        self.columns = [row[0] for row in self.execute(f'SELECT * FROM {self._table} LIMIT 0').description]
+        if 'id' in self.columns:
+            # Rows with the same id are rejected by the database
+            self.create_index('id', unique=True)
+            self.execute(f'CREATE TABLE IF NOT EXISTS {quote_identifier(self.ID_SEQUENCES_TABLE)} '
+                         f'(table_name VARCHAR PRIMARY KEY, next_id BIGINT)')
+
+    def __len__(self):
+        return self.execute(f'SELECT COUNT(*) FROM {self._table}').fetchone()[0]
+
+    def __getstate__(self):
+        # Connections can't be pickled -> re-opened from the path (e.g. when a session is spilled to disk)
+        return {'database': self.database, 'table': self.table, 'backend': self.backend}
+
+    def __setstate__(self, state):
+        self.__init__(state['database'], state['table'], state['backend'])
+
+    @property
+    def _table(self):
+        return quote_identifier(self.table)
+
+    @property
+    def connection(self):
+        """
+        Connection of the current thread -> in autocommit mode, transactions are started explicitly. Connections
+        can't be used across fork (e.g. by the gunicorn workers forked from the master, see serving.serve_gunicorn)
+        -> a forked process opens connections of its own
+        """
+        if getattr(self._local, 'connection', None) is None or self._local.pid != os.getpid():
+            if self.backend == 'duckdb':
+                import duckdb
+                self._local.connection = duckdb.connect(self.database)
+            else:
+                self._local.connection = sqlite3.connect(self.database, isolation_level=None)
+            self._local.pid = os.getpid()
+            self._local.transaction_depth = 0
+        return self._local.connection
+
+    def close(self):
+        """
+        Close the connection of the current thread -> reopened by the next query
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, list(params))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Run the statements of the block in one transaction -> rolled back if the block raises, nested blocks are
+        part of the outermost transaction
+        """
+        connection = self.connection
+        if self._local.transaction_depth == 0:
+            connection.execute('BEGIN TRANSACTION')
+        self._local.transaction_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._local.transaction_depth -= 1
+            if self._local.transaction_depth == 0:
+                connection.execute('ROLLBACK')
+            raise
+        self._local.transaction_depth -= 1
+        if self._local.transaction_depth == 0:
+            connection.execute('COMMIT')
+
+    def create_index(self, column, unique=False):
+        """
+        Index a column (id and foreign key columns) -> lookups don't scan the table
+        :param column: column of the table
+        :param unique: If True, the values of the column must be unique
+        """
+        if unique:
+            name = quote_identifier(f'ux_{self.table}_{column}')
+            self.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {self._table} ({quote_identifier(column)})')
+        else:
+            name = quote_identifier(f'ix_{self.table}_{column}')
+            self.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {self._table} ({quote_identifier(column)})')
+
+    @property
+    def dtypes(self):
+        """
+        dtypes of the columns once read into a df -> mapped from the declared column types of the table (missing
+        values of integer columns are read as float64 like in pandas.read_sql)
+        """
+        if self._dtypes is None:
+            if self.backend == 'duckdb':
+                declared_types = {row[0]: row[1] for row in self.execute(f'DESCRIBE {self._table}').fetchall()}
+            else:
+                declared_types = {row[1]: row[2] for row in self.execute(f'PRAGMA table_info({self._table})')}
+            self._dtypes = pd.Series({column: _declared_dtype(declared_types[column], self.backend)
+                                      for column in self.columns}, dtype=object)
+        return self._dtypes
+
+    def select(self, columns=None, where='1 = 1', params=(), order_by=(), limit=None, offset=0):
+        """
+        Read rows with a SELECT statement
+        :param columns: list of columns to read -> if None, all columns are read
+        :param where: SQL WHERE clause
+        :param params: parameters of the WHERE clause
+        :param order_by: list of ORDER BY terms -> rows are ordered by rowid after these
+        :param limit: max number of rows to read
+        :param offset: number of rows to skip
+        :return: pd.DataFrame indexed by the rowids
+        """
+        columns = self.columns if columns is None else columns
+        sql = (f'SELECT rowid, {", ".join(quote_identifier(c) for c in columns)} FROM {self._table} WHERE {where} '
+               f'ORDER BY {", ".join(list(order_by) + ["rowid"])}')
+        params = list(params)
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [limit, offset]
+        logging.debug(f'Query {self.database}: {sql} {params}')
+        cursor = self.execute(sql, params)
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=['rowid'] + list(columns))
+        return df.set_index('rowid').rename_axis(None)
+
+    def read(self, columns=None):
+        """
+        Read whole columns
+        :param columns: list of columns to read -> if None, all columns are read
+        :return: pd.DataFrame indexed by the rowids
+        """
+        return self.select(columns)
+
+    def take(self, labels, columns=None):
+        """
+        Read rows by rowid
+        :param labels: rowids of the rows
+        :param columns: list of columns to read -> if None, all columns are read
+        :return: pd.DataFrame indexed by the rowids (in the order of labels)
+        """
+        labels = [int(label) for label in labels]
+        dfs = [self.select(columns, f'rowid IN ({", ".join("?" * len(chunk))})', chunk) for chunk in _chunks(labels)]
+        return pd.concat(dfs).loc[labels] if dfs else self.select(columns, '1 = 0')
+
+    def select_where(self, column, value):
+        """
+        Read the rows with a value in a column (e.g. the child rows of a parent row) -> uses the index of the column
+        :param column: column of the table
+        :param value: value to look up
+        :return: pd.DataFrame indexed by the rowids
+        """
+        return self.select(where=f'{quote_identifier(column)} = ?', params=[_sql_value(value)])
+
+    def select_in(self, column, values):
+        """
+        Read the rows with one of the passed values in a column -> uses the index of the column
+        :param column: column of the table
+        :param values: values to look up
+        :return: pd.DataFrame indexed by the rowids
+        """
+        dfs = [self.select(where=f'{quote_identifier(column)} IN ({", ".join("?" * len(chunk))})', params=chunk)
+               for chunk in _chunks(_sql_value(value) for value in values)]
+        return pd.concat(dfs) if dfs else self.select(where='1 = 0')
+
+    def lookup(self, row_ids):
+        """
+        Look up the rowids of rows by id
+        :param row_ids: ids of the rows
+        :return: dict row id -> rowid (ids not in the table are missing)
+        """
+        labels = {}
+        for chunk in _chunks(_sql_value(row_id) for row_id in row_ids):
+            cursor = self.execute(f'SELECT id, rowid FROM {self._table} WHERE id IN ({", ".join("?" * len(chunk))})',
+                                  chunk)
+            labels.update(cursor.fetchall())
+        return labels
+
+    def max_id(self):
+        """
+        :return: max value of the id column or None if the table is empty
+        """
+        return self.execute(f'SELECT MAX(id) FROM {self._table}').fetchone()[0]
+
+    def next_ids(self, n=1):
+        """
+        Reserve ids for new rows in the database -> ids are never handed out twice, also not to other processes
+        working on the same table
+        :param n: number of ids to reserve
+        :return: first of the n reserved ids
+        """
+        sequences = quote_identifier(self.ID_SEQUENCES_TABLE)
+        with self.transaction():
+            # The write locks the database until the transaction is committed -> reservations are serialized
+            self._start_id_sequence()
+            self.execute(f'UPDATE {sequences} SET next_id = next_id + ? WHERE table_name = ?', [n, self.table])
+            next_id = self.execute(f'SELECT next_id FROM {sequences} WHERE table_name = ?',
+                                   [self.table]).fetchone()[0]
+        return next_id - n
+
+    def _start_id_sequence(self):
+        # The sequence of a table starts after its max id
+        self.execute(f'INSERT OR IGNORE INTO {quote_identifier(self.ID_SEQUENCES_TABLE)} (table_name, next_id) '
+                     f'SELECT ?, COALESCE(MAX(id), 0) + 1 FROM {self._table}', [self.table])
+
+    def _advance_id_sequence(self, row_ids):
+        # Rows written with ids of their own (e.g. from a change log) -> the sequence continues after them
+        row_ids = [row_id for row_id in row_ids if row_id is not None]
+        if not row_ids:
+            return
+        max_id = int(max(row_ids))
+        self._start_id_sequence()
+        self.execute(f'UPDATE {quote_identifier(self.ID_SEQUENCES_TABLE)} SET next_id = ? '
+                     f'WHERE table_name = ? AND next_id <= ?', [max_id + 1, self.table, max_id])
+
+    def query(self, page_current, page_size, filter_query=None, sort_by=None, column_resolver=None):
+        """
+        Get one page of the rows matching a filter_query, ordered by sort_by
+        :param page_current: index of the page (starting at 0) -> None to get all matching rows
+        :param page_size: number of rows per page
+        :param filter_query: datatable filter_query
+        :param sort_by: datatable sort_by list
+        :param column_resolver: optional function mapping datatable column ids to column names
+        :return: (page_df, page_count) tuple
+        """
+        where, params = filter_sql(filter_query, self.dtypes, column_resolver)
+        order_by = order_sql(sort_by, self.columns, column_resolver)
+        if page_current is None:
+            return self.select(where=where, params=params, order_by=order_by), 1
+
+        count = self.execute(f'SELECT COUNT(*) FROM {self._table} WHERE {where}', params).fetchone()[0]
+        page_df = self.select(where=where, params=params, order_by=order_by, limit=page_size,
+                              offset=page_current * page_size)
+        return page_df, max(1, -(-count // page_size))
+
+    def insert(self, rows):
+        """
+        Insert rows
+        :param rows: list of dicts (column -> value) -> columns missing in a row are NULL
+        """
+        sql = (f'INSERT INTO {self._table} ({", ".join(quote_identifier(c) for c in self.columns)}) '
+               f'VALUES ({", ".join("?" * len(self.columns))})')
+        with self.transaction():
+            for row in rows:
+                self.execute(sql, [_sql_value(row.get(column)) for column in self.columns])
+            if 'id' in self.columns:
+                self._advance_id_sequence([_sql_value(row.get('id')) for row in rows])
+
+    def update(self, label, values):
+        """
+        Update cells of one row
+        :param label: rowid of the row
+        :param values: dict of column -> new value
+        """
+        assignments = ', '.join(f'{quote_identifier(column)} = ?' for column in values)
+        with self.transaction():
+            self.execute(f'UPDATE {self._table} SET {assignments} WHERE rowid = ?',
+                         [_sql_value(value) for value in values.values()] + [int(label)])
+            if 'id' in values:
+                self._advance_id_sequence([_sql_value(values['id'])])
+
+    def delete(self, labels):
+        """
+        Delete rows
+        :param labels: rowids of the rows
+        """
+        with self.transaction():
+            for chunk in _chunks(int(label) for label in labels):
+                self.execute(f'DELETE FROM {self._table} WHERE rowid IN ({", ".join("?" * len(chunk))})', chunk)
+
+    def replace(self, df):
+        """
+        Replace all rows of the table
+        :param df: pd.DataFrame with the new rows
+        """
+        with self.transaction():
+            self.execute(f'DELETE FROM {self._table}')
+            self.insert(df.to_dict('records'))
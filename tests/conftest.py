@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from datatable_editor.relational_df import RelationalDf
+
+# Columns of the users -> appliances -> usage_windows hierarchy of the tests (see demo_tables)
+DEMO_DATA = {
+    'users': {'id': [123, 23], 'name': ['low', 'medium']},
+    'appliances': {'id': [1, 2, 3], 'user_id': [123, 23, 123], 'power': [5.0, 40.0, 150.0]},
+    'usage_windows': {'id': [1, 2, 3], 'appliance_id': [1, 1, 2], 'start': [14, 20, 8], 'end': [16, 24, 9]},
+}
+
+# Parent table and foreign key column of the child tables
+DEMO_RELATIONS = {'appliances': ('users', 'user_id'), 'usage_windows': ('appliances', 'appliance_id')}
+
+
+@pytest.fixture
+def demo_tables():
+    """
+    Factory of the users -> appliances -> usage_windows hierarchy
+    -> demo_tables(appliances={...}) replaces the columns of a table, demo_tables(usage_windows=None) leaves a table
+    (and the tables below it) out
+
+    :return: function (table_names=None, **columns) -> dict of RelationalDfs {table_id: RelationalDf}, parent
+        tables first. table_names maps table ids to table names (default: the table id)
+    """
+    def make_tables(table_names=None, **columns):
+        tables = {}
+        for table_id, table_columns in dict(DEMO_DATA, **columns).items():
+            parent_table_id, foreign_key_column = DEMO_RELATIONS.get(table_id, (None, None))
+            if table_columns is None or (parent_table_id is not None and parent_table_id not in tables):
+                continue
+            table_name = (table_names or {}).get(table_id, table_id)
+            tables[table_id] = RelationalDf(table_id, table_name, pd.DataFrame(table_columns))
+            if parent_table_id is not None:
+                tables[parent_table_id].add_child_table(tables[table_id], foreign_key_column)
+        return tables
+
+    return make_tables
@@ -0,0 +1,98 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datatable_editor.aggregates import AGGREGATE_FUNCTIONS
+from datatable_editor.relational_df import RelationalDf, copy_tables
+from datatable_editor.sources import SqlSource
+
+
+def users_and_appliances(appliances_df=None):
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23, 7], 'name': ['low', 'medium', 'none']}))
+    if appliances_df is None:
+        appliances_df = pd.DataFrame({
+            'id': [1, 2, 3],
+            'user_id': [123, 23, 123],
+            'name': ['radio', 'tv', 'fridge'],
+            'power': [5, 40, 150],
+        })
+    appliances = RelationalDf('appliances', 'appliances', appliances_df)
+    users.add_child_table(appliances, 'user_id')
+    for function in AGGREGATE_FUNCTIONS:
+        users.add_aggregate(f'{function}_power', 'appliances', function, 'power')
+    users.add_aggregate('appliances', 'appliances', 'count')
+    return users, appliances
+
+
+def test_aggregates():
+    users, appliances = users_and_appliances()
+    assert users.get_aggregates(users.df).to_dict('list') == {
+        'sum_power': [155, 40, 0],
+        'count_power': [2, 1, 0],
+        'min_power': [5, 40, None],
+        'max_power': [150, 40, None],
+        'mean_power': [77.5, 40.0, None],
+        'appliances': [2, 1, 0],
+    }
+    with pytest.raises(ValueError):
+        users.add_aggregate('median_power', 'appliances', 'median', 'power')
+    with pytest.raises(KeyError):
+        users.add_aggregate('sum_power', 'appliances', 'sum', 'power')
+
+    # Working copies aggregate the rows of the copied tables
+    copies = copy_tables({'users': users, 'appliances': appliances})
+    copies['appliances'].delete_rows([3])
+    assert copies['users'].get_aggregates(users.df)['max_power'].tolist() == [5, 40, None]
+    assert users.get_aggregates(users.df)['max_power'].tolist() == [150, 40, None]
+
+
+def test_aggregates_incremental_updates():
+    rng = np.random.default_rng(0)
+    users, appliances = users_and_appliances(pd.DataFrame({
+        'id': np.arange(1, 201),
+        'user_id': rng.choice([123, 23, 7], 200),
+        'name': 'appliance',
+        'power': rng.integers(0, 1000, 200),
+    }))
+
+    for step in range(30):
+        row_ids = appliances.df['id'].sample(4, random_state=step).tolist()
+        appliances.update_rows({row_id: {'power': int(rng.integers(0, 1000))} for row_id in row_ids[:2]})
+        appliances.update_row(row_ids[2], {'user_id': int(rng.choice([123, 23, 7])),
+                                           'power': int(rng.integers(0, 1000))})
+        appliances.delete_rows(row_ids[3:])
+        appliances.add_rows([{'id': 1000 + step, 'user_id': int(rng.choice([123, 23])), 'name': 'new',
+                              'power': int(rng.integers(0, 1000))}])
+
+    # Same as computed from scratch (the copies build their aggregates with a groupby)
+    rebuilt = copy_tables({'users': users, 'appliances': appliances})['users']
+    assert users.get_aggregates(users.df).to_dict('list') == rebuilt.get_aggregates(users.df).to_dict('list')
+    assert users.get_aggregates(users.df)['max_power'].tolist() == \
+        users.df['id'].map(appliances.df.groupby('user_id')['power'].max()).tolist()
+
+
+def test_aggregates_of_database_tables(tmp_path):
+    with sqlite3.connect(tmp_path / 'appliances.db') as connection:
+        pd.DataFrame({'id': [1, 2, 3], 'user_id': [123, 23, 123], 'power': [5, 40, 150]}).to_sql(
+            'appliances', connection, index=False)
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23, 7]}))
+    appliances = RelationalDf('appliances', 'appliances', SqlSource(tmp_path / 'appliances.db', 'appliances'))
+    users.add_child_table(appliances, 'user_id')
+    users.add_aggregate('total_power', 'appliances', 'sum', 'power')
+
+    assert users.get_aggregates(users.df)['total_power'].tolist() == [155, 40, 0]
+    appliances.update_row(2, {'user_id': 7})
+    assert users.get_aggregates(users.df)['total_power'].tolist() == [155, 0, 40]
+
+
+def test_aggregates_of_single_row_updates():
+    users, appliances = users_and_appliances()
+
+    # One row per update -> the edits of cells in the datatable
+    appliances.update_rows({1: {'power': 100}})
+    assert users.get_aggregates(users.df)['sum_power'].tolist() == [250, 40, 0]
+    appliances.update_rows({2: {'user_id': 123}})
+    assert users.get_aggregates(users.df)['appliances'].tolist() == [3, 0, 0]
+    assert users.get_aggregates(users.df)['sum_power'].tolist() == [290, 0, 0]
@@ -0,0 +1,120 @@
+import inspect
+import json
+import threading
+import time
+
+import pandas as pd
+from dash import Input, Output, ctx
+from dash.long_callback.managers import BaseLongCallbackManager
+
+from datatable_editor.background import ThreadManager
+from datatable_editor.changes import TableChanges
+from datatable_editor.core import DatatableEditor
+from datatable_editor.relational_df import RelationalDf
+
+CONTEXT = {'inputs_list': [], 'states_list': [], 'outputs_list': [], 'triggered_inputs': []}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise TimeoutError()
+        time.sleep(0.01)
+
+
+def test_thread_manager_result_and_progress():
+    manager = ThreadManager(max_workers=1)
+
+    def save(set_progress, n):
+        for i in range(n):
+            set_progress((i + 1, n))
+        return f'Saved {n}'
+
+    job = manager.call_job_fn('key', manager.make_job_fn(save, progress=True), [3], CONTEXT)
+    wait_for(lambda: manager.result_ready('key'))
+    assert manager.get_progress('key') == (3, 3)
+    assert manager.get_result('key', job) == 'Saved 3'
+    assert not manager.job_running(job)
+    # Results are not cached
+    assert manager.get_result('key', job) is manager.UNDEFINED
+
+
+def test_thread_manager_cancel():
+    manager = ThreadManager(max_workers=1)
+    started, proceed = threading.Event(), threading.Event()
+    progress = []
+
+    def save(set_progress):
+        started.set()
+        proceed.wait()
+        set_progress(1)
+        progress.append(1)
+        return 'Saved'
+
+    job = manager.call_job_fn('key', manager.make_job_fn(save, progress=True), [], CONTEXT)
+    started.wait()
+    assert manager.job_running(job)
+
+    # A cancelled job stops at its next progress report
+    manager.terminate_job(job)
+    proceed.set()
+    manager._executor.shutdown(wait=True)
+    assert progress == []
+    assert not manager.result_ready('key')
+
+
+def test_thread_manager_error():
+    manager = ThreadManager()
+
+    def fail():
+        raise ValueError('broken')
+
+    manager.call_job_fn('key', manager.make_job_fn(fail, progress=False), [], CONTEXT)
+    wait_for(lambda: manager.result_ready('key'))
+    assert manager.get_result('key', None)['long_callback_error']['msg'] == 'broken'
+
+
+def test_thread_manager_overrides_dash_manager():
+    # ThreadManager implements the manager interface of the pinned Dash version (requirements.txt) -> fails on drift
+    for name, method in vars(ThreadManager).items():
+        if callable(method) and not name.startswith('__') and hasattr(BaseLongCallbackManager, name):
+            assert inspect.signature(method) == inspect.signature(getattr(BaseLongCallbackManager, name)), name
+    assert {'call_job_fn', 'get_result', 'job_running', 'terminate_job'} <= set(vars(ThreadManager))
+    assert hasattr(BaseLongCallbackManager, '_make_progress_key') and hasattr(BaseLongCallbackManager, 'UNDEFINED')
+
+
+def test_background_callback_through_dash(tmp_path):
+    # Runs background callbacks through Dash's dispatch -> relies on Dash internals (see background.py)
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    editor = DatatableEditor({'users': users}, 8050, background=True, save_path=tmp_path / 'changes.jsonl')
+
+    @editor.app.callback(Output('probe', 'children'), Input('probe_button', 'n_clicks'), background=True,
+                         manager=editor.background_manager, prevent_initial_call=True)
+    def probe(clicks):
+        return ctx.triggered_id
+
+    client = editor.app.server.test_client()
+    layout = json.loads(client.get('/_dash-layout').data)
+    session = editor.get_session(layout['props']['children'][0]['props']['data'])
+    editor.apply_edits(session, session.datatables['users'], TableChanges('users', updated={23: {'id': 24}}))
+
+    def run(output, component_id, state):
+        body = {'output': output, 'outputs': dict(zip(('id', 'property'), output.rsplit('.', 1))),
+                'inputs': [{'id': component_id, 'property': 'n_clicks', 'value': 1}], 'state': state,
+                'changedPropIds': [f'{component_id}.n_clicks']}
+        job = json.loads(client.post('/_dash-update-component', json=body).data)
+        responses = []
+
+        def poll():
+            response = client.post(f"/_dash-update-component?cacheKey={job['cacheKey']}&job={job['job']}", json=body)
+            responses.append(json.loads(response.data))
+            return 'response' in responses[-1]
+
+        wait_for(poll)
+        return responses[-1]['response']
+
+    session_state = [{'id': 'session_id', 'property': 'data', 'value': session.session_id}]
+    assert run('save_status.children', 'save_button', session_state) == {
+        'save_status': {'children': 'Saved 1 change(s)'}}
+    assert run('probe.children', 'probe_button', []) == {'probe': {'children': 'probe_button'}}
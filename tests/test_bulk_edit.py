@@ -0,0 +1,76 @@
+import pytest
+
+from datatable_editor.bulk_edit import (apply_expression, cascade_delete, duplicate_rows, duplication_changes,
+                                        set_values, value_changes)
+from datatable_editor.core import DatatableEditor
+
+
+def test_set_values(demo_tables):
+    users, appliances, usage_windows = demo_tables().values()
+    changes = set_values(appliances, {'user_id': 23, 'power': 1.0}, '{user_id} = 123')
+    assert changes.updated == {1: {'user_id': 23, 'power': 1.0}, 3: {'user_id': 23, 'power': 1.0}}
+    assert appliances.df['power'].tolist() == [1.0, 40.0, 1.0]
+    # Foreign key index follows the bulk update
+    assert users.get_child_rows('appliances', 23)['id'].tolist() == [1, 2, 3]
+    assert users.get_child_rows('appliances', 123).empty
+
+
+def test_apply_expression(demo_tables):
+    users, appliances, usage_windows = demo_tables().values()
+    apply_expression(appliances, 'power', 'power * 2', '{power} > 10')
+    assert appliances.df['power'].tolist() == [5.0, 80.0, 300.0]
+    apply_expression(usage_windows, 'start', '0')
+    assert usage_windows.df['start'].tolist() == [0, 0, 0]
+    # Integer columns are widened to hold float results
+    apply_expression(usage_windows, 'end', 'end + 0.5', '{appliance_id} = 1')
+    assert usage_windows.df['end'].tolist() == [16.5, 24.5, 9.0]
+
+
+def test_duplicate_rows(demo_tables):
+    users, appliances, usage_windows = demo_tables().values()
+    changes_list = duplicate_rows(users, [123])
+    assert [changes.table_id for changes in changes_list] == ['users', 'appliances', 'usage_windows']
+
+    assert users.df['id'].tolist() == [123, 23, 124]
+    assert users.get_child_rows('appliances', 124)['id'].tolist() == [4, 5]
+    assert appliances.get_child_rows('usage_windows', 4)[['start', 'end']].values.tolist() == [[14, 16], [20, 24]]
+    assert appliances.get_child_rows('usage_windows', 5).empty
+    # Originals are untouched
+    assert users.get_child_rows('appliances', 123)['id'].tolist() == [1, 3]
+
+
+def test_cascade_delete(demo_tables):
+    users, appliances, usage_windows = demo_tables().values()
+    changes_list = cascade_delete(users, [123, 999])
+    assert [(changes.table_id, changes.deleted) for changes in changes_list] == [
+        ('usage_windows', [1, 2]), ('appliances', [1, 3]), ('users', [123])]
+    assert users.df['id'].tolist() == [23]
+    assert appliances.df['id'].tolist() == [2]
+    assert usage_windows.df['id'].tolist() == [3]
+
+
+def test_bulk_edit_session(demo_tables):
+    editor = DatatableEditor(demo_tables(), 8050)
+    session = editor.default_session
+    users, appliances, usage_windows = session.datatables.values()
+
+    # Checked like the edits in the tables -> rows with violations are left out
+    applied, violations = editor.apply_bulk_edit(session, value_changes(appliances, {'user_id': 999}, '{power} > 10'))
+    assert applied == [] and [v.row_id for v in violations] == [2, 3]
+    applied, violations = editor.apply_bulk_edit(session, value_changes(appliances, {'power': 1.0}, '{power} > 10'))
+    assert appliances.df['power'].tolist() == [5.0, 1.0, 1.0]
+
+    # Copied child rows point to the copied parent rows, the copies are undone at once
+    applied, violations = editor.apply_bulk_edit(session, duplication_changes(users, [123]))
+    assert violations == [] and [changes.table_id for changes in applied] == ['users', 'appliances', 'usage_windows']
+    assert len(session.pending_changes) == 4
+    session.operation_log.undo(session.datatables)
+    assert users.df['id'].tolist() == [123, 23] and len(usage_windows.df.index) == 3
+    session.operation_log.undo(session.datatables)
+    assert appliances.df['power'].tolist() == [5.0, 40.0, 150.0]
+
+
+def test_update_rows_unknown_id(demo_tables):
+    users, appliances, usage_windows = demo_tables().values()
+    with pytest.raises(KeyError):
+        appliances.update_rows({1: {'power': 1.0}, 99: {'power': 1.0}})
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from datatable_editor.bulk_io import MANIFEST, read_tables, write_tables
+
+
+@pytest.fixture
+def tables(demo_tables):
+    return demo_tables(table_names={'users': 'Users', 'appliances': 'Appliances', 'usage_windows': 'Usage windows'},
+                       users={'id': [123, 23], 'name': ['low', '007']},
+                       appliances={'id': [1, 2, 3], 'user_id': [123, 23, 123], 'power': [5.0, 40.0, None]},
+                       usage_windows={'id': [1], 'appliance_id': [1]})
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_write_and_read_tables(tables, tmp_path, file_format):
+    if file_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    write_tables(tables, tmp_path, file_format)
+
+    tables = read_tables(tmp_path, max_workers=2)
+    assert list(tables) == ['users', 'appliances', 'usage_windows']
+    assert tables['usage_windows'].table_name == 'Usage windows'
+    # Types are kept -> numeric looking text stays text
+    assert tables['users'].df['name'].tolist() == ['low', '007']
+    assert tables['users'].get_child_rows('appliances', 123)['id'].tolist() == [1, 3]
+    assert tables['appliances'].get_child_rows('usage_windows', 1)['id'].tolist() == [1]
+
+
+def test_read_tables_lazy(tables, tmp_path):
+    pytest.importorskip('pyarrow')
+    write_tables(tables, tmp_path)
+
+    tables = read_tables(tmp_path, lazy=True)
+    assert tables['users'].get_child_rows('appliances', 23)['id'].tolist() == [2]
+    assert not tables['appliances'].is_loaded
+
+
+def test_relations_to_other_tables_are_skipped(tables, tmp_path):
+    write_tables({'appliances': tables['appliances']}, tmp_path, 'csv')
+    with open(tmp_path / MANIFEST) as f:
+        assert json.load(f)['relations'] == []
+
+    with pytest.raises(ValueError):
+        write_tables(tables, tmp_path, 'xlsx')
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from datatable_editor.changes import TableChanges, ChangeLog, compute_changes, apply_changes
+from datatable_editor.relational_df import RelationalDf
+
+
+def appliances():
+    return RelationalDf('appliances', 'appliances', pd.DataFrame({
+        'id': [1, 2, 3],
+        'user_id': [123, 23, 123],
+        'name': ['radio', 'tv', None],
+        'power': [5.0, 40.0, None],
+    }))
+
+
+def test_compute_changes():
+    table = appliances()
+    records = [
+        {'id': 1, 'user_id': 123, 'name': 'radio', 'power': 7.0},  # updated
+        {'id': 3, 'user_id': 123, 'name': None, 'power': None},  # unchanged (missing values)
+        {'id': 4, 'user_id': 23, 'name': 'lamp', 'power': 10.0},  # inserted
+    ]
+
+    # Only rows 1 and 3 were loaded -> row 2 is not deleted
+    changes = compute_changes(table, records, scope_ids=[1, 3])
+    assert changes.updated == {1: {'power': 7.0}}
+    assert changes.inserted == [records[2]]
+    assert changes.deleted == []
+
+    # Records are the complete table -> row 2 was deleted
+    changes = compute_changes(table, records)
+    assert changes.deleted == [2]
+
+    assert not compute_changes(table, [{'id': 2, 'user_id': 23, 'name': 'tv', 'power': 40.0}], scope_ids=[2])
+
+
+def test_apply_changes():
+    table = appliances()
+    apply_changes(table, TableChanges('appliances', inserted=[{'id': 4, 'user_id': 23, 'name': 'lamp', 'power': 10.0}],
+                                      updated={1: {'name': 'radio2'}}, deleted=[2]))
+    assert table.df['id'].tolist() == [1, 3, 4]
+    assert table.df['name'].tolist() == ['radio2', None, 'lamp']
+
+
+def test_change_log(tmp_path):
+    change_log = ChangeLog(tmp_path / 'changes.jsonl')
+    assert change_log.read() == []
+
+    written = change_log.append([
+        TableChanges('appliances', updated={1: {'power': 7.0}}),
+        TableChanges('appliances'),  # empty changes are not written
+    ])
+    change_log.append([TableChanges('appliances', deleted=[2])])
+    assert written == 1
+
+    table = appliances()
+    change_log.replay({'appliances': table})
+    assert table.df['id'].tolist() == [1, 3]
+    assert table.df['power'].tolist()[0] == 7.0
@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+
+from datatable_editor.changes import TableChanges
+from datatable_editor.core import DatatableEditor, get_df_column
+from datatable_editor.relational_df import RelationalDf
+
+
+def test_virtualization_layout():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': range(1, 2501), 'name': 'user'}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame({'id': [1], 'user_id': [1]}))
+    users.add_child_table(appliances, 'user_id')
+
+    editor = DatatableEditor({'users': users, 'appliances': appliances}, 8050, virtualization=True, window_size=1000)
+    assert editor.server_side
+
+    layout = editor.serve_layout()
+    tables = [component for component in layout._traverse() if getattr(component, 'virtualization', False)]
+    assert len(tables) == 2
+    # Only the first window of rows is sent, further windows are queried by update_table_page
+    assert len(tables[0].data) == 1000
+    assert tables[0].page_count == 3
+    assert tables[0].page_action == 'custom'
+    assert tables[0].style_cell['height'] == '30px'
+
+
+def test_navigation_is_clientside():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [1, 2], 'name': 'user'}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame({'id': [1], 'user_id': [1]}))
+    users.add_child_table(appliances, 'user_id')
+    editor = DatatableEditor({'users': users, 'appliances': appliances}, 8050)
+
+    stores = {component.id: component.data for component in editor.serve_layout()._traverse()
+              if getattr(component, 'id', None) in ('visible_tables', 'table_relations')}
+    assert stores == {'visible_tables': {'users': ''},
+                      'table_relations': {'users': {'appliances': 'user_id'}, 'appliances': {}}}
+
+    # Clicks on cells and close buttons don't reach the server
+    navigation = [callback for callback in editor.app.callback_map.values()
+                  if callback['inputs'][0]['property'] == 'active_cell']
+    assert len(navigation) == 1
+    assert 'callback' not in navigation[0]
+
+
+def test_descendant_drill_down():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame({'id': [1, 2], 'user_id': [123, 23]}))
+    windows = RelationalDf('usage_windows', 'usage_windows', pd.DataFrame(
+        {'id': [1, 2, 3], 'appliance_id': [1, 2, 7]}))
+    users.add_child_table(appliances, 'user_id')
+    appliances.add_child_table(windows, 'appliance_id')
+    editor = DatatableEditor({'users': users, 'appliances': appliances, 'usage_windows': windows}, 8050)
+
+    # Button column for the table two levels down
+    column_ids = [column['id'] for column in editor.get_table_columns(users)]
+    assert column_ids == ['id', '!child_appliances', '!desc_usage_windows']
+
+    # Rows are loaded with the ids of their ancestors -> filtered by the '!anc_' column in the browser
+    session = editor.get_session(None)
+    df = session.datatables['usage_windows'].query_rows('{!anc_users}=123', get_df_column)
+    records = editor.get_table_records(session.datatables['usage_windows'], session.datatables['usage_windows'].df)
+    assert df['id'].tolist() == [1]
+    assert [record['!anc_users'] for record in records] == [123, 23, None]
+
+    # New rows take their foreign key from the parent row the table was opened with -> unknown below an ancestor
+    assert editor.get_new_row(windows, '{!fk_appliance_id}=2')['!fk_appliance_id'] == 2
+    with pytest.raises(ValueError):
+        editor.get_new_row(windows, '{!anc_users}=123')
+
+
+def test_aggregate_columns():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame(
+        {'id': [1, 2, 3], 'user_id': [123, 23, 123], 'power': [5, 40, 150]}))
+    users.add_child_table(appliances, 'user_id')
+    users.add_aggregate('total power', 'appliances', 'sum', 'power')
+    editor = DatatableEditor({'users': users, 'appliances': appliances}, 8050)
+
+    columns = editor.get_table_columns(users)
+    assert columns[-1] == {'name': 'total power', 'id': '!agg_total power', 'editable': False}
+
+    session = editor.get_session(None)
+    session.datatables['appliances'].update_row(2, {'user_id': 123})
+    records = editor.get_table_records(session.datatables['users'], session.datatables['users'].df)
+    assert [record['!agg_total power'] for record in records] == [195, 0]
+
+    # Server-side queries filter and sort by the current values of the aggregates
+    session_users = session.datatables['users']
+    sort_by = [{'column_id': '!agg_total power', 'direction': 'asc'}]
+    assert session_users.query_page(0, 2, None, sort_by, get_df_column)[0]['id'].tolist() == [23, 123]
+    assert session_users.query_rows('{!agg_total power} > 100', get_df_column)['id'].tolist() == [123]
+    session.datatables['appliances'].update_row(3, {'user_id': 23})
+    assert session_users.query_rows('{!agg_total power} > 100', get_df_column)['id'].tolist() == [23]
+    page_df, page_count = session_users.query_page(0, 1, None, sort_by, get_df_column)
+    assert page_df['id'].tolist() == [123] and page_count == 2
+
+
+def test_invalid_values_are_rejected():
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame({'id': [1], 'name': ['tv'], 'power': [5.0]}))
+    editor = DatatableEditor({'appliances': appliances}, 8050)
+
+    record = editor.get_df_record(appliances, {'id': 1, 'name': '', 'power': '40'})
+    assert record == {'id': 1, 'name': None, 'power': 40.0}
+    with pytest.raises(ValueError):
+        editor.get_df_record(appliances, {'id': 1, 'name': 'tv', 'power': 'a lot'})
+
+    # The cell is left out and reported in the table status
+    violations = []
+    record = editor.get_df_record(appliances, {'id': 1, 'name': 'tv', 'power': 'a lot'}, violations)
+    assert record == {'id': 1, 'name': 'tv'}
+    assert editor.format_violations(violations) == \
+        "Rejected: power of row 1 of 'appliances': 'a lot' is not a float64 value"
+
+
+def test_undo_edits():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame(
+        {'id': [1, 2, 3], 'user_id': [123, 23, 123], 'power': [5, 40, 150]}))
+    users.add_child_table(appliances, 'user_id')
+    editor = DatatableEditor({'users': users, 'appliances': appliances}, 8050, on_delete='cascade')
+    session = editor.get_session(None)
+
+    # The deletion cascades to the appliances of the user -> undone in one step
+    editor.apply_edits(session, users, TableChanges('users', deleted=[123]))
+    changes_list = session.operation_log.undo(session.datatables)
+    assert [(changes.table_id, len(changes.inserted)) for changes in changes_list] == [('users', 1), ('appliances', 2)]
+
+    # Only the restored rows are sent to the browser
+    records = editor.get_changed_records(session.datatables, changes_list)
+    assert records['users'] == {'deleted': [], 'updated': [],
+                                'inserted': [{'id': 123, '!child_appliances': 'Click me!'}]}
+    assert [record['id'] for record in records['appliances']['inserted']] == [1, 3]
+    assert appliances.df['id'].tolist() == [2, 1, 3]
+
+
+def test_table_data_route():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    editor = DatatableEditor({'users': users}, 8050, max_sessions=2)
+    client = editor.app.server.test_client()
+    session_id = editor.serve_layout().children[0].data
+    session_count = len(editor.session_store)
+
+    response = client.get(f'/datatable_editor/tables/users.json?session_id={session_id}&filter_query={{id}}>100')
+    assert [record['id'] for record in response.get_json()] == [123]
+    # The table of a session can't be requested without its id
+    assert client.get('/datatable_editor/tables/users.json').status_code == 400
+    # Only sessions started by a page load are accepted
+    assert client.get('/datatable_editor/tables/users.json?session_id=invented').status_code == 400
+    assert len(editor.session_store) == session_count
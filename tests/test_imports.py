@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+WEB_MODULES = ['dash', 'dash_bootstrap_components', 'flask']
+
+
+def imported_modules(statement):
+    # Modules imported by a statement in a fresh interpreter
+    code = f'import json, sys; {statement}; print(json.dumps(sorted(sys.modules)))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    return set(json.loads(output.splitlines()[-1]))
+
+
+@pytest.mark.parametrize('statement', [
+    'import datatable_editor',
+    'from datatable_editor import RelationalDf, ArrowSource, SqlSource, read_tables, validate_tables',
+    'import datatable_editor.bulk_edit, datatable_editor.changes, datatable_editor.query',
+])
+def test_data_utilities_do_not_import_web_stack(statement):
+    modules = imported_modules(statement)
+    assert not modules.intersection(WEB_MODULES)
+
+
+def test_editor_is_imported_on_first_use():
+    modules = imported_modules('from datatable_editor import DatatableEditor')
+    assert modules.issuperset(WEB_MODULES)
+
+
+def test_import_has_no_side_effects():
+    code = ('import logging, pandas as pd; from datatable_editor import DatatableEditor; '
+            'print(logging.getLogger().handlers, pd.options.mode.chained_assignment)')
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    assert output.split() == ['[]', 'warn']
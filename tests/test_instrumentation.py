@@ -0,0 +1,37 @@
+import logging
+
+from flask import Flask, g
+
+from datatable_editor.instrumentation import CallbackMetrics, annotate_callback
+
+
+def test_render_metrics():
+    metrics = CallbackMetrics(log_level=None, buckets=(0.1, 1.0))
+    metrics.record('add_table_row', 0.05, request_bytes=100, response_bytes=20, table_id='appliances', rows=1)
+    metrics.record('add_table_row', 0.5, request_bytes=100, response_bytes=20, table_id='appliances', rows=1)
+    metrics.record('save_data', 2.0, error=True)
+
+    text = metrics.render()
+    labels = 'callback="add_table_row",table="appliances"'
+    assert f'datatable_editor_callback_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'datatable_editor_callback_duration_seconds_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'datatable_editor_callback_duration_seconds_count{{{labels}}} 2' in text
+    assert f'datatable_editor_callback_request_bytes_total{{{labels}}} 200' in text
+    assert f'datatable_editor_callback_rows_total{{{labels}}} 2' in text
+    assert 'datatable_editor_callback_errors_total{callback="save_data",table=""} 1' in text
+
+
+def test_annotate_callback(caplog):
+    metrics = CallbackMetrics(log_level=logging.INFO)
+    # Outside of a request annotations are ignored
+    annotate_callback('appliances', 3)
+
+    with Flask(__name__).test_request_context():
+        annotate_callback('appliances', 3)
+        annotate_callback(rows=2)
+        assert (g.callback_table_id, g.callback_rows) == ('appliances', 5)
+
+    with caplog.at_level(logging.INFO, logger='datatable_editor.metrics'):
+        metrics.record('update_tables', 0.01, table_id='appliances', rows=5)
+    assert caplog.records[0].rows == 5
+    assert caplog.records[0].callback == 'update_tables'
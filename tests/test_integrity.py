@@ -0,0 +1,73 @@
+import pandas as pd
+
+from datatable_editor.changes import TableChanges
+from datatable_editor.core import DatatableEditor
+from datatable_editor.integrity import validate_changes, validate_table, validate_tables, without_violations
+
+
+# Users without names and an appliance without a user
+DEMO_COLUMNS = {'users': {'id': [123, 23]}, 'appliances': {'id': [1, 2, 3], 'user_id': [123, 23, None]},
+                'usage_windows': None}
+
+
+def test_validate_table(demo_tables):
+    tables = demo_tables(**DEMO_COLUMNS)
+    assert validate_tables(tables) == []
+
+    tables['appliances'].df = pd.DataFrame({'id': [1, 1, 2], 'user_id': [123, 999, 999]})
+    violations = validate_table(tables['appliances'])
+    assert [(v.row_id, v.column) for v in violations] == [(1, 'id'), (1, 'user_id'), (2, 'user_id')]
+
+
+def test_validate_changes(demo_tables):
+    tables = demo_tables(**DEMO_COLUMNS)
+    users, appliances = tables['users'], tables['appliances']
+
+    changes = TableChanges('appliances',
+                           inserted=[{'id': 4, 'user_id': 999}, {'id': 2, 'user_id': 23}, {'id': 5, 'user_id': 23}],
+                           updated={1: {'user_id': 23}, 3: {'user_id': 888}})
+    violations = validate_changes(appliances, changes)
+    assert sorted((v.row_id, v.column) for v in violations) == [(2, 'id'), (3, 'user_id'), (4, 'user_id')]
+
+    valid = without_violations(changes, violations)
+    assert valid.inserted == [{'id': 5, 'user_id': 23}]
+    assert valid.updated == {1: {'user_id': 23}}
+
+    # Deleting referenced rows
+    violations = validate_changes(users, TableChanges('users', deleted=[123]))
+    assert [(v.row_id, v.column) for v in violations] == [(123, 'id')]
+    assert validate_changes(users, TableChanges('users', deleted=[123]), references=False) == []
+
+    # Changing the id of a referenced row would orphan its child rows
+    violations = validate_changes(users, TableChanges('users', updated={123: {'id': 124}}), references=False)
+    assert [(v.row_id, v.column) for v in violations] == [(123, 'id')]
+    assert validate_changes(appliances, TableChanges('appliances', updated={3: {'id': 30}})) == []
+
+
+def test_editor_cascades_deletes(demo_tables):
+    tables = demo_tables(**DEMO_COLUMNS)
+    editor = DatatableEditor(tables, 8050, on_delete='cascade')
+    applied, violations = editor.apply_edits(editor.default_session, tables['users'],
+                                             TableChanges('users', deleted=[123]))
+    assert violations == []
+    assert tables['appliances'].df['id'].tolist() == [2, 3]
+    assert [changes.table_id for changes in editor.default_session.pending_changes] == ['appliances', 'users']
+    # The cascaded deletions are removed from the displayed child tables
+    records = editor.get_changed_records(editor.datatables, applied)
+    assert records['appliances'] == {'deleted': [1], 'updated': [], 'inserted': []}
+
+    editor = DatatableEditor(demo_tables(**DEMO_COLUMNS), 8050)
+    users = editor.datatables['users']
+    changes = TableChanges('users', deleted=[123])
+    applied, violations = editor.apply_edits(editor.default_session, users, changes)
+    assert editor.format_violations(violations) == "Rejected: Row 123 of 'users' is referenced by rows of 'appliances'"
+    assert applied == [] and users.df['id'].tolist() == [123, 23]
+    # The rows of rejected edits are restored in the browser
+    rejected = editor.get_rejected_changes(users, changes, violations)
+    records = editor.get_changed_records(editor.datatables, [rejected])
+    assert [record['id'] for record in records['users']['inserted']] == [123]
+
+    changes = TableChanges('appliances', inserted=[{'id': 4, 'user_id': 999}], updated={1: {'id': 2}})
+    applied, violations = editor.apply_edits(editor.default_session, editor.datatables['appliances'], changes)
+    rejected = editor.get_rejected_changes(editor.datatables['appliances'], changes, violations)
+    assert (rejected.inserted, rejected.deleted) == ([{'id': 1}, {'id': 2}], [4])
@@ -0,0 +1,102 @@
+import pytest
+
+from datatable_editor.bulk_edit import cascade_deletions
+from datatable_editor.changes import TableChanges, apply_changes
+from datatable_editor.operation_log import OperationLog
+
+
+@pytest.fixture
+def tables(demo_tables):
+    return demo_tables(appliances={'id': [1, 2, 3], 'user_id': [123, 23, 123], 'power': [5, 40, 150]},
+                       usage_windows=None)
+
+
+def edit(log, table_changes):
+    log.record(table_changes)
+    for table, changes in table_changes:
+        apply_changes(table, changes)
+
+
+def undo_redo(log, datatables, undo=True):
+    return log.undo(datatables) if undo else log.redo(datatables)
+
+
+def snapshot(datatables):
+    return {table_id: table.df.sort_values('id').to_dict('records') for table_id, table in datatables.items()}
+
+
+def test_undo_redo(tables):
+    users, appliances = tables['users'], tables['appliances']
+    log = OperationLog()
+    states = [snapshot(tables)]
+
+    edit(log, [(appliances, TableChanges('appliances', updated={1: {'power': 7}, 3: {'power': 8, 'user_id': 23}}))])
+    states.append(snapshot(tables))
+    edit(log, [(appliances, TableChanges('appliances', inserted=[{'id': 4, 'user_id': 23, 'power': 1}]))])
+    states.append(snapshot(tables))
+    edit(log, cascade_deletions(users, [23]))
+    states.append(snapshot(tables))
+    assert len(log) == 3 + 1 + 4
+    assert appliances.df['id'].tolist() == [1]
+
+    # Undo restores the deleted rows together with their indexes, redo repeats the edits
+    for state in reversed(states[:-1]):
+        undo_redo(log, tables)
+        assert snapshot(tables) == state
+    assert not log.can_undo
+    assert users.get_child_rows('appliances', 123)['id'].tolist() == [1, 3]
+    for state in states[1:]:
+        undo_redo(log, tables, undo=False)
+        assert snapshot(tables) == state
+    assert undo_redo(log, tables, undo=False) == []
+
+    # A new edit discards the undone steps
+    undo_redo(log, tables)
+    edit(log, [(users, TableChanges('users', updated={123: {'name': 'high'}}))])
+    assert not log.can_redo
+    undo_redo(log, tables)
+    assert snapshot(tables) == states[2]
+
+
+def test_undo_id_changes(tables):
+    appliances = tables['appliances']
+    log = OperationLog()
+    states = [snapshot(tables)]
+
+    edit(log, [(appliances, TableChanges('appliances', updated={2: {'id': 20, 'power': 41}}))])
+    states.append(snapshot(tables))
+
+    # The update is undone on the row with the new id
+    assert [changes.updated for changes in undo_redo(log, tables)] == [{20: {'power': 40, 'id': 2}}]
+    assert snapshot(tables) == states[0]
+    undo_redo(log, tables, undo=False)
+    assert snapshot(tables) == states[1]
+
+    # A step that can't be applied is not undone
+    appliances.delete_rows([20])
+    with pytest.raises(KeyError):
+        undo_redo(log, tables)
+    assert log.can_undo and not log.can_redo
+
+
+def test_spill(tables, tmp_path):
+    appliances = tables['appliances']
+    log = OperationLog(max_operations=2, spill_path=tmp_path / 'operations')
+    for power in range(10):
+        edit(log, [(appliances, TableChanges('appliances', updated={1: {'power': power}, 2: {'power': power}}))])
+    assert len(log) == 2
+
+    # Spilled steps are read back when they are undone
+    for power in reversed(range(9)):
+        undo_redo(log, tables)
+        assert appliances.df['power'].tolist() == [power, power, 150]
+    undo_redo(log, tables)
+    assert appliances.df['power'].tolist() == [5, 40, 150]
+    assert not log.can_undo
+    assert (tmp_path / 'operations').stat().st_size == 0
+
+    # Without spill path, older steps are discarded
+    log = OperationLog(max_operations=2)
+    for power in range(3):
+        edit(log, [(appliances, TableChanges('appliances', updated={1: {'power': power}}))])
+    assert len([undo_redo(log, tables) for _ in range(3) if log.can_undo]) == 2
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from datatable_editor.query import parse_filter_query, filter_mask, query_positions, get_page
+
+
+def appliances_df():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'user_id': [123, 23, 123, 23],
+        'name': ['radio', 'TV', 'fridge', None],
+        'power': [5, 40, 150, 2.5],
+    })
+
+
+def test_parse_filter_query():
+    assert parse_filter_query('{!fk_user_id}=123') == [('!fk_user_id', 'eq', 123, True)]
+    assert parse_filter_query('{name} icontains "t" && {power} >= 2.5 && {name} is blank') == [
+        ('name', 'contains', 't', False),
+        ('power', 'ge', 2.5, True),
+        ('name', 'blank', None, True),
+    ]
+    # Parts that can't be parsed are skipped
+    assert parse_filter_query('nonsense && {id} ne 1') == [('id', 'ne', 1, True)]
+    assert parse_filter_query('') == []
+
+
+def test_filter_mask():
+    df = appliances_df()
+    assert filter_mask(df, '{user_id} = 123').tolist() == [True, False, True, False]
+    assert filter_mask(df, '{name} contains "t"').tolist() == [False, False, False, False]
+    assert filter_mask(df, '{name} icontains "t"').tolist() == [False, True, False, False]
+    assert filter_mask(df, '{power} > 5 && {power} < 100').tolist() == [False, True, False, False]
+    assert filter_mask(df, '{name} is blank').tolist() == [False, False, False, True]
+    # Text compared to a numeric column doesn't match anything
+    assert filter_mask(df, '{power} = "abc"').tolist() == [False, False, False, False]
+
+
+def test_filter_mask_column_resolver():
+    df = appliances_df()
+    mask = filter_mask(df, '{!fk_user_id} = 23 && {!child_x} = 1',
+                       lambda c: None if c.startswith('!child_') else c.replace('!fk_', ''))
+    assert mask.tolist() == [False, True, False, True]
+
+
+def test_query_positions_and_page():
+    df = appliances_df()
+    positions = query_positions(df, '{power} > 3', [{'column_id': 'power', 'direction': 'desc'}])
+    assert positions.tolist() == [2, 1, 0]
+
+    page_df, page_count = get_page(df, positions, 1, 2)
+    assert page_count == 2
+    assert page_df['id'].tolist() == [1]
+
+    # Empty result still has one page
+    page_df, page_count = get_page(df, np.array([], dtype=int), 0, 2)
+    assert page_count == 1
+    assert page_df.empty
@@ -0,0 +1,68 @@
+import pickle
+
+import numpy as np
+
+from datatable_editor.query_cache import QueryCache
+
+
+APPLIANCES = {'id': [1, 2, 3, 4], 'user_id': [123, 23, 123, 123], 'name': ['radio', 'tv', 'fridge', 'oven'],
+              'power': [5, 40, 150, 2000]}
+
+
+def query_ids(table, filter_query, sort_by=None):
+    return table.query_page(0, 10, filter_query, sort_by)[0]['id'].tolist()
+
+
+def test_query_cache_hits(demo_tables):
+    users, appliances, windows = demo_tables(appliances=APPLIANCES,
+                                             usage_windows={'id': [1, 2, 3], 'appliance_id': [1, 2, 3]}).values()
+    sort_by = [{'column_id': 'power', 'direction': 'desc'}]
+
+    assert query_ids(appliances, '{user_id}=123', sort_by) == [4, 3, 1]
+    assert query_ids(appliances, '{user_id}=123', sort_by) == [4, 3, 1]
+    assert appliances.query_rows('{user_id}=123')['id'].tolist() == [1, 3, 4]
+    assert (appliances.query_cache.hits, appliances.query_cache.misses) == (1, 2)
+
+    # Edits of other columns don't invalidate the result
+    appliances.update_row(3, {'name': 'freezer'})
+    assert query_ids(appliances, '{user_id}=123', sort_by) == [4, 3, 1]
+    assert appliances.query_cache.hits == 2
+
+    # Edits of the filtered or sorted columns and added or deleted rows do
+    appliances.update_rows({1: {'power': 9000}, 4: {'power': 1}})
+    assert query_ids(appliances, '{user_id}=123', sort_by) == [1, 3, 4]
+    appliances.update_row(2, {'user_id': 123})
+    assert query_ids(appliances, '{user_id}=123', sort_by) == [1, 3, 2, 4]
+    appliances.add_rows([{'id': 5, 'user_id': 123, 'name': 'lamp', 'power': 10}])
+    appliances.delete_rows([3])
+    assert query_ids(appliances, '{user_id}=123', sort_by) == [1, 2, 5, 4]
+    assert appliances.query_cache.hits == 2
+
+    # Rows below an ancestor change with the foreign keys of the table in between
+    assert query_ids(windows, '{!anc_users}=23') == []
+    windows.update_row(3, {'appliance_id': 2})
+    assert query_ids(windows, '{!anc_users}=23') == []
+    assert query_ids(windows, '{!anc_users}=123') == [1, 2, 3]
+    appliances.update_row(2, {'user_id': 23})
+    assert query_ids(windows, '{!anc_users}=23') == [2, 3]
+    assert windows.query_cache.hits == 0
+
+
+def test_query_cache_eviction():
+    cache = QueryCache(max_bytes=100)
+    for key in range(5):
+        cache.put(key, (0,), np.arange(5, dtype=np.int64))
+    # Two results of 40 bytes fit into the budget
+    assert len(cache) == 2 and cache.size == 80
+    assert cache.get(3, (0,)) is not None
+    cache.put(5, (0,), np.arange(5, dtype=np.int64))
+    assert cache.get(4, (0,)) is None
+    assert cache.get(3, (0,)) is not None
+
+    # Results computed from other versions are dropped, results larger than the budget are not cached
+    assert cache.get(3, (1,)) is None
+    cache.put(6, (0,), np.arange(50, dtype=np.int64))
+    assert len(cache) == 1
+
+    # The cached results are not pickled
+    assert len(pickle.loads(pickle.dumps(cache))) == 0
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datatable_editor.relational_df import RelationalDf
+
+
+def users_and_appliances():
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23], 'name': ['low', 'medium']}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame({
+        'id': [1, 2, 3],
+        'user_id': [123, 23, 123],
+        'name': ['radio', 'tv', 'fridge'],
+        'power': [5, 40, 150],
+    }))
+    users.add_child_table(appliances, 'user_id')
+    return users, appliances
+
+
+def test_add_child_table_wrong_type():
+    users, appliances = users_and_appliances()
+    with pytest.raises(TypeError):
+        users.add_child_table(appliances.df, 'user_id')
+    with pytest.raises(KeyError):
+        users.add_child_table(appliances, 'user_id')
+
+
+def test_foreign_key_index():
+    users, appliances = users_and_appliances()
+    assert users.get_child_rows('appliances', 123)['id'].tolist() == [1, 3]
+    assert users.get_child_rows('appliances', 23)['id'].tolist() == [2]
+    assert users.get_child_rows('appliances', 999).empty
+
+    # Index is built from whichever side the relation is registered
+    windows = RelationalDf('usage_windows', 'usage_windows', pd.DataFrame({'id': [1], 'appliance_id': [3]}))
+    windows.add_parent_table(appliances, 'appliance_id')
+    assert appliances.get_child_rows('usage_windows', 3)['id'].tolist() == [1]
+
+
+def test_foreign_key_index_incremental_updates():
+    users, appliances = users_and_appliances()
+
+    appliances.add_rows([{'id': 4, 'user_id': 23, 'name': 'lamp', 'power': None}])
+    assert users.get_child_rows('appliances', 23)['id'].tolist() == [2, 4]
+    assert appliances.df['power'].dtype == float
+
+    # Re-parent a row
+    appliances.update_row(1, {'user_id': 23})
+    assert users.get_child_rows('appliances', 123)['id'].tolist() == [3]
+    assert users.get_child_rows('appliances', 23)['id'].tolist() == [1, 2, 4]
+
+    appliances.delete_rows([2, 3])
+    assert users.get_child_rows('appliances', 123).empty
+    assert users.get_child_rows('appliances', 23)['id'].tolist() == [1, 4]
+
+    # Replacing the df rebuilds the index
+    appliances.df = pd.DataFrame({'id': [7], 'user_id': [123], 'name': ['oven'], 'power': [2000]})
+    assert users.get_child_rows('appliances', 123)['id'].tolist() == [7]
+    assert users.get_child_rows('appliances', 23).empty
+
+
+def test_next_id():
+    users, appliances = users_and_appliances()
+    assert appliances.next_id() == 4
+    assert appliances.next_id() == 5
+
+    # Ids of rows added with their own id are not handed out again
+    appliances.add_rows([{'id': 10, 'user_id': 23, 'name': 'lamp', 'power': 1}])
+    assert appliances.next_id() == 11
+
+    # ... and neither are ids changed by updates
+    appliances.update_row(10, {'id': 20})
+    assert appliances.next_id() == 21
+    appliances.update_rows({1: {'id': 30}, 2: {'id': 31}})
+    assert appliances.next_id() == 32
+
+    empty = RelationalDf('empty', 'empty', pd.DataFrame({'id': []}))
+    assert empty.next_id() == 1
+
+
+def test_compact():
+    df = pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'user_id': [123, 23, 123, 23],
+        'name': ['radio', 'tv', 'radio', 'radio'],
+        'power': [5.5, 40.0, 150.25, None],
+        'exact': [0.1, 0.2, 0.3, 0.4],
+    })
+    appliances = RelationalDf('appliances', 'appliances', df, compact=True)
+    assert appliances.df['user_id'].dtype == 'int8'
+    # Foreign key columns are keys once the table is related
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23, 1000]}), compact=True)
+    users.add_child_table(appliances, 'user_id')
+    dtypes = appliances.df.dtypes
+    assert dtypes['id'] == 'int32'
+    assert dtypes['user_id'] == 'int32'
+    assert dtypes['name'] == 'category'
+    assert dtypes['power'] == 'float32'
+    assert dtypes['exact'] == 'float64'  # float32 would lose precision
+    assert appliances.df.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+
+    # Edits with new categories and values exceeding the downcast integer range
+    appliances.update_row(1, {'name': 'lamp'})
+    appliances.add_rows([{'id': 5, 'user_id': 1000, 'name': 'oven', 'power': 1.0, 'exact': 0.5}])
+    assert appliances.df['name'].tolist() == ['lamp', 'tv', 'radio', 'radio', 'oven']
+    assert appliances.df['name'].dtype == 'category'
+    assert appliances.df['user_id'].tolist() == [123, 23, 123, 23, 1000]
+    appliances.update_row(2, {'power': 0.1, 'user_id': 2 ** 40})
+    assert (appliances.df.at[1, 'power'], appliances.df.at[1, 'user_id']) == (0.1, 2 ** 40)
+
+    # Inserted rows widen the columns the same way -> values are never cast lossily
+    compact = RelationalDf('compact', 'compact', pd.DataFrame({'id': [1, 2], 'n': [1, 2], 'power': [0.5, 1.5]}),
+                           compact=True)
+    assert (compact.df['n'].dtype, compact.df['power'].dtype) == ('int8', 'float32')
+    compact.add_rows([{'id': 3, 'n': 1.5, 'power': 1.1}])
+    assert (compact.df.at[2, 'n'], compact.df.at[2, 'power']) == (1.5, 1.1)
+    compact.add_rows([{'id': 4, 'n': None, 'power': 1e300}])
+    assert compact.df['power'].tolist()[-1] == 1e300 and compact.df['power'].dtype == 'float64'
+
+
+def users_appliances_windows():
+    users, appliances = users_and_appliances()
+    windows = RelationalDf('usage_windows', 'usage_windows', pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'appliance_id': [1, 1, 2, 3],
+        'start': [14, 20, 8, 0],
+    }))
+    appliances.add_child_table(windows, 'appliance_id')
+    return users, appliances, windows
+
+
+def test_descendant_rows():
+    users, appliances, windows = users_appliances_windows()
+    assert users.get_descendant_rows('usage_windows', 123)['id'].tolist() == [1, 2, 4]
+    assert users.get_descendant_rows('usage_windows', 23)['id'].tolist() == [3]
+    assert users.get_descendant_rows('appliances', 23)['id'].tolist() == [2]
+    assert users.get_descendant_rows('usage_windows', 999).empty
+    assert windows.query_rows('{!anc_users} = 123 && {start} > 10')['id'].tolist() == [1, 2]
+    with pytest.raises(KeyError):
+        appliances.get_descendant_rows('users', 1)
+
+
+def test_ancestor_index_incremental_updates():
+    users, appliances, windows = users_appliances_windows()
+    index = windows.get_ancestor_index('users')
+
+    # New rows below existing rows and a new subtree
+    windows.add_rows([{'id': 5, 'appliance_id': 2, 'start': 1}])
+    appliances.add_rows([{'id': 4, 'user_id': 23, 'name': 'lamp', 'power': 10}])
+    windows.add_rows([{'id': 6, 'appliance_id': 4, 'start': 2}])
+    assert users.get_descendant_rows('usage_windows', 23)['id'].tolist() == [3, 5, 6]
+
+    # Re-parenting an appliance moves its usage windows to the other user
+    appliances.update_row(1, {'user_id': 23})
+    assert users.get_descendant_rows('usage_windows', 123)['id'].tolist() == [4]
+    assert users.get_descendant_rows('usage_windows', 23)['id'].tolist() == [1, 2, 3, 5, 6]
+    appliances.update_rows({1: {'user_id': 123}, 4: {'user_id': 123}})
+    assert users.get_descendant_rows('usage_windows', 123)['id'].tolist() == [1, 2, 4, 6]
+
+    # Re-parenting a usage window and deleting an appliance
+    windows.update_row(3, {'appliance_id': 3})
+    appliances.delete_rows([3])
+    assert users.get_descendant_rows('usage_windows', 123)['id'].tolist() == [1, 2, 6]
+    assert pd.isna(index.ancestor_ids[windows.get_row_label(3)])
+
+    # Replacing the df of a table in between rebuilds the indexes below it
+    appliances.df = pd.DataFrame({'id': [1, 2], 'user_id': [23, 23], 'name': ['radio', 'tv'], 'power': [5, 40]})
+    assert users.get_descendant_rows('usage_windows', 23)['id'].tolist() == [1, 2, 5]
+    assert users.get_descendant_rows('usage_windows', 123).empty
+
+
+def test_ancestor_index_matches_rebuild():
+    rng = np.random.default_rng(0)
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': np.arange(1, 11)}))
+    appliances = RelationalDf('appliances', 'appliances', pd.DataFrame(
+        {'id': np.arange(1, 101), 'user_id': rng.integers(1, 11, 100)}))
+    windows = RelationalDf('usage_windows', 'usage_windows', pd.DataFrame(
+        {'id': np.arange(1, 1001), 'appliance_id': rng.integers(1, 101, 1000)}))
+    users.add_child_table(appliances, 'user_id')
+    appliances.add_child_table(windows, 'appliance_id')
+    index = windows.get_ancestor_index('users')
+
+    for _ in range(20):
+        appliance_ids = appliances.df['id'].sample(5, random_state=rng.integers(1000)).tolist()
+        appliances.update_rows({row_id: {'user_id': int(rng.integers(1, 11))} for row_id in appliance_ids})
+        appliances.delete_rows(appliance_ids[:1])
+        windows.update_row(int(windows.df['id'].iloc[0]), {'appliance_id': int(rng.integers(1, 101))})
+
+    expected = windows.df['appliance_id'].map(appliances.df.set_index('id')['user_id'])
+    assert index.ancestor_ids.sort_index().equals(expected.astype(object).sort_index())
+    for user_id in range(1, 11):
+        assert windows.get_rows(index.get_labels(user_id))['id'].tolist() == \
+            windows.df.loc[expected == user_id, 'id'].tolist()
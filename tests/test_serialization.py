@@ -0,0 +1,39 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from datatable_editor.serialization import to_records, to_json_records, iter_json_records
+
+
+def mixed_df():
+    return pd.DataFrame({
+        'id': [1, 2, 3],
+        'name': pd.array(['radio', None, 'tv'], dtype='string'),
+        'kind': pd.Categorical(['a', 'b', None]),
+        'power': [5.5, np.nan, 40.0],
+    })
+
+
+def test_to_records():
+    df = mixed_df()
+    records = to_records(df)
+    assert records[0] == {'id': 1, 'name': 'radio', 'kind': 'a', 'power': 5.5}
+    assert records[1]['name'] is None
+    assert type(records[0]['id']) is int
+    assert to_records(df.iloc[:0]) == []
+
+
+def test_json_records():
+    df = mixed_df()
+    expected = [
+        {'id': 1, 'name': 'radio', 'kind': 'a', 'power': 5.5},
+        {'id': 2, 'name': None, 'kind': 'b', 'power': None},
+        {'id': 3, 'name': 'tv', 'kind': None, 'power': 40.0},
+    ]
+    assert json.loads(to_json_records(df)) == expected
+
+    # Chunks join to the same JSON array
+    for chunk_size in [1, 2, 5]:
+        assert json.loads(''.join(iter_json_records(df, chunk_size))) == expected
+    assert json.loads(''.join(iter_json_records(df.iloc[:0]))) == []
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from datatable_editor.relational_df import RelationalDf
+from datatable_editor.serving import check_multiprocess_serving
+from datatable_editor.sources import SqlSource
+
+
+def test_check_multiprocess_serving(tmp_path):
+    with sqlite3.connect(tmp_path / 'users.db') as connection:
+        pd.DataFrame({'id': [1, 2]}).to_sql('users', connection, index=False)
+    tables = {
+        'users': RelationalDf('users', 'users', SqlSource(tmp_path / 'users.db', 'users')),
+        'appliances': RelationalDf('appliances', 'appliances', pd.DataFrame({'id': [1]})),
+    }
+    with pytest.raises(ValueError, match="'appliances'"):
+        check_multiprocess_serving(tables, sticky_sessions=True)
+    with pytest.raises(ValueError, match='sticky_sessions'):
+        check_multiprocess_serving({'users': tables['users']})
+    check_multiprocess_serving({'users': tables['users']}, sticky_sessions=True)
+
+    # DuckDB database files can't be opened by several processes
+    pytest.importorskip('duckdb')
+    import duckdb
+    with duckdb.connect(str(tmp_path / 'users.duckdb')) as connection:
+        connection.execute('CREATE TABLE users (id BIGINT)')
+    duckdb_users = RelationalDf('users', 'users', SqlSource(tmp_path / 'users.duckdb', 'users', backend='duckdb'))
+    with pytest.raises(ValueError, match='DuckDB'):
+        check_multiprocess_serving({'users': duckdb_users}, sticky_sessions=True)
+
+
+def test_connections_are_reopened_after_fork(tmp_path):
+    with sqlite3.connect(tmp_path / 'users.db') as connection:
+        pd.DataFrame({'id': [1, 2]}).to_sql('users', connection, index=False)
+    source = SqlSource(tmp_path / 'users.db', 'users')
+    connection = source.connection
+    # Connection of another process (e.g. the gunicorn master before forking the workers)
+    source._local.pid = -1
+    assert source.connection is not connection
+    assert len(source) == 2
+
+    source.close()
+    assert len(source) == 2
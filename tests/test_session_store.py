@@ -0,0 +1,61 @@
+import pytest
+
+from datatable_editor.session_store import SessionStore
+
+
+@pytest.fixture
+def tables(demo_tables):
+    return demo_tables(appliances={'id': [1, 2], 'user_id': [123, 23]}, usage_windows=None)
+
+
+def test_sessions_work_on_copies(tables):
+    store = SessionStore(tables, max_sessions=2)
+    a, b = store.create_session().session_id, store.create_session().session_id
+
+    appliances = store.get_table(a, 'appliances')
+    appliances.delete_rows([1])
+    assert store.get_table(a, 'appliances').df['id'].tolist() == [2]
+    assert store.get_table(b, 'appliances').df['id'].tolist() == [1, 2]
+    assert tables['appliances'].df['id'].tolist() == [1, 2]
+
+    # Relations are re-created between the copies
+    assert store.get_table(a, 'users').child_tables['appliances'] is appliances
+
+    # Ids are unique across sessions
+    assert store.get_table(a, 'appliances').next_id() == 3
+    assert store.get_table(b, 'appliances').next_id() == 4
+
+    # Ids invented by a client don't start sessions
+    with pytest.raises(KeyError):
+        store.get_session('c')
+    assert len(store) == 2
+
+
+def test_lru_eviction_without_spill(tables):
+    store = SessionStore(tables, max_sessions=1)
+    a = store.create_session().session_id
+    store.get_table(a, 'appliances').delete_rows([1])
+    store.create_session()
+    assert a not in store
+    # The evicted session expired -> its edits are not silently replaced by fresh copies
+    with pytest.raises(KeyError, match='expired'):
+        store.get_session(a)
+    assert len(store) == 1
+
+
+def test_lru_eviction_with_spill(tables, tmp_path):
+    store = SessionStore(tables, max_sessions=1, spill_dir=tmp_path)
+    a = store.create_session().session_id
+    store.get_table(a, 'appliances').delete_rows([1])
+    store.create_session()
+    assert len(store) == 1
+    assert (tmp_path / f'{a}.pkl').exists()
+
+    # Spilled session is restored with its edits and the shared id sequence
+    appliances = store.get_table(a, 'appliances')
+    assert appliances.df['id'].tolist() == [2]
+    assert appliances.id_sequence is tables['appliances'].id_sequence
+    assert not (tmp_path / f'{a}.pkl').exists()
+
+    with pytest.raises(ValueError):
+        store.get_session('../a')
@@ -0,0 +1,188 @@
+import pickle
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from datatable_editor.changes import TableChanges, apply_changes, compute_changes
+from datatable_editor.query import filter_mask
+from datatable_editor.relational_df import RelationalDf, copy_tables
+from datatable_editor.sources import ArrowSource, SqlSource
+
+
+def appliances_df():
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'user_id': [123, 23, 123, 23],
+        'name': ['radio', 'tv', 'fridge', 'lamp'],
+        'power': [5.0, 40.0, 150.0, 10.0],
+    })
+
+
+@pytest.fixture(params=['appliances.parquet', 'appliances.feather'])
+def source(request, tmp_path):
+    pytest.importorskip('pyarrow')
+    df = appliances_df()
+    path = tmp_path / request.param
+    if path.suffix == '.parquet':
+        df.to_parquet(path)
+    else:
+        df.to_feather(path)
+    return ArrowSource(path)
+
+
+def test_lazy_relational_df(source):
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    appliances = RelationalDf('appliances', 'appliances', source)
+    users.add_child_table(appliances, 'user_id')
+
+    # Indexes, drill down and pages are served without loading the table
+    assert users.get_child_rows('appliances', 23)['name'].tolist() == ['tv', 'lamp']
+    page_df, page_count = appliances.query_page(1, 3)
+    assert page_df['id'].tolist() == [4]
+    assert page_count == 2
+    page_df, page_count = appliances.query_page(0, 10, '{user_id} = 123 && {power} > 10',
+                                                [{'column_id': 'power', 'direction': 'desc'}])
+    assert page_df['id'].tolist() == [3]
+    # Queries without an index lookup only read the filtered and sorted columns
+    page_df, page_count = appliances.query_page(0, 10, '{power} > 5', [{'column_id': 'name', 'direction': 'asc'}])
+    assert page_df['name'].tolist() == ['fridge', 'lamp', 'tv']
+    assert appliances.query_rows('{name} contains r')['id'].tolist() == [1, 3]
+    assert appliances.next_id() == 5
+    assert list(appliances.dtypes.index) == ['id', 'user_id', 'name', 'power']
+    assert not appliances.is_loaded
+
+    # Working copies share the source, spilled sessions re-open it
+    copy = copy_tables({'users': users, 'appliances': appliances})['appliances']
+    assert copy.source is appliances.source
+    assert len(pickle.loads(pickle.dumps(source))) == 4
+
+    # Edits load the table
+    appliances.update_row(2, {'user_id': 123})
+    assert appliances.is_loaded
+    assert users.get_child_rows('appliances', 123)['id'].tolist() == [1, 2, 3]
+
+
+@pytest.mark.parametrize('file_name', ['appliances.parquet', 'appliances.feather'])
+def test_arrow_dtypes(tmp_path, file_name):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    table = pa.table({'id': [1, 2], 'user_id': [123, None], 'on': [True, None], 'power': [5, 40]})
+    path = tmp_path / file_name
+    if path.suffix == '.parquet':
+        pyarrow.parquet.write_table(table, path)
+    else:
+        pyarrow.feather.write_feather(table, path)
+
+    # Integer and boolean columns with missing values are converted like the rows that are read
+    source = ArrowSource(path)
+    assert source.dtypes.to_dict() == source.read().dtypes.to_dict()
+    assert source.dtypes['user_id'] == 'float64' and source.dtypes['power'] == 'int64'
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ArrowSource(tmp_path / 'appliances.csv')
+
+
+@pytest.fixture(params=['sqlite', 'duckdb'])
+def sql_source(request, tmp_path):
+    path = tmp_path / 'appliances.db'
+    if request.param == 'duckdb':
+        duckdb = pytest.importorskip('duckdb')
+        connection = duckdb.connect(str(path))
+    else:
+        connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE appliances (id INTEGER, user_id INTEGER, name TEXT, power DOUBLE)')
+    connection.executemany('INSERT INTO appliances VALUES (?, ?, ?, ?)', appliances_df().values.tolist())
+    connection.commit()
+    connection.close()
+    return SqlSource(path, 'appliances', backend=request.param)
+
+
+def test_sql_relational_df(sql_source):
+    users = RelationalDf('users', 'users', pd.DataFrame({'id': [123, 23]}))
+    appliances = RelationalDf('appliances', 'appliances', sql_source)
+    users.add_child_table(appliances, 'user_id')
+
+    # Drill down, pages and filter queries are run by the database
+    assert users.get_child_rows('appliances', 23)['name'].tolist() == ['tv', 'lamp']
+    page_df, page_count = appliances.query_page(1, 3)
+    assert page_df['id'].tolist() == [4]
+    assert page_count == 2
+    page_df, page_count = appliances.query_page(0, 10, '{user_id} = 123 && {power} > 10',
+                                                [{'column_id': 'power', 'direction': 'desc'}])
+    assert page_df['id'].tolist() == [3]
+    assert appliances.query_rows('{name} icontains "R"')['id'].tolist() == [1, 3]
+    assert appliances.next_id() == 5
+    assert appliances.dtypes.to_dict() == {'id': 'int64', 'user_id': 'int64', 'name': 'object', 'power': 'float64'}
+
+    # Edits are written to the database in one transaction, nothing is held in memory
+    changes = compute_changes(appliances, [{'id': 2, 'user_id': 123, 'name': 'tv', 'power': 40.0}],
+                              scope_ids=[2, 4])
+    assert changes.updated == {2: {'user_id': 123}}
+    assert changes.deleted == [4]
+    apply_changes(appliances, changes)
+    apply_changes(appliances, TableChanges('appliances', inserted=[{'id': 5, 'user_id': 23, 'name': 'oven'}]))
+    # DuckDB moves updated rows to new rowids -> order of the rows isn't kept
+    assert sorted(users.get_child_rows('appliances', 123)['id'].tolist()) == [1, 2, 3]
+    assert users.get_child_rows('appliances', 23)['id'].tolist() == [5]
+    assert not appliances.is_loaded
+
+    # Failing changes are rolled back
+    with pytest.raises(KeyError):
+        apply_changes(appliances, TableChanges('appliances', deleted=[1], updated={99: {'name': 'x'}}))
+    assert appliances.row_count == 4
+
+    # Working copies and spilled sessions read and write the same table
+    copy = copy_tables({'users': users, 'appliances': appliances})['appliances']
+    copy.delete_rows([5])
+    assert appliances.row_count == 3
+    assert len(pickle.loads(pickle.dumps(sql_source))) == 3
+
+
+@pytest.mark.parametrize('filter_query', [
+    '{user_id} = 123',
+    '{user_id} != 123',
+    '{name} contains "r"',
+    '{name} icontains "TV"',
+    '{name} is blank',
+    '{name} is not blank',
+    '{power} >= 10 && {power} < 150',
+    '{power} = "abc"',
+    '{power} ne "abc"',
+    '{name} > "m"',
+])
+def test_filter_sql(tmp_path, filter_query):
+    df = appliances_df()
+    df.loc[3, 'name'] = None
+    with sqlite3.connect(tmp_path / 'appliances.db') as connection:
+        df.to_sql('appliances', connection, index=False)
+    source = SqlSource(tmp_path / 'appliances.db', 'appliances')
+
+    assert source.query(None, None, filter_query)[0]['id'].tolist() == df['id'][filter_mask(df, filter_query)].tolist()
+
+
+def test_sql_dtypes_are_declared(sql_source):
+    # Taken from the declared types -> no rows needed
+    sql_source.delete(list(sql_source.lookup([1, 2, 3, 4]).values()))
+    assert len(sql_source) == 0
+    assert sql_source.dtypes.to_dict() == {'id': 'int64', 'user_id': 'int64', 'name': 'object', 'power': 'float64'}
+
+
+def test_sql_ids_are_reserved_in_the_database(sql_source):
+    # Two processes (e.g. gunicorn workers) working on the same table
+    appliances = RelationalDf('appliances', 'appliances', sql_source)
+    other = RelationalDf('appliances', 'appliances', pickle.loads(pickle.dumps(sql_source)))
+
+    assert [appliances.next_id(), other.next_id(), appliances.next_id()] == [5, 6, 7]
+    assert other.next_ids(2).tolist() == [8, 9]
+    # Rows inserted with ids of their own -> the sequence continues after them
+    other.add_rows([{'id': 20, 'user_id': 23, 'name': 'oven'}])
+    assert appliances.next_id() == 21
+
+    with pytest.raises(Exception, match='(?i)unique|duplicate|constraint'):
+        appliances.add_rows([{'id': 20, 'user_id': 23, 'name': 'lamp'}])
+    assert appliances.row_count == 5